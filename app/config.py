@@ -31,6 +31,13 @@ class Settings(BaseSettings):
     
     # Configuración de archivos
     MAX_FILE_SIZE: int = 10 * 1024 * 1024  # 10MB
+    UPLOAD_CHUNK_SIZE: int = 256 * 1024  # bytes por bloque al subir fotos a Storage
+    UPLOAD_PART_SIZE: int = 512 * 1024  # bytes por parte sugeridos en las subidas reanudables
+    UPLOAD_SESSION_TTL: int = 24 * 3600  # segundos que se guarda una subida sin actividad
+    UPLOAD_TMP_DIR: str = ""  # partes recibidas (vacío = directorio temporal del sistema)
+    IMAGE_WORKERS: int = 2  # procesos que generan miniaturas y versiones WebP
+    THUMB_SIZE: int = 320  # lado máximo (px) de la miniatura
+    MEDIUM_SIZE: int = 1280  # lado máximo (px) de la versión mediana
     ALLOWED_IMAGE_TYPES: List[str] = ["image/jpeg", "image/png", "image/webp"]
     
     # Configuración de la obra
@@ -43,7 +50,20 @@ class Settings(BaseSettings):
     # Configuración de performance
     DATABASE_POOL_SIZE: int = 10
     DATABASE_MAX_OVERFLOW: int = 20
+    DATABASE_KEEPALIVE_EXPIRY: float = 30.0
     QUERY_TIMEOUT: int = 30
+    DASHBOARD_CACHE_TTL: int = 30  # segundos
+    MATVIEW_REFRESH_DEBOUNCE: float = 2.0  # segundos sin escrituras antes de refrescar
+    MATVIEW_MAX_STALENESS: int = 60  # segundos máximos de desactualización
+    MAX_BULK_MEDICIONES: int = 5000  # ítems por petición a /mediciones/bulk
+    BULK_INSERT_CHUNK_SIZE: int = 500  # filas por INSERT dentro de un lote
+    EXPORT_PAGE_SIZE: int = 1000  # filas por página al exportar en streaming
+    EXPORT_ROW_GROUP_SIZE: int = 50000  # filas por row group en Parquet/Arrow
+    EXPORT_WATERMARK_OVERLAP: int = 300  # segundos antes de la marca que relee la exportación incremental
+    MAX_IMPORT_FILE_SIZE: int = 50 * 1024 * 1024  # planillas de /avances/import (50MB)
+    USER_CACHE_TTL: int = 10  # segundos que se reutiliza el usuario autenticado
+    CONFIG_CACHE_TTL: int = 60  # segundos que se cachean los rangos de app_config
+    RECLASIFICACION_BATCH_SIZE: int = 1000  # mediciones por lote al reclasificar
     
     # Configuración de logs
     LOG_LEVEL: str = "INFO"
@@ -54,6 +74,10 @@ class Settings(BaseSettings):
     RATE_LIMIT_ENABLED: bool = False
     RATE_LIMIT_REQUESTS: int = 100
     RATE_LIMIT_WINDOW: int = 60
+    RATE_LIMIT_IP_REQUESTS: int = 300  # peticiones anónimas por IP y ventana
+    RATE_LIMIT_MAX_INFLIGHT: int = 200  # peticiones en curso antes de descartar carga
+    RATE_LIMIT_BACKEND: str = "memory"  # memory | supabase (compartido entre workers)
+    AUTH_HASH_WORKERS: int = 4  # hilos para verificar contraseñas con bcrypt
     
     # Configuración de producción
     PRODUCTION: bool = False
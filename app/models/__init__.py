@@ -3,15 +3,31 @@ Modelos Pydantic para la API BDPA Los Encinos
 """
 
 from .usuario import Usuario, UsuarioCreate, UsuarioUpdate, UsuarioResponse
-from .avance import Avance, AvanceCreate, AvanceUpdate, AvanceResponse
-from .medicion import Medicion, MedicionCreate, MedicionUpdate, MedicionResponse
+from .avance import (
+    Avance, AvanceCreate, AvanceUpdate, AvanceResponse, AvanceListItem, AvanceExport,
+    AvanceImportError, AvanceImportResponse
+)
+from .medicion import (
+    Medicion, MedicionCreate, MedicionUpdate, MedicionResponse, MedicionListItem, MedicionExport,
+    MedicionBulkRequest, MedicionBulkItemResult, MedicionBulkResponse
+)
+from .proyeccion import Proyeccion
+from .exportacion import FormatoExportacion
+from .foto import FotoInfo, SubidaFotoCreate, SubidaFotoEstado
+from .configuracion import RangoMedicion, RangosMedicion, ReclasificacionTrabajo
 from .auth import Token, TokenData, LoginRequest
 from .dashboard import DashboardSummary, TowerProgress
 
 __all__ = [
     "Usuario", "UsuarioCreate", "UsuarioUpdate", "UsuarioResponse",
-    "Avance", "AvanceCreate", "AvanceUpdate", "AvanceResponse", 
-    "Medicion", "MedicionCreate", "MedicionUpdate", "MedicionResponse",
+    "Avance", "AvanceCreate", "AvanceUpdate", "AvanceResponse", "AvanceListItem", "AvanceExport",
+    "AvanceImportError", "AvanceImportResponse",
+    "Medicion", "MedicionCreate", "MedicionUpdate", "MedicionResponse", "MedicionListItem", "MedicionExport",
+    "MedicionBulkRequest", "MedicionBulkItemResult", "MedicionBulkResponse",
+    "Proyeccion",
+    "FormatoExportacion",
+    "FotoInfo", "SubidaFotoCreate", "SubidaFotoEstado",
+    "RangoMedicion", "RangosMedicion", "ReclasificacionTrabajo",
     "Token", "TokenData", "LoginRequest",
     "DashboardSummary", "TowerProgress"
 ]
\ No newline at end of file
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 from enum import Enum
 
@@ -58,6 +58,8 @@ class Avance(AvanceBase):
     obra_id: str = Field(..., description="ID de la obra")
     foto_path: Optional[str] = Field(None, description="Ruta local de la foto")
     foto_url: Optional[str] = Field(None, description="URL de la foto en Storage")
+    thumb_url: Optional[str] = Field(None, description="URL de la miniatura WebP de la foto")
+    medium_url: Optional[str] = Field(None, description="URL de la versión mediana WebP de la foto")
     usuario_id: str = Field(..., description="ID del usuario que registró el avance")
     sync_status: SyncStatus = Field(SyncStatus.SYNCED, description="Estado de sincronización")
     last_sync: Optional[datetime] = Field(None, description="Fecha de última sincronización")
@@ -82,10 +84,51 @@ class AvanceResponse(BaseModel):
     porcentaje: int
     observaciones: Optional[str]
     foto_url: Optional[str]
+    thumb_url: Optional[str] = None  # Nulas hasta que se generan las derivadas
+    medium_url: Optional[str] = None
     sync_status: str
     created_at: datetime
     updated_at: datetime
     usuario: Optional[dict] = None  # Información básica del usuario
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class AvanceListItem(BaseModel):
+    """Avance reducido para listados (proyección `list`)"""
+    id: str
+    fecha: datetime
+    torre: str
+    ubicacion: str
+    categoria: str
+    porcentaje: int
+    sync_status: str
+    usuario: Optional[dict] = None  # Solo el nombre del usuario
+
+
+class AvanceExport(AvanceResponse):
+    """Avance con todas sus columnas (proyección `export`)
+
+    Los campos adicionales no tienen valor por defecto para que una respuesta
+    `detail` nunca se confunda con una `export` al serializar.
+    """
+    obra_id: Optional[str]
+    usuario_id: Optional[str]
+    foto_path: Optional[str]
+    last_sync: Optional[datetime]
+    deleted_at: Optional[datetime]
+
+
+class AvanceImportError(BaseModel):
+    """Fila rechazada de una importación"""
+    fila: int = Field(..., description="Número de fila en la planilla (la fila 1 son los encabezados)")
+    errores: List[str] = Field(default_factory=list, description="Errores de validación de la fila")
+
+
+class AvanceImportResponse(BaseModel):
+    """Resultado de importar una planilla de avances"""
+    total: int = Field(..., description="Filas con datos leídas")
+    creados: int = Field(..., description="Avances registrados")
+    rechazados: int = Field(..., description="Filas rechazadas")
+    errores: List[AvanceImportError] = Field(default_factory=list, description="Detalle de las filas rechazadas")
+    error: Optional[str] = Field(None, description="Error que detuvo la lectura del archivo, si lo hubo")
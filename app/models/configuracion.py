@@ -0,0 +1,51 @@
+from pydantic import BaseModel, Field, field_validator, model_validator
+from typing import Any, Dict, Optional
+from datetime import datetime
+
+
+# Rangos que usa el clasificador de mediciones
+NOMBRES_RANGOS = ('alambrico', 'coaxial', 'fibra_potencia', 'wifi')
+
+
+class RangoMedicion(BaseModel):
+    """Límites aceptables de un tipo de valor"""
+    min: float = Field(..., description="Valor mínimo aceptable")
+    max: float = Field(..., description="Valor máximo aceptable")
+
+    @model_validator(mode='after')
+    def validate_limites(self):
+        if self.min >= self.max:
+            raise ValueError("El mínimo debe ser menor que el máximo")
+        return self
+
+
+class RangosMedicion(BaseModel):
+    """Rangos de medición y margen de advertencia (app_config.settings)"""
+    rangos: Dict[str, RangoMedicion] = Field(..., description="Rangos por nombre (alambrico, coaxial, fibra_potencia, wifi)")
+    margen_advertencia: float = Field(5, ge=0, description="Distancia a los bordes que se considera advertencia")
+
+    @field_validator('rangos')
+    @classmethod
+    def validate_nombres(cls, v):
+        desconocidos = set(v) - set(NOMBRES_RANGOS)
+        if desconocidos:
+            raise ValueError(f"Rangos desconocidos: {', '.join(sorted(desconocidos))}")
+        faltantes = set(NOMBRES_RANGOS) - set(v)
+        if faltantes:
+            raise ValueError(f"Faltan rangos: {', '.join(sorted(faltantes))}")
+        return v
+
+
+class ReclasificacionTrabajo(BaseModel):
+    """Progreso de una reclasificación de mediciones"""
+    id: str
+    estado: str = Field(..., description="en_curso, completado, cancelado o error")
+    total: int = Field(0, description="Mediciones a revisar")
+    procesadas: int = Field(0, description="Mediciones revisadas")
+    cambiadas: int = Field(0, description="Mediciones cuyo estado cambió")
+    detalle: Dict[str, int] = Field(default_factory=dict, description="Cambios por transición (ej: OK->FALLA)")
+    rangos: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    iniciado: Optional[datetime] = None
+    actualizado: Optional[datetime] = None
+    terminado: Optional[datetime] = None
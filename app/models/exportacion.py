@@ -0,0 +1,9 @@
+from enum import Enum
+
+
+class FormatoExportacion(str, Enum):
+    """Formato de salida de las exportaciones en streaming"""
+    NDJSON = "ndjson"      # Un objeto JSON por línea
+    CSV = "csv"            # Encabezados en la primera fila; valores JSON como texto
+    PARQUET = "parquet"    # Columnar con tipos, por row groups; `valores` aplanado
+    ARROW = "arrow"        # Arrow IPC (stream), mismas columnas que Parquet
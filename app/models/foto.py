@@ -0,0 +1,37 @@
+from pydantic import BaseModel, Field
+from typing import Optional
+
+
+# SHA-256 en hexadecimal, como lo calcula el cliente antes de subir
+PATRON_HASH_FOTO = "^[0-9a-f]{64}$"
+
+
+class FotoInfo(BaseModel):
+    """Foto almacenada una sola vez por su hash de contenido"""
+    hash: str = Field(..., pattern=PATRON_HASH_FOTO, description="SHA-256 del contenido")
+    url: str = Field(..., description="URL pública del original")
+    thumb_url: Optional[str] = Field(None, description="URL de la miniatura WebP (nula hasta generarla)")
+    medium_url: Optional[str] = Field(None, description="URL de la versión mediana WebP (nula hasta generarla)")
+    content_type: Optional[str] = None
+    tamano: Optional[int] = Field(None, description="Tamaño del original en bytes")
+
+
+class SubidaFotoCreate(BaseModel):
+    """Inicio de una subida de foto por partes"""
+    hash: str = Field(..., pattern=PATRON_HASH_FOTO, description="SHA-256 del archivo completo")
+    tamano: int = Field(..., gt=0, description="Tamaño del archivo en bytes")
+    content_type: str = Field(..., description="Tipo MIME de la foto")
+
+
+class SubidaFotoEstado(BaseModel):
+    """Estado de una subida por partes
+
+    `offset` es la cantidad de bytes ya recibidos: el cliente continúa desde
+    ahí después de un corte. Con `foto` presente la subida está terminada
+    (o el servidor ya tenía ese archivo) y el avance se crea con su hash.
+    """
+    id: Optional[str] = None
+    offset: int = 0
+    tamano: int
+    tamano_parte: int = Field(..., description="Tamaño sugerido de cada parte en bytes")
+    foto: Optional[FotoInfo] = None
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, field_validator
-from typing import Optional, Dict, Any, Union
+from typing import Optional, Dict, Any, List, Union
 from datetime import datetime
 from enum import Enum
 
@@ -118,4 +118,52 @@ class MedicionResponse(BaseModel):
     usuario: Optional[dict] = None  # Información básica del usuario
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+
+class MedicionListItem(BaseModel):
+    """Medición reducida para listados (proyección `list`)"""
+    id: str
+    fecha: datetime
+    torre: str
+    identificador: str
+    tipo_medicion: str
+    valores: Dict[str, Any]
+    estado: str
+    usuario: Optional[dict] = None  # Solo el nombre del usuario
+
+
+class MedicionExport(MedicionResponse):
+    """Medición con todas sus columnas (proyección `export`)
+
+    Los campos adicionales no tienen valor por defecto para que una respuesta
+    `detail` nunca se confunda con una `export` al serializar.
+    """
+    obra_id: Optional[str]
+    usuario_id: Optional[str]
+
+
+class MedicionBulkRequest(BaseModel):
+    """Lote de mediciones a registrar
+
+    Cada elemento se valida por separado como `MedicionCreate` para informar
+    los errores por ítem sin rechazar el lote completo.
+    """
+    items: List[Dict[str, Any]] = Field(..., min_length=1, description="Mediciones a registrar")
+
+
+class MedicionBulkItemResult(BaseModel):
+    """Resultado de un ítem del lote (en el mismo orden recibido)"""
+    indice: int
+    ok: bool
+    id: Optional[str] = None
+    estado: Optional[str] = None
+    errores: Optional[List[str]] = None
+
+
+class MedicionBulkResponse(BaseModel):
+    """Resumen del registro de un lote de mediciones"""
+    total: int
+    creadas: int
+    rechazadas: int
+    resultados: List[MedicionBulkItemResult]
@@ -0,0 +1,8 @@
+from enum import Enum
+
+
+class Proyeccion(str, Enum):
+    """Conjunto de columnas devuelto por los listados"""
+    LIST = "list"        # Columnas que muestran las tablas del frontend
+    DETAIL = "detail"    # Respuesta completa (por defecto)
+    EXPORT = "export"    # Todas las columnas, incluidas las internas
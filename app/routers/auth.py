@@ -1,15 +1,19 @@
 from datetime import timedelta
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
 from app.models.auth import LoginRequest, Token
 from app.models.usuario import Usuario
 from app.services.auth_service import AuthService
 from app.config import settings
+from app.utils.rate_limit import RateLimiter
 
 router = APIRouter()
 security = HTTPBearer()
 
+# Intentos de login por (IP, usuario)
+login_limiter = RateLimiter(settings.RATE_LIMIT_REQUESTS, settings.RATE_LIMIT_WINDOW)
+
 
 # Dependencia para obtener usuario actual
 async def get_current_active_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> Usuario:
@@ -26,8 +30,18 @@ async def get_current_active_user(credentials: HTTPAuthorizationCredentials = De
 
 
 @router.post("/login", response_model=Token)
-async def login(login_data: LoginRequest):
+async def login(login_data: LoginRequest, request: Request):
     """Iniciar sesión"""
+    if settings.RATE_LIMIT_ENABLED:
+        client_ip = request.client.host if request.client else "desconocido"
+        retry_after = login_limiter.hit((client_ip, login_data.username.lower()))
+        if retry_after:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Demasiados intentos de inicio de sesión. Intenta nuevamente más tarde.",
+                headers={"Retry-After": str(retry_after)},
+            )
+    
     user = await AuthService.authenticate_user(login_data.username, login_data.password)
     
     if not user:
@@ -1,17 +1,27 @@
-from typing import List, Optional
+import json
+from typing import List, Optional, Union
 from datetime import date
-from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Path, Request, Response, UploadFile, File, Form
+from fastapi.responses import StreamingResponse
 
-from app.models.avance import AvanceCreate, AvanceUpdate, AvanceResponse
+from app.models.avance import AvanceCreate, AvanceUpdate, AvanceResponse, AvanceListItem, AvanceExport, AvanceImportResponse
+from app.models.foto import FotoInfo, SubidaFotoCreate, SubidaFotoEstado, PATRON_HASH_FOTO
+from app.models.proyeccion import Proyeccion
 from app.models.usuario import Usuario
 from app.services.avance_service import AvanceService
+from app.services.foto_service import FotoService
+from app.services.subida_service import SubidaFotoService
+from app.utils.pagination import next_cursor, NEXT_CURSOR_HEADER
 from app.routers.auth import get_current_active_user, require_supervisor_or_admin
 
 router = APIRouter()
 
 
-@router.get("/", response_model=List[AvanceResponse])
+# El orden importa: cada respuesta se serializa con el primer modelo que la valida
+# completa, y los modelos con más campos obligatorios van primero
+@router.get("/", response_model=List[Union[AvanceExport, AvanceResponse, AvanceListItem]])
 async def get_avances(
+    response: Response,
     torre: Optional[str] = Query(None, description="Filtrar por torre"),
     piso: Optional[int] = Query(None, description="Filtrar por piso"),
     sector: Optional[str] = Query(None, description="Filtrar por sector"),
@@ -19,13 +29,15 @@ async def get_avances(
     categoria: Optional[str] = Query(None, description="Filtrar por categoría"),
     fecha_desde: Optional[date] = Query(None, description="Fecha desde"),
     fecha_hasta: Optional[date] = Query(None, description="Fecha hasta"),
-    search: Optional[str] = Query(None, description="Búsqueda en ubicación y observaciones"),
+    search: Optional[str] = Query(None, description="Búsqueda en ubicación y observaciones (ordenada por relevancia)"),
     limit: int = Query(100, ge=1, le=1000, description="Límite de resultados"),
     offset: int = Query(0, ge=0, description="Offset para paginación"),
+    cursor: Optional[str] = Query(None, description="Cursor de la página siguiente (header X-Next-Cursor)"),
+    fields: Proyeccion = Query(Proyeccion.DETAIL, description="Proyección: list (compacta), detail o export"),
     current_user: Usuario = Depends(get_current_active_user)
 ):
     """Obtener lista de avances con filtros"""
-    return await AvanceService.get_all_avances(
+    items = await AvanceService.get_all_avances(
         torre=torre,
         piso=piso,
         sector=sector,
@@ -35,8 +47,88 @@ async def get_avances(
         fecha_hasta=fecha_hasta,
         search=search,
         limit=limit,
-        offset=offset
+        offset=offset,
+        cursor=cursor,
+        fields=fields
     )
+    
+    # Cursor para continuar después del último registro (ausente en la última
+    # página y en búsquedas, que se ordenan por relevancia)
+    siguiente = next_cursor(items, limit) if not search else None
+    if siguiente:
+        response.headers[NEXT_CURSOR_HEADER] = siguiente
+    
+    return items
+
+
+@router.post("/fotos/subidas", response_model=SubidaFotoEstado)
+async def iniciar_subida_foto(
+    datos: SubidaFotoCreate,
+    current_user: Usuario = Depends(get_current_active_user)
+):
+    """Iniciar o retomar la subida por partes de una foto
+
+    Si la respuesta trae `foto`, el servidor ya tiene el archivo. Si no, se
+    envían las partes con PUT desde `offset` y se termina con `/finalizar`;
+    el avance se crea luego con `foto_hash`.
+    """
+    return await SubidaFotoService.iniciar(datos, current_user.id)
+
+
+@router.get("/fotos/subidas/{subida_id}", response_model=SubidaFotoEstado)
+async def get_subida_foto(
+    subida_id: str,
+    current_user: Usuario = Depends(get_current_active_user)
+):
+    """Consultar cuántos bytes de una subida recibió el servidor"""
+    return await SubidaFotoService.obtener(subida_id, current_user.id)
+
+
+@router.put("/fotos/subidas/{subida_id}", response_model=SubidaFotoEstado)
+async def subir_parte_foto(
+    subida_id: str,
+    request: Request,
+    offset: int = Query(..., ge=0, description="Posición del primer byte de la parte"),
+    current_user: Usuario = Depends(get_current_active_user)
+):
+    """Enviar una parte de la foto (cuerpo binario) a partir de `offset`"""
+    return await SubidaFotoService.escribir_parte(subida_id, current_user.id, offset, request.stream())
+
+
+@router.post("/fotos/subidas/{subida_id}/finalizar", response_model=SubidaFotoEstado)
+async def finalizar_subida_foto(
+    subida_id: str,
+    current_user: Usuario = Depends(get_current_active_user)
+):
+    """Verificar la foto recibida completa y guardarla en Storage"""
+    return await SubidaFotoService.finalizar(subida_id, current_user.id)
+
+
+@router.delete("/fotos/subidas/{subida_id}")
+async def cancelar_subida_foto(
+    subida_id: str,
+    current_user: Usuario = Depends(get_current_active_user)
+):
+    """Descartar una subida y lo recibido hasta ahora"""
+    await SubidaFotoService.cancelar(subida_id, current_user.id)
+    return {"message": "Subida cancelada"}
+
+
+@router.get("/fotos/{foto_hash}", response_model=FotoInfo)
+async def get_foto(
+    foto_hash: str = Path(..., pattern=PATRON_HASH_FOTO, description="SHA-256 del archivo en hexadecimal"),
+    current_user: Usuario = Depends(get_current_active_user)
+):
+    """Consultar si una foto ya está subida (para crear el avance enviando solo el hash)"""
+    foto = await FotoService.buscar(foto_hash)
+    
+    if not foto:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Foto no encontrada"
+        )
+    
+    return foto
 
 
 @router.get("/{avance_id}", response_model=AvanceResponse)
@@ -82,6 +174,7 @@ async def create_avance_with_form(
     porcentaje: int = Form(...),
     observaciones: Optional[str] = Form(None),
     foto: Optional[UploadFile] = File(None),
+    foto_hash: Optional[str] = Form(None, pattern=PATRON_HASH_FOTO, description="Hash de una foto ya subida, en vez del archivo"),
     current_user: Usuario = Depends(get_current_active_user)
 ):
     """Crear nuevo avance usando form-data (para subida de archivos)"""
@@ -112,10 +205,39 @@ async def create_avance_with_form(
     return await AvanceService.create_avance(
         avance_data=avance_data,
         usuario_id=current_user.id,
-        foto=foto
+        foto=foto,
+        foto_hash=foto_hash
     )
 
 
+@router.post("/import", response_model=AvanceImportResponse)
+async def import_avances(
+    archivo: UploadFile = File(..., description="Planilla CSV o XLSX con encabezados en la primera fila"),
+    progreso: bool = Query(False, description="Responder NDJSON con un evento de progreso por bloque"),
+    current_user: Usuario = Depends(require_supervisor_or_admin)
+):
+    """Importar avances desde una planilla - Solo supervisores y admins
+
+    Las filas válidas se registran por bloques y las inválidas se informan
+    con su número de fila. Con `progreso=true` la respuesta es NDJSON: un
+    evento `progreso` por bloque y un evento final `resultado`.
+    """
+    lector = await AvanceService.abrir_importacion(archivo)
+    eventos = AvanceService.importar_avances(lector, usuario_id=current_user.id)
+    
+    if progreso:
+        async def ndjson():
+            async for evento in eventos:
+                yield json.dumps(evento, ensure_ascii=False) + "\n"
+        
+        return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+    
+    async for evento in eventos:
+        if evento['tipo'] == 'resultado':
+            evento.pop('tipo')
+            return AvanceImportResponse(**evento)
+
+
 @router.put("/{avance_id}", response_model=AvanceResponse)
 async def update_avance(
     avance_id: str,
@@ -4,7 +4,7 @@ from fastapi import APIRouter, Depends
 from app.models.dashboard import DashboardSummary, TowerProgress, MedicionesEstado, DashboardData
 from app.models.usuario import Usuario
 from app.services.dashboard_service import DashboardService
-from app.routers.auth import get_current_active_user
+from app.routers.auth import get_current_active_user, require_admin
 
 router = APIRouter()
 
@@ -33,22 +33,29 @@ async def get_dashboard_data(current_user: Usuario = Depends(get_current_active_
     return await DashboardService.get_dashboard_data()
 
 
+@router.post("/counters/reconcile")
+async def reconcile_dashboard_counters(current_user: Usuario = Depends(require_admin)):
+    """Recalcular contadores del dashboard y corregir desvíos (solo admins)"""
+    return await DashboardService.reconcile_counters()
+
+
 @router.get("/stats")
 async def get_dashboard_stats(current_user: Usuario = Depends(get_current_active_user)):
     """Obtener estadísticas adicionales del dashboard"""
     try:
         # Usar la función de Supabase para obtener estadísticas
-        from app.services.supabase_client import supabase_client
+        from app.services.supabase_client import supabase_async
         
-        response = supabase_client.rpc('obtener_dashboard_data').execute()
+        response = await supabase_async.rpc('obtener_dashboard_data').execute()
         
         if response.data:
             return response.data
         else:
             # Fallback a datos básicos
-            summary = await DashboardService.get_dashboard_summary()
-            tower_progress = await DashboardService.get_tower_progress()
-            mediciones_estado = await DashboardService.get_mediciones_estado()
+            dashboard_data = await DashboardService.get_dashboard_data()
+            summary = dashboard_data.resumen
+            tower_progress = dashboard_data.progreso_torres
+            mediciones_estado = dashboard_data.mediciones_estado
             
             return {
                 "resumen_general": summary.dict(),
@@ -0,0 +1,73 @@
+from typing import Optional
+from datetime import date, datetime
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+
+from app.models.exportacion import FormatoExportacion
+from app.models.usuario import Usuario
+from app.services.export_service import ExportService, MEDIA_TYPES
+from app.routers.auth import get_current_active_user
+
+router = APIRouter()
+
+# Header con la marca de agua para la siguiente exportación incremental
+WATERMARK_HEADER = "X-Export-Watermark"
+
+
+async def _exportar(
+    tabla: str,
+    formato: FormatoExportacion,
+    fecha_desde: Optional[date],
+    fecha_hasta: Optional[date],
+    torre: Optional[str],
+    actualizado_desde: Optional[datetime]
+) -> StreamingResponse:
+    """Respuesta en streaming con la exportación de una tabla"""
+    contenido, marca = await ExportService.exportar(
+        tabla, formato, fecha_desde, fecha_hasta, torre, actualizado_desde
+    )
+    nombre = f"{tabla}_{date.today().strftime('%Y%m%d')}.{formato.value}"
+    headers = {"Content-Disposition": f'attachment; filename="{nombre}"'}
+    if marca:
+        headers[WATERMARK_HEADER] = marca
+
+    return StreamingResponse(contenido, media_type=MEDIA_TYPES[formato], headers=headers)
+
+
+@router.get("/avances")
+async def export_avances(
+    formato: FormatoExportacion = Query(FormatoExportacion.NDJSON, description="ndjson, csv, parquet o arrow"),
+    fecha_desde: Optional[date] = Query(None, description="Fecha desde (inclusive)"),
+    fecha_hasta: Optional[date] = Query(None, description="Fecha hasta (inclusive)"),
+    torre: Optional[str] = Query(None, pattern="^[A-J]$", description="Filtrar por torre"),
+    actualizado_desde: Optional[datetime] = Query(
+        None, description=f"Filas modificadas después de esta marca (header {WATERMARK_HEADER}); las cercanas a la marca pueden repetirse"
+    ),
+    current_user: Usuario = Depends(get_current_active_user)
+):
+    """Exportar avances en streaming
+
+    Completa: avances vigentes por fecha descendente. Incremental: avances
+    modificados (incluidos los eliminados) por orden de modificación.
+    """
+    return await _exportar('avances', formato, fecha_desde, fecha_hasta, torre, actualizado_desde)
+
+
+@router.get("/mediciones")
+async def export_mediciones(
+    formato: FormatoExportacion = Query(FormatoExportacion.NDJSON, description="ndjson, csv, parquet o arrow"),
+    fecha_desde: Optional[date] = Query(None, description="Fecha desde (inclusive)"),
+    fecha_hasta: Optional[date] = Query(None, description="Fecha hasta (inclusive)"),
+    torre: Optional[str] = Query(None, pattern="^[A-J]$", description="Filtrar por torre"),
+    actualizado_desde: Optional[datetime] = Query(
+        None, description=f"Filas modificadas después de esta marca (header {WATERMARK_HEADER}); las cercanas a la marca pueden repetirse"
+    ),
+    current_user: Usuario = Depends(get_current_active_user)
+):
+    """Exportar mediciones en streaming
+
+    Completa: por fecha descendente. Incremental: mediciones modificadas
+    por orden de modificación. En Parquet y Arrow `valores` se entrega en
+    columnas tipadas (alambrico_t1, potencia_tx, wifi, certificacion, ...).
+    """
+    return await _exportar('mediciones', formato, fecha_desde, fecha_hasta, torre, actualizado_desde)
@@ -1,30 +1,40 @@
-from typing import List, Optional
+from typing import List, Optional, Union
 from datetime import date
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 
-from app.models.medicion import MedicionCreate, MedicionUpdate, MedicionResponse
+from app.models.medicion import MedicionCreate, MedicionUpdate, MedicionResponse, MedicionListItem, MedicionExport, MedicionBulkRequest, MedicionBulkResponse
+from app.models.configuracion import RangosMedicion, ReclasificacionTrabajo
+from app.models.proyeccion import Proyeccion
 from app.models.usuario import Usuario
 from app.services.medicion_service import MedicionService
-from app.routers.auth import get_current_active_user, require_supervisor_or_admin
+from app.services.configuracion_service import ConfiguracionService
+from app.services.reclasificacion_service import ReclasificacionService
+from app.utils.pagination import next_cursor, NEXT_CURSOR_HEADER
+from app.routers.auth import get_current_active_user, require_admin, require_supervisor_or_admin
 
 router = APIRouter()
 
 
-@router.get("/", response_model=List[MedicionResponse])
+# El orden importa: cada respuesta se serializa con el primer modelo que la valida
+# completa, y los modelos con más campos obligatorios van primero
+@router.get("/", response_model=List[Union[MedicionExport, MedicionResponse, MedicionListItem]])
 async def get_mediciones(
+    response: Response,
     torre: Optional[str] = Query(None, description="Filtrar por torre"),
     piso: Optional[int] = Query(None, description="Filtrar por piso"),
     tipo_medicion: Optional[str] = Query(None, description="Filtrar por tipo de medición"),
     estado: Optional[str] = Query(None, description="Filtrar por estado"),
     fecha_desde: Optional[date] = Query(None, description="Fecha desde"),
     fecha_hasta: Optional[date] = Query(None, description="Fecha hasta"),
-    search: Optional[str] = Query(None, description="Búsqueda en identificador y observaciones"),
+    search: Optional[str] = Query(None, description="Búsqueda en identificador y observaciones (ordenada por relevancia)"),
     limit: int = Query(100, ge=1, le=1000, description="Límite de resultados"),
     offset: int = Query(0, ge=0, description="Offset para paginación"),
+    cursor: Optional[str] = Query(None, description="Cursor de la página siguiente (header X-Next-Cursor)"),
+    fields: Proyeccion = Query(Proyeccion.DETAIL, description="Proyección: list (compacta), detail o export"),
     current_user: Usuario = Depends(get_current_active_user)
 ):
     """Obtener lista de mediciones con filtros"""
-    return await MedicionService.get_all_mediciones(
+    items = await MedicionService.get_all_mediciones(
         torre=torre,
         piso=piso,
         tipo_medicion=tipo_medicion,
@@ -33,8 +43,18 @@ async def get_mediciones(
         fecha_hasta=fecha_hasta,
         search=search,
         limit=limit,
-        offset=offset
+        offset=offset,
+        cursor=cursor,
+        fields=fields
     )
+    
+    # Cursor para continuar después del último registro (ausente en la última
+    # página y en búsquedas, que se ordenan por relevancia)
+    siguiente = next_cursor(items, limit) if not search else None
+    if siguiente:
+        response.headers[NEXT_CURSOR_HEADER] = siguiente
+    
+    return items
 
 
 @router.get("/{medicion_id}", response_model=MedicionResponse)
@@ -66,6 +86,18 @@ async def create_medicion(
     )
 
 
+@router.post("/bulk", response_model=MedicionBulkResponse)
+async def create_mediciones_bulk(
+    bulk_data: MedicionBulkRequest,
+    current_user: Usuario = Depends(get_current_active_user)
+):
+    """Registrar un lote de mediciones con resultado por ítem"""
+    return await MedicionService.create_mediciones_bulk(
+        items=bulk_data.items,
+        usuario_id=current_user.id
+    )
+
+
 @router.put("/{medicion_id}", response_model=MedicionResponse)
 async def update_medicion(
     medicion_id: str,
@@ -104,8 +136,10 @@ async def delete_medicion(
 @router.get("/tipos/rangos")
 async def get_rangos_medicion(current_user: Usuario = Depends(get_current_active_user)):
     """Obtener rangos de medición para validación en frontend"""
+    rangos = await ConfiguracionService.get_rangos_medicion()
     return {
-        "rangos": MedicionService.RANGOS_MEDICION,
+        "rangos": rangos.dict()["rangos"],
+        "margen_advertencia": rangos.margen_advertencia,
         "tipos": [
             {"value": "alambrico-t1", "label": "Alámbrico T1", "unidad": "dBμV"},
             {"value": "alambrico-t2", "label": "Alámbrico T2", "unidad": "dBμV"},
@@ -114,4 +148,47 @@ async def get_rangos_medicion(current_user: Usuario = Depends(get_current_active
             {"value": "wifi", "label": "WiFi", "unidad": "dBm"},
             {"value": "certificacion", "label": "Certificación", "unidad": "Estado"}
         ]
-    }
\ No newline at end of file
+    }
+
+@router.put("/tipos/rangos", response_model=ReclasificacionTrabajo)
+async def update_rangos_medicion(
+    rangos: RangosMedicion,
+    current_user: Usuario = Depends(require_admin)
+):
+    """Actualizar rangos de medición y reclasificar las mediciones existentes - Solo admins
+
+    Devuelve el trabajo de reclasificación, que continúa en segundo plano.
+    """
+    await ConfiguracionService.update_rangos_medicion(rangos)
+    return await ReclasificacionService.start(rangos, usuario_id=current_user.id)
+
+
+@router.get("/reclasificaciones/ultima", response_model=ReclasificacionTrabajo)
+async def get_ultima_reclasificacion(current_user: Usuario = Depends(get_current_active_user)):
+    """Obtener el progreso de la reclasificación más reciente"""
+    trabajo = await ReclasificacionService.get_trabajo()
+
+    if not trabajo:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No hay reclasificaciones registradas"
+        )
+
+    return trabajo
+
+
+@router.get("/reclasificaciones/{trabajo_id}", response_model=ReclasificacionTrabajo)
+async def get_reclasificacion(
+    trabajo_id: str,
+    current_user: Usuario = Depends(get_current_active_user)
+):
+    """Obtener el progreso de una reclasificación"""
+    trabajo = await ReclasificacionService.get_trabajo(trabajo_id)
+
+    if not trabajo:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Reclasificación no encontrada"
+        )
+
+    return trabajo
@@ -2,7 +2,7 @@
 Servicios para interactuar con Supabase y lógica de negocio
 """
 
-from .supabase_client import supabase_client
+from .supabase_client import supabase_client, supabase_async
 from .auth_service import AuthService
 from .usuario_service import UsuarioService
 from .avance_service import AvanceService
@@ -11,6 +11,7 @@ from .dashboard_service import DashboardService
 
 __all__ = [
     "supabase_client",
+    "supabase_async",
     "AuthService",
     "UsuarioService", 
     "AvanceService",
@@ -1,3 +1,6 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
@@ -7,20 +10,44 @@ from fastapi import HTTPException, status
 from app.config import settings
 from app.models.auth import TokenData
 from app.models.usuario import Usuario
-from app.services.supabase_client import supabase_client
+from app.services.supabase_client import supabase_async
+from app.utils.cache import TTLCache
 
 # Configuración de encriptación
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# Pool acotado para bcrypt: verificar un hash bloquea ~100 ms de CPU y no
+# debe ejecutarse en el event loop
+_hash_executor = ThreadPoolExecutor(max_workers=settings.AUTH_HASH_WORKERS, thread_name_prefix='bcrypt')
+
+# Códigos de PostgREST / PostgreSQL para una función inexistente
+_RPC_NO_DISPONIBLE = ('PGRST202', '42883')
+
+logger = logging.getLogger(__name__)
+
+# Usuarios autenticados, con clave user_id (se invalida al editar o desactivar)
+usuarios_cache = TTLCache('usuarios', ttl=settings.USER_CACHE_TTL)
+
 
 class AuthService:
     """Servicio de autenticación"""
     
+    # None hasta el primer login: indica si existe la función RPC authenticate_user
+    _rpc_disponible: Optional[bool] = None
+    
     @staticmethod
     def verify_password(plain_password: str, hashed_password: str) -> bool:
         """Verificar contraseña"""
         return pwd_context.verify(plain_password, hashed_password)
     
+    @staticmethod
+    async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+        """Verificar contraseña en el pool de bcrypt sin bloquear el event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            _hash_executor, pwd_context.verify, plain_password, hashed_password
+        )
+    
     @staticmethod
     def get_password_hash(password: str) -> str:
         """Generar hash de contraseña"""
@@ -66,83 +93,92 @@ class AuthService:
     async def authenticate_user(username: str, password: str) -> Optional[Usuario]:
         """Autenticar usuario"""
         try:
-            print(f"🔐 Intentando autenticar usuario: {username}")
-            
-            # Intentar primero con función RPC si existe
-            try:
-                response = supabase_client.rpc('authenticate_user', {
-                    'username_param': username,
-                    'password_param': password
-                }).execute()
-                
-                if response.data and len(response.data) > 0:
-                    auth_result = response.data[0]
-                    
-                    # Verificar si la autenticación fue exitosa
-                    if auth_result.get('success', False):
-                        print(f"✅ Autenticación RPC exitosa para: {username}")
-                        
-                        # Crear objeto Usuario con los datos retornados
-                        user_data = {
-                            'id': auth_result['user_id'],
-                            'username': auth_result['username'],
-                            'email': auth_result['email'],
-                            'nombre': auth_result['nombre'],
-                            'rol': auth_result['rol'],
-                            'activo': auth_result['activo'],
-                            'ultimo_acceso': auth_result['ultimo_acceso'],
-                            'created_at': datetime.utcnow(),
-                            'updated_at': datetime.utcnow()
-                        }
-                        
-                        return Usuario(**user_data)
+            # La disponibilidad de la RPC se detecta en el primer login
+            if AuthService._rpc_disponible is not False:
+                try:
+                    return await AuthService._authenticate_rpc(username, password)
+                except Exception as rpc_error:
+                    if getattr(rpc_error, 'code', None) in _RPC_NO_DISPONIBLE:
+                        AuthService._rpc_disponible = False
+                        logger.warning("Función RPC authenticate_user no disponible, se usará la consulta directa")
                     else:
-                        print(f"❌ Autenticación RPC falló: {auth_result.get('message', 'Error desconocido')}")
-                        return None
-                        
-            except Exception as rpc_error:
-                print(f"⚠️ Función RPC no disponible, usando método directo: {rpc_error}")
-                
-                # Método alternativo: consulta directa a la tabla usuarios
-                response = supabase_client.table('usuarios').select('*').eq('username', username).eq('activo', True).execute()
-                
-                if not response.data or len(response.data) == 0:
-                    print(f"❌ Usuario no encontrado: {username}")
-                    return None
-                
-                user_data = response.data[0]
-                stored_hash = user_data.get('password_hash')
-                
-                if not stored_hash:
-                    print(f"❌ No hay hash de contraseña para: {username}")
-                    return None
-                
-                # Verificar contraseña
-                if AuthService.verify_password(password, stored_hash):
-                    print(f"✅ Autenticación directa exitosa para: {username}")
-                    
-                    # Actualizar último acceso
-                    try:
-                        supabase_client.table('usuarios').update({
-                            'ultimo_acceso': datetime.utcnow().isoformat()
-                        }).eq('id', user_data['id']).execute()
-                    except:
-                        pass  # No crítico si falla la actualización
-                    
-                    return Usuario(**user_data)
-                else:
-                    print(f"❌ Contraseña incorrecta para: {username}")
-                    return None
+                        logger.warning("Error en RPC authenticate_user, usando consulta directa: %s", rpc_error)
+            
+            return await AuthService._authenticate_direct(username, password)
                     
         except Exception as e:
-            print(f"💥 Error general en autenticación: {e}")
+            logger.error("Error general en autenticación: %s", e)
+            return None
+    
+    @staticmethod
+    async def _authenticate_rpc(username: str, password: str) -> Optional[Usuario]:
+        """Autenticar con la función RPC (bcrypt se verifica en la base de datos)"""
+        response = await supabase_async.rpc('authenticate_user', {
+            'username_param': username,
+            'password_param': password
+        }).execute()
+        AuthService._rpc_disponible = True
+        
+        if not response.data:
+            return None
+        
+        auth_result = response.data[0]
+        
+        # Verificar si la autenticación fue exitosa
+        if not auth_result.get('success', False):
+            logger.debug("Autenticación RPC falló para %s: %s", username, auth_result.get('message'))
+            return None
+        
+        # Crear objeto Usuario con los datos retornados
+        user_data = {
+            'id': auth_result['user_id'],
+            'username': auth_result['username'],
+            'email': auth_result['email'],
+            'nombre': auth_result['nombre'],
+            'rol': auth_result['rol'],
+            'activo': auth_result['activo'],
+            'ultimo_acceso': auth_result['ultimo_acceso'],
+            'created_at': datetime.utcnow(),
+            'updated_at': datetime.utcnow()
+        }
+        
+        return Usuario(**user_data)
+    
+    @staticmethod
+    async def _authenticate_direct(username: str, password: str) -> Optional[Usuario]:
+        """Autenticar consultando la tabla usuarios y verificando bcrypt en el pool"""
+        response = await supabase_async.table('usuarios').select('*').eq('username', username).eq('activo', True).execute()
+        
+        if not response.data:
+            logger.debug("Usuario no encontrado: %s", username)
+            return None
+        
+        user_data = response.data[0]
+        stored_hash = user_data.get('password_hash')
+        
+        if not stored_hash:
+            logger.warning("No hay hash de contraseña para: %s", username)
+            return None
+        
+        if not await AuthService.verify_password_async(password, stored_hash):
+            logger.debug("Contraseña incorrecta para: %s", username)
             return None
+        
+        # Actualizar último acceso
+        try:
+            await supabase_async.table('usuarios').update({
+                'ultimo_acceso': datetime.utcnow().isoformat()
+            }).eq('id', user_data['id']).execute()
+        except Exception:
+            pass  # No crítico si falla la actualización
+        
+        return Usuario(**user_data)
     
     @staticmethod
     async def change_user_password(user_id: str, old_password: str, new_password: str) -> bool:
         """Cambiar contraseña de usuario"""
         try:
-            response = supabase_client.rpc('change_password', {
+            response = await supabase_async.rpc('change_password', {
                 'user_id_param': user_id,
                 'old_password': old_password,
                 'new_password': new_password
@@ -158,24 +194,44 @@ class AuthService:
             print(f"Error cambiando contraseña: {e}")
             return False
     
+    @staticmethod
+    async def _load_active_user(user_id: str) -> Optional[Usuario]:
+        """Consultar usuario activo por ID"""
+        response = await supabase_async.table('usuarios').select('*').eq('id', user_id).eq('activo', True).execute()
+        
+        if not response.data:
+            return None
+        
+        return Usuario(**response.data[0])
+    
+    @staticmethod
+    def invalidate_user(user_id: str):
+        """Quitar usuario del cache tras modificarlo o desactivarlo"""
+        usuarios_cache.invalidate(user_id)
+    
     @staticmethod
     async def get_current_user(token: str) -> Usuario:
         """Obtener usuario actual desde token"""
         token_data = AuthService.verify_token(token)
         
         try:
-            response = supabase_client.table('usuarios').select('*').eq('id', token_data.user_id).eq('activo', True).execute()
-            
-            if not response.data:
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail="Usuario no encontrado"
-                )
-            
-            return Usuario(**response.data[0])
-            
+            # Los usuarios no encontrados no se cachean: uno creado o
+            # reactivado después debe poder entrar sin esperar el TTL
+            user = usuarios_cache.get(token_data.user_id)
+            if user is None:
+                user = await AuthService._load_active_user(token_data.user_id)
+                if user is not None:
+                    usuarios_cache.set(token_data.user_id, user)
         except Exception as e:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Error al obtener usuario"
-            )
\ No newline at end of file
+            )
+        
+        if user is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Usuario no encontrado"
+            )
+        
+        return user
@@ -1,11 +1,63 @@
-from typing import List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 from datetime import datetime, date
 from fastapi import HTTPException, status, UploadFile
-import uuid
+from fastapi.concurrency import run_in_threadpool
+from postgrest.types import ReturnMethod
+from pydantic import ValidationError
+import asyncio
 
-from app.models.avance import Avance, AvanceCreate, AvanceUpdate, AvanceResponse
-from app.services.supabase_client import supabase_client
+from app.models.avance import (
+    Avance, AvanceCreate, AvanceUpdate, AvanceResponse, AvanceListItem, AvanceExport,
+    AvanceImportError, AvanceImportResponse, TipoEspacio
+)
+from app.models.foto import FotoInfo
+from app.models.proyeccion import Proyeccion
+from app.services.supabase_client import supabase_async, returning
+from app.services.dashboard_service import DashboardService
+from app.services.foto_service import FotoService
 from app.config import settings
+from app.utils.pagination import decode_cursor, apply_keyset
+from app.utils.validators import (
+    validate_torre, validate_piso, validate_torre_sector_combination, validate_ubicacion_format
+)
+from app.utils.importacion import LectorFilas, formato_archivo, parse_fecha
+from app.utils.upload_limit import ArchivoDemasiadoGrande, hash_archivo, leer_por_bloques
+
+
+# Columnas y modelo de respuesta de cada proyección de los listados
+_SELECT_AVANCES = {
+    Proyeccion.LIST: '''
+        id, fecha, torre, ubicacion, categoria, porcentaje, sync_status,
+        usuarios!avances_usuario_id_fkey(nombre)
+    ''',
+    Proyeccion.DETAIL: '''
+        id, fecha, torre, piso, sector, tipo_espacio, ubicacion, categoria, porcentaje,
+        observaciones, foto_url, thumb_url, medium_url, sync_status, created_at, updated_at,
+        usuarios!avances_usuario_id_fkey(id, nombre, username, rol)
+    ''',
+    Proyeccion.EXPORT: '''
+        *,
+        usuarios!avances_usuario_id_fkey(id, nombre, username, rol)
+    '''
+}
+
+_MODELO_AVANCES = {
+    Proyeccion.LIST: AvanceListItem,
+    Proyeccion.DETAIL: AvanceResponse,
+    Proyeccion.EXPORT: AvanceExport
+}
+
+# Representación completa (fila + usuario) de las lecturas por ID y las escrituras
+_SELECT_AVANCE_COMPLETO = '''
+    *,
+    usuarios!avances_usuario_id_fkey(id, nombre, username, rol)
+'''
+
+# Columnas que se leen de una planilla de importación
+_COLUMNAS_IMPORTACION = (
+    'fecha', 'torre', 'piso', 'sector', 'tipo_espacio', 'ubicacion', 'categoria', 'porcentaje', 'observaciones'
+)
+_COLUMNAS_IMPORTACION_OBLIGATORIAS = ('fecha', 'torre', 'tipo_espacio', 'ubicacion', 'categoria', 'porcentaje')
 
 
 class AvanceService:
@@ -22,48 +74,71 @@ class AvanceService:
         fecha_hasta: Optional[date] = None,
         search: Optional[str] = None,
         limit: int = 100,
-        offset: int = 0
-    ) -> List[AvanceResponse]:
+        offset: int = 0,
+        cursor: Optional[str] = None,
+        fields: Proyeccion = Proyeccion.DETAIL
+    ) -> list:
         """Obtener avances con filtros"""
+        # Con cursor se pagina por (fecha, id) y se ignora el offset; las búsquedas
+        # se ordenan por relevancia y paginan con offset
+        try:
+            keyset = decode_cursor(cursor) if cursor else None
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+        
         try:
-            query = supabase_client.table('avances').select('''
-                *,
-                usuarios!avances_usuario_id_fkey(id, nombre, username, rol)
-            ''').is_('deleted_at', 'null')
-            
-            # Aplicar filtros
-            if torre:
-                query = query.eq('torre', torre)
-            if piso:
-                query = query.eq('piso', piso)
-            if sector:
-                query = query.eq('sector', sector)
-            if tipo_espacio:
-                query = query.eq('tipo_espacio', tipo_espacio)
-            if categoria:
-                query = query.ilike('categoria', f'%{categoria}%')
-            if fecha_desde:
-                query = query.gte('fecha', fecha_desde.isoformat())
-            if fecha_hasta:
-                query = query.lte('fecha', fecha_hasta.isoformat())
             if search:
-                query = query.or_(f'ubicacion.ilike.%{search}%,observaciones.ilike.%{search}%')
-            
-            # Ordenar y paginar
-            response = query.order('fecha', desc=True).range(offset, offset + limit - 1).execute()
+                # Búsqueda indexada (texto completo + trigramas) ordenada por relevancia;
+                # el término viaja como parámetro de la función, no dentro del filtro
+                response = await supabase_async.rpc('buscar_avances', {
+                    'termino': search,
+                    'p_torre': torre,
+                    'p_piso': piso,
+                    'p_sector': sector,
+                    'p_tipo_espacio': tipo_espacio,
+                    'p_categoria': categoria,
+                    'p_fecha_desde': fecha_desde.isoformat() if fecha_desde else None,
+                    'p_fecha_hasta': fecha_hasta.isoformat() if fecha_hasta else None,
+                    'limite': limit,
+                    'desplazamiento': offset
+                }).execute()
+            else:
+                query = supabase_async.table('avances').select(_SELECT_AVANCES[fields]).is_('deleted_at', 'null')
+                
+                # Aplicar filtros
+                if torre:
+                    query = query.eq('torre', torre)
+                if piso:
+                    query = query.eq('piso', piso)
+                if sector:
+                    query = query.eq('sector', sector)
+                if tipo_espacio:
+                    query = query.eq('tipo_espacio', tipo_espacio)
+                if categoria:
+                    query = query.ilike('categoria', f'%{categoria}%')
+                if fecha_desde:
+                    query = query.gte('fecha', fecha_desde.isoformat())
+                if fecha_hasta:
+                    query = query.lte('fecha', fecha_hasta.isoformat())
+                
+                # Ordenar y paginar
+                query = apply_keyset(query, keyset)
+                if keyset:
+                    response = await query.limit(limit).execute()
+                else:
+                    response = await query.range(offset, offset + limit - 1).execute()
             
             # Formatear respuesta
             avances = []
+            modelo = _MODELO_AVANCES[fields]
             for avance_data in response.data:
                 usuario_data = avance_data.pop('usuarios', None)
-                avance_response = AvanceResponse(**avance_data)
+                avance_response = modelo(**avance_data)
                 if usuario_data:
-                    avance_response.usuario = {
-                        'id': usuario_data['id'],
-                        'nombre': usuario_data['nombre'],
-                        'username': usuario_data['username'],
-                        'rol': usuario_data['rol']
-                    }
+                    avance_response.usuario = usuario_data
                 avances.append(avance_response)
             
             return avances
@@ -74,31 +149,32 @@ class AvanceService:
                 detail=f"Error al obtener avances: {str(e)}"
             )
     
+    @staticmethod
+    def _format_avance(avance_data: dict) -> AvanceResponse:
+        """Convertir fila con usuario embebido al modelo de respuesta"""
+        usuario_data = avance_data.pop('usuarios', None)
+        avance_response = AvanceResponse(**avance_data)
+        
+        if usuario_data:
+            avance_response.usuario = {
+                'id': usuario_data['id'],
+                'nombre': usuario_data['nombre'],
+                'username': usuario_data['username'],
+                'rol': usuario_data['rol']
+            }
+        
+        return avance_response
+    
     @staticmethod
     async def get_avance_by_id(avance_id: str) -> Optional[AvanceResponse]:
         """Obtener avance por ID"""
         try:
-            response = supabase_client.table('avances').select('''
-                *,
-                usuarios!avances_usuario_id_fkey(id, nombre, username, rol)
-            ''').eq('id', avance_id).is_('deleted_at', 'null').execute()
+            response = await supabase_async.table('avances').select(_SELECT_AVANCE_COMPLETO).eq('id', avance_id).is_('deleted_at', 'null').execute()
             
             if not response.data:
                 return None
             
-            avance_data = response.data[0]
-            usuario_data = avance_data.pop('usuarios', None)
-            avance_response = AvanceResponse(**avance_data)
-            
-            if usuario_data:
-                avance_response.usuario = {
-                    'id': usuario_data['id'],
-                    'nombre': usuario_data['nombre'],
-                    'username': usuario_data['username'],
-                    'rol': usuario_data['rol']
-                }
-            
-            return avance_response
+            return AvanceService._format_avance(response.data[0])
             
         except Exception as e:
             raise HTTPException(
@@ -107,8 +183,17 @@ class AvanceService:
             )
     
     @staticmethod
-    async def create_avance(avance_data: AvanceCreate, usuario_id: str, foto: Optional[UploadFile] = None) -> AvanceResponse:
-        """Crear nuevo avance"""
+    async def create_avance(
+        avance_data: AvanceCreate,
+        usuario_id: str,
+        foto: Optional[UploadFile] = None,
+        foto_hash: Optional[str] = None
+    ) -> AvanceResponse:
+        """Crear nuevo avance
+
+        La foto se adjunta como archivo o, si ya fue subida antes (el cliente
+        lo consulta con GET /avances/fotos/{hash}), solo con su hash.
+        """
         try:
             # Preparar datos del avance
             avance_dict = avance_data.dict()
@@ -118,13 +203,29 @@ class AvanceService:
                 'sync_status': 'synced'
             })
             
-            # Subir foto si se proporciona
+            # Subir foto si se proporciona, o reutilizar la ya subida con ese hash
+            registrada = None
             if foto:
-                foto_url = await AvanceService._upload_foto(foto, usuario_id)
-                avance_dict['foto_url'] = foto_url
+                registrada = await AvanceService._upload_foto(foto, usuario_id)
+            elif foto_hash:
+                registrada = await FotoService.buscar(foto_hash)
+                if not registrada:
+                    raise HTTPException(
+                        status_code=status.HTTP_404_NOT_FOUND,
+                        detail="Foto no encontrada: envíe el archivo"
+                    )
+            
+            if registrada:
+                avance_dict.update({
+                    'foto_url': registrada.url,
+                    'thumb_url': registrada.thumb_url,
+                    'medium_url': registrada.medium_url
+                })
             
             # Insertar en base de datos
-            response = supabase_client.table('avances').insert(avance_dict).execute()
+            response = await returning(
+                supabase_async.table('avances').insert(avance_dict), _SELECT_AVANCE_COMPLETO
+            ).execute()
             
             if not response.data:
                 raise HTTPException(
@@ -132,8 +233,14 @@ class AvanceService:
                     detail="Error al crear avance"
                 )
             
-            # Obtener avance completo con usuario
-            return await AvanceService.get_avance_by_id(response.data[0]['id'])
+            DashboardService.invalidate_cache()
+            
+            # Miniatura y versión mediana en segundo plano
+            if registrada and not registrada.thumb_url:
+                FotoService.programar(registrada.url)
+            
+            # La inserción ya devuelve la fila completa con usuario
+            return AvanceService._format_avance(response.data[0])
             
         except HTTPException:
             raise
@@ -158,12 +265,17 @@ class AvanceService:
             
             update_data['sync_status'] = 'synced'
             
-            response = supabase_client.table('avances').update(update_data).eq('id', avance_id).is_('deleted_at', 'null').execute()
+            response = await returning(
+                supabase_async.table('avances').update(update_data).eq('id', avance_id).is_('deleted_at', 'null'),
+                _SELECT_AVANCE_COMPLETO
+            ).execute()
             
             if not response.data:
                 return None
             
-            return await AvanceService.get_avance_by_id(avance_id)
+            DashboardService.invalidate_cache()
+            
+            return AvanceService._format_avance(response.data[0])
             
         except HTTPException:
             raise
@@ -177,12 +289,16 @@ class AvanceService:
     async def delete_avance(avance_id: str) -> bool:
         """Eliminar avance (soft delete)"""
         try:
-            response = supabase_client.table('avances').update({
+            response = await supabase_async.table('avances').update({
                 'deleted_at': datetime.utcnow().isoformat(),
                 'sync_status': 'synced'
             }).eq('id', avance_id).execute()
             
-            return len(response.data) > 0
+            if not response.data:
+                return False
+            
+            DashboardService.invalidate_cache()
+            return True
             
         except Exception as e:
             raise HTTPException(
@@ -191,8 +307,185 @@ class AvanceService:
             )
     
     @staticmethod
-    async def _upload_foto(foto: UploadFile, usuario_id: str) -> str:
-        """Subir foto a Supabase Storage"""
+    async def abrir_importacion(archivo: UploadFile) -> LectorFilas:
+        """Validar la planilla subida y abrir su lector
+
+        Se llama antes de empezar a responder para que un archivo inválido se
+        informe con un 4xx y no a mitad de la importación.
+        """
+        if archivo.size is not None and archivo.size > settings.MAX_IMPORT_FILE_SIZE:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"El archivo supera el máximo de {settings.MAX_IMPORT_FILE_SIZE // (1024 * 1024)}MB"
+            )
+        
+        try:
+            formato = formato_archivo(archivo.filename)
+            lector = await run_in_threadpool(LectorFilas, archivo.file, formato)
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"No se pudo leer el archivo: {str(e)}"
+            )
+        
+        faltantes = [columna for columna in _COLUMNAS_IMPORTACION_OBLIGATORIAS if columna not in lector.columnas]
+        if faltantes:
+            lector.close()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Faltan columnas en la planilla: {', '.join(faltantes)}"
+            )
+        
+        return lector
+    
+    @staticmethod
+    def _validar_fila_importacion(fila: Dict[str, Any]) -> Tuple[Optional[AvanceCreate], List[str]]:
+        """Validar una fila de planilla con el modelo y las reglas de la obra"""
+        datos = {columna: fila[columna] for columna in _COLUMNAS_IMPORTACION if columna in fila}
+        datos['fecha'] = parse_fecha(datos.get('fecha'))
+        # Las planillas se escriben a mano: tolerar mayúsculas en los valores fijos
+        if isinstance(datos.get('tipo_espacio'), str):
+            datos['tipo_espacio'] = datos['tipo_espacio'].lower()
+        if isinstance(datos.get('sector'), str):
+            datos['sector'] = datos['sector'].capitalize()
+        if isinstance(datos.get('torre'), str):
+            datos['torre'] = datos['torre'].upper()
+        
+        try:
+            avance = AvanceCreate(**datos)
+        except ValidationError as e:
+            return None, [
+                f"{' -> '.join(str(loc) for loc in error['loc'])}: {error['msg']}"
+                for error in e.errors()
+            ]
+        
+        errores = []
+        sector = avance.sector.value if avance.sector else None
+        if not validate_torre(avance.torre):
+            errores.append(f"torre: {avance.torre} no pertenece a la obra")
+        if avance.piso is not None and not validate_piso(avance.piso):
+            errores.append(f"piso: {avance.piso} no pertenece a la obra")
+        if not validate_torre_sector_combination(avance.torre, sector):
+            errores.append(f"sector: la torre {avance.torre} no tiene sector {sector}")
+        if avance.tipo_espacio == TipoEspacio.UNIDAD and not validate_ubicacion_format(
+            avance.ubicacion, avance.torre, avance.piso
+        ):
+            errores.append(
+                f"ubicacion: {avance.ubicacion} no corresponde a la torre {avance.torre} "
+                f"y piso {avance.piso} (formato torre + piso de 2 dígitos + unidad, ej: A0101)"
+            )
+        
+        return (None, errores) if errores else (avance, [])
+    
+    @staticmethod
+    async def _insertar_bloque(filas: List[dict]):
+        """Insertar un bloque de avances ya validados en una sola sentencia"""
+        await supabase_async.table('avances').insert(filas, returning=ReturnMethod.minimal).execute()
+    
+    @staticmethod
+    async def _esperar_bloque(insercion, errores: List[AvanceImportError]) -> int:
+        """Esperar la inserción de un bloque; devuelve los avances creados
+
+        Si el bloque falla, sus filas se informan como rechazadas con el error
+        de la base de datos.
+        """
+        if insercion is None:
+            return 0
+        
+        tarea, numeros = insercion
+        try:
+            await tarea
+            return len(numeros)
+        except Exception as e:
+            errores.extend(
+                AvanceImportError(fila=numero, errores=[f"Error al insertar el bloque: {str(e)}"])
+                for numero in numeros
+            )
+            return 0
+    
+    @staticmethod
+    async def importar_avances(lector: LectorFilas, usuario_id: str) -> AsyncIterator[dict]:
+        """Importar las filas de una planilla por bloques
+
+        Entrega un evento `progreso` por bloque leído y al final un evento
+        `resultado` con el reporte de filas rechazadas (AvanceImportResponse).
+        Cada bloque de BULK_INSERT_CHUNK_SIZE filas válidas se inserta en su
+        propia transacción mientras se lee y valida el siguiente.
+        """
+        total = 0
+        creados = 0
+        errores: List[AvanceImportError] = []
+        error_lectura = None
+        insercion = None
+        
+        try:
+            while True:
+                try:
+                    bloque = await run_in_threadpool(lector.siguientes, settings.BULK_INSERT_CHUNK_SIZE)
+                except Exception as e:
+                    error_lectura = f"Error al leer el archivo después de la fila {lector.fila_actual}: {str(e)}"
+                    break
+                
+                if not bloque:
+                    break
+                
+                total += len(bloque)
+                filas = []
+                numeros = []
+                for numero, fila in bloque:
+                    avance, errores_fila = AvanceService._validar_fila_importacion(fila)
+                    if errores_fila:
+                        errores.append(AvanceImportError(fila=numero, errores=errores_fila))
+                        continue
+                    
+                    datos = avance.dict()
+                    datos.update({
+                        'fecha': avance.fecha.isoformat(),
+                        'obra_id': settings.OBRA_ID,
+                        'usuario_id': usuario_id,
+                        'sync_status': 'synced'
+                    })
+                    filas.append(datos)
+                    numeros.append(numero)
+                
+                # Un solo bloque en vuelo: se espera el anterior antes de lanzar este
+                creados += await AvanceService._esperar_bloque(insercion, errores)
+                insercion = (asyncio.create_task(AvanceService._insertar_bloque(filas)), numeros) if filas else None
+                
+                yield {
+                    'tipo': 'progreso',
+                    'procesadas': total,
+                    'creados': creados,
+                    'rechazados': len(errores),
+                    'total_estimado': lector.total_estimado
+                }
+            
+            creados += await AvanceService._esperar_bloque(insercion, errores)
+        finally:
+            lector.close()
+        
+        if creados:
+            DashboardService.invalidate_cache()
+        
+        errores.sort(key=lambda error: error.fila)
+        resultado = AvanceImportResponse(
+            total=total,
+            creados=creados,
+            rechazados=len(errores),
+            errores=errores,
+            error=error_lectura
+        )
+        yield {'tipo': 'resultado', **resultado.dict()}
+    
+    @staticmethod
+    async def _upload_foto(foto: UploadFile, usuario_id: str) -> FotoInfo:
+        """Subir foto a Supabase Storage, guardada por el hash de su contenido
+
+        Si ya hay una foto con el mismo contenido se reutiliza sin volver a
+        subirla. El archivo se envía por bloques de UPLOAD_CHUNK_SIZE a medida
+        que se lee, sin cargarlo completo en memoria, y la subida se corta si
+        supera MAX_FILE_SIZE.
+        """
         try:
             # Validar tipo de archivo
             if foto.content_type not in settings.ALLOWED_IMAGE_TYPES:
@@ -201,37 +494,37 @@ class AvanceService:
                     detail="Tipo de archivo no permitido"
                 )
             
-            # Validar tamaño
-            if foto.size > settings.MAX_FILE_SIZE:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Archivo demasiado grande"
-                )
-            
-            # Generar nombre único
-            file_extension = foto.filename.split('.')[-1] if foto.filename else 'jpg'
-            file_name = f"{uuid.uuid4()}.{file_extension}"
-            file_path = f"los-encinos/{datetime.now().year}/{datetime.now().month:02d}/avances/{file_name}"
-            
-            # Leer contenido del archivo
-            file_content = await foto.read()
-            
-            # Subir a Supabase Storage
-            response = supabase_client.storage.from_('avances-fotos').upload(file_path, file_content)
+            # Validar tamaño declarado (el leído se controla durante la subida)
+            if foto.size is not None and foto.size > settings.MAX_FILE_SIZE:
+                raise ArchivoDemasiadoGrande()
             
-            if response.status_code != 200:
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail="Error al subir foto"
-                )
-            
-            # Obtener URL pública
-            public_url = supabase_client.storage.from_('avances-fotos').get_public_url(file_path)
+            # Hash del contenido, leyendo el archivo ya recibido en un hilo aparte
+            foto_hash = await run_in_threadpool(
+                hash_archivo, foto.file, settings.MAX_FILE_SIZE, settings.UPLOAD_CHUNK_SIZE
+            )
+            # Después del hash el archivo quedó al final: su posición es el tamaño
+            tamano = foto.size if foto.size is not None else foto.file.tell()
+            existente = await FotoService.buscar(foto_hash)
+            if existente:
+                return existente
             
-            return public_url
+            # Subir a Supabase Storage en streaming
+            await foto.seek(0)
+            return await FotoService.subir(
+                leer_por_bloques(foto, settings.MAX_FILE_SIZE, settings.UPLOAD_CHUNK_SIZE),
+                foto_hash,
+                foto.content_type,
+                tamano,
+                usuario_id
+            )
             
         except HTTPException:
             raise
+        except ArchivoDemasiadoGrande:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail="Archivo demasiado grande"
+            )
         except Exception as e:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -0,0 +1,82 @@
+from fastapi import HTTPException, status
+
+from app.models.configuracion import RangosMedicion
+from app.services.supabase_client import supabase_async
+from app.config import settings
+from app.utils.cache import TTLCache
+
+
+# Valores por defecto si app_config aún no define los rangos
+RANGOS_MEDICION_DEFAULT = {
+    'alambrico': {'min': 45, 'max': 75},
+    'coaxial': {'min': 45, 'max': 75},
+    'fibra_potencia': {'min': -30, 'max': -8},
+    'wifi': {'min': -80, 'max': -30}
+}
+MARGEN_ADVERTENCIA_DEFAULT = 5
+
+# Fila de app_config y claves de settings con los rangos
+_APP_CONFIG_ID = 'app-config'
+_CLAVE_RANGOS = 'rangosMedicion'
+_CLAVE_MARGEN = 'margenAdvertencia'
+
+# Configuración leída de app_config (se invalida al modificarla)
+configuracion_cache = TTLCache('configuracion', ttl=settings.CONFIG_CACHE_TTL)
+
+
+class ConfiguracionService:
+    """Servicio para la configuración de la obra guardada en app_config"""
+
+    @staticmethod
+    async def get_rangos_medicion() -> RangosMedicion:
+        """Obtener rangos de medición vigentes (cacheados CONFIG_CACHE_TTL segundos)
+
+        Si app_config no se puede leer se usan los rangos por defecto solo
+        para esta llamada, sin cachearlos: el trigger de SQL sigue leyendo
+        la configuración guardada y la API debe volver a ella en cuanto
+        responda.
+        """
+        try:
+            return await configuracion_cache.get_or_set('rangos_medicion', ConfiguracionService._load_rangos_medicion)
+        except Exception as e:
+            print(f"⚠️  No se pudo leer app_config, usando rangos por defecto: {e}")
+            return RangosMedicion(rangos=RANGOS_MEDICION_DEFAULT, margen_advertencia=MARGEN_ADVERTENCIA_DEFAULT)
+
+    @staticmethod
+    async def _load_rangos_medicion() -> RangosMedicion:
+        """Leer rangos de app_config.settings (sin fila, los valores por defecto)"""
+        response = await supabase_async.table('app_config').select('settings').eq('id', _APP_CONFIG_ID).limit(1).execute()
+        config = (response.data[0].get('settings') if response.data else None) or {}
+
+        # Igual que validar_rango_medicion en SQL: cada rango que falte toma su
+        # valor por defecto, así la API y el trigger clasifican igual
+        margen = config.get(_CLAVE_MARGEN)
+        return RangosMedicion(
+            rangos={**RANGOS_MEDICION_DEFAULT, **(config.get(_CLAVE_RANGOS) or {})},
+            margen_advertencia=MARGEN_ADVERTENCIA_DEFAULT if margen is None else margen
+        )
+
+    @staticmethod
+    async def update_rangos_medicion(rangos: RangosMedicion) -> RangosMedicion:
+        """Guardar rangos de medición en app_config.settings"""
+        try:
+            response = await supabase_async.table('app_config').select('settings').eq('id', _APP_CONFIG_ID).limit(1).execute()
+            config = (response.data[0].get('settings') if response.data else None) or {}
+
+            rangos_dict = rangos.dict()
+            config[_CLAVE_RANGOS] = rangos_dict['rangos']
+            config[_CLAVE_MARGEN] = rangos_dict['margen_advertencia']
+
+            await supabase_async.table('app_config').upsert({
+                'id': _APP_CONFIG_ID,
+                'settings': config
+            }).execute()
+
+            configuracion_cache.invalidate('rangos_medicion')
+            return rangos
+
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error al actualizar rangos de medición: {str(e)}"
+            )
@@ -1,60 +1,115 @@
-from typing import List
-from datetime import datetime, date
+import asyncio
+import functools
+from typing import List, Optional
+from datetime import datetime
 from fastapi import HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 
 from app.models.dashboard import DashboardSummary, TowerProgress, MedicionesEstado, DashboardData
-from app.services.supabase_client import supabase_client
+from app.services.supabase_client import supabase_async, supabase_service
+from app.services.vistas_service import VistasService
 from app.config import settings
+from app.utils.cache import TTLCache
+
+
+# Cache de secciones del dashboard, con clave (obra_id, sección)
+dashboard_cache = TTLCache('dashboard', ttl=settings.DASHBOARD_CACHE_TTL)
+
+_CACHE_SECTIONS = ('summary', 'tower_progress', 'mediciones_estado', 'data')
+
+
+def _cached(section: str):
+    """Servir la sección desde el cache del dashboard de la obra"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper():
+            return await dashboard_cache.get_or_set((settings.OBRA_ID, section), fn)
+        return wrapper
+    return decorator
 
 
 class DashboardService:
     """Servicio para datos del dashboard"""
     
     @staticmethod
+    def invalidate_cache(obra_id: Optional[str] = None):
+        """Invalidar el cache del dashboard tras escribir avances o mediciones"""
+        obra_id = obra_id or settings.OBRA_ID
+        dashboard_cache.invalidate(*[(obra_id, section) for section in _CACHE_SECTIONS])
+        VistasService.notify_write()
+    
+    @staticmethod
+    async def _get_snapshot() -> dict:
+        """Obtener agregados de avances y mediciones en una sola consulta"""
+        # Fila total de la obra en los contadores mantenidos por triggers
+        try:
+            response = await supabase_async.table('vista_dashboard_contadores').select('*').eq(
+                'obra_id', settings.OBRA_ID
+            ).eq('torre', '*').limit(1).execute()
+            if response.data:
+                return response.data[0]
+        except Exception as e:
+            print(f"⚠️  Contadores del dashboard no disponibles: {e}")
+
+        # Contadores sin inicializar: calcular agregados recorriendo las tablas
+        response = await supabase_async.rpc('obtener_resumen_dashboard').execute()
+        return response.data or {}
+    
+    @staticmethod
+    async def reconcile_counters() -> dict:
+        """Recalcular los contadores del dashboard y corregir desvíos
+
+        La función solo puede ejecutarla el rol de servicio.
+        """
+        try:
+            response = await run_in_threadpool(supabase_service.rpc('reconciliar_dashboard_counters').execute)
+            resultado = response.data or {}
+            
+            if resultado.get('filas_corregidas') or resultado.get('filas_eliminadas'):
+                dashboard_cache.invalidate()
+            
+            return resultado
+            
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error al reconciliar contadores del dashboard: {str(e)}"
+            )
+    
+    @staticmethod
+    def _build_summary(stats: dict) -> DashboardSummary:
+        """Construir resumen a partir del snapshot de agregados"""
+        total_unidades = settings.TOTAL_UNIDADES
+        unidades_completadas = stats.get('unidades_completadas') or 0
+        porcentaje_general = (unidades_completadas / total_unidades) * 100 if total_unidades > 0 else 0
+
+        return DashboardSummary(
+            total_unidades=total_unidades,
+            unidades_completadas=unidades_completadas,
+            porcentaje_general=round(porcentaje_general, 2),
+            avances_hoy=stats.get('avances_hoy') or 0,
+            mediciones_hoy=stats.get('mediciones_hoy') or 0,
+            alertas_pendientes=stats.get('alertas_pendientes') or 0,
+            ultimo_avance=stats.get('ultimo_avance'),
+            ultima_medicion=stats.get('ultima_medicion')
+        )
+    
+    @staticmethod
+    def _build_mediciones_estado(stats: dict) -> MedicionesEstado:
+        """Construir estado de mediciones a partir del snapshot de agregados"""
+        return MedicionesEstado(
+            ok=stats.get('mediciones_ok') or 0,
+            advertencia=stats.get('mediciones_advertencia') or 0,
+            falla=stats.get('alertas_pendientes') or 0,
+            total=stats.get('total_mediciones') or 0
+        )
+    
+    @staticmethod
+    @_cached('summary')
     async def get_dashboard_summary() -> DashboardSummary:
         """Obtener resumen general del dashboard"""
         try:
-            # Obtener estadísticas de avances
-            avances_response = supabase_client.table('avances').select('porcentaje, fecha').is_('deleted_at', 'null').execute()
-            avances_data = avances_response.data
-            
-            # Obtener estadísticas de mediciones
-            mediciones_response = supabase_client.table('mediciones').select('estado, fecha').execute()
-            mediciones_data = mediciones_response.data
-            
-            # Calcular estadísticas
-            total_unidades = settings.TOTAL_UNIDADES
-            unidades_completadas = len([a for a in avances_data if a['porcentaje'] == 100])
-            porcentaje_general = (unidades_completadas / total_unidades) * 100 if total_unidades > 0 else 0
-            
-            # Avances y mediciones de hoy
-            hoy = date.today()
-            avances_hoy = len([a for a in avances_data if datetime.fromisoformat(a['fecha'].replace('Z', '+00:00')).date() == hoy])
-            mediciones_hoy = len([m for m in mediciones_data if datetime.fromisoformat(m['fecha'].replace('Z', '+00:00')).date() == hoy])
-            
-            # Alertas (mediciones con falla)
-            alertas_pendientes = len([m for m in mediciones_data if m['estado'] == 'FALLA'])
-            
-            # Fechas de último avance y medición
-            ultimo_avance = None
-            ultima_medicion = None
-            
-            if avances_data:
-                ultimo_avance = max([datetime.fromisoformat(a['fecha'].replace('Z', '+00:00')) for a in avances_data])
-            
-            if mediciones_data:
-                ultima_medicion = max([datetime.fromisoformat(m['fecha'].replace('Z', '+00:00')) for m in mediciones_data])
-            
-            return DashboardSummary(
-                total_unidades=total_unidades,
-                unidades_completadas=unidades_completadas,
-                porcentaje_general=round(porcentaje_general, 2),
-                avances_hoy=avances_hoy,
-                mediciones_hoy=mediciones_hoy,
-                alertas_pendientes=alertas_pendientes,
-                ultimo_avance=ultimo_avance,
-                ultima_medicion=ultima_medicion
-            )
+            return DashboardService._build_summary(await DashboardService._get_snapshot())
             
         except Exception as e:
             raise HTTPException(
@@ -63,30 +118,31 @@ class DashboardService:
             )
     
     @staticmethod
+    @_cached('tower_progress')
     async def get_tower_progress() -> List[TowerProgress]:
         """Obtener progreso por torre"""
         try:
-            # Obtener datos usando la vista de Supabase
-            response = supabase_client.table('vista_progreso_torres').select('*').execute()
-            
-            if not response.data:
-                # Si no hay datos en la vista, calcular manualmente
-                return await DashboardService._calculate_tower_progress_manual()
-            
-            # Convertir datos de la vista al modelo
+            # Una sola consulta agrupada: avances y mediciones de todas las torres.
+            # La vista materializada se usa mientras cumpla MATVIEW_MAX_STALENESS
+            vista = 'vista_progreso_torres_mv' if VistasService.is_fresh() else 'vista_progreso_torres'
+            response = await supabase_async.table(vista).select('*').execute()
+            filas_por_torre = {row['torre']: row for row in response.data}
+
+            # Convertir datos de la vista al modelo (torres sin registros en cero)
             tower_progress = []
-            for row in response.data:
+            for torre in settings.TORRES:
+                row = filas_por_torre.get(torre, {})
                 tower_progress.append(TowerProgress(
-                    torre=row['torre'],
-                    total_avances=row['total_avances'] or 0,
-                    progreso_promedio=float(row['progreso_promedio'] or 0),
-                    unidades_con_avance=row['unidades_con_avance'] or 0,
-                    unidades_completadas=row['unidades_completadas'] or 0,
-                    ultimo_avance=datetime.fromisoformat(row['ultimo_avance'].replace('Z', '+00:00')) if row['ultimo_avance'] else None,
-                    mediciones_ok=0,  # Se calculará por separado si es necesario
-                    mediciones_falla=0
+                    torre=torre,
+                    total_avances=row.get('total_avances') or 0,
+                    progreso_promedio=float(row.get('progreso_promedio') or 0),
+                    unidades_con_avance=row.get('unidades_con_avance') or 0,
+                    unidades_completadas=row.get('unidades_completadas') or 0,
+                    ultimo_avance=datetime.fromisoformat(row['ultimo_avance'].replace('Z', '+00:00')) if row.get('ultimo_avance') else None,
+                    mediciones_ok=row.get('mediciones_ok') or 0,
+                    mediciones_falla=row.get('mediciones_falla') or 0
                 ))
-            
+
             return tower_progress
             
         except Exception as e:
@@ -95,17 +151,17 @@ class DashboardService:
     
     @staticmethod
     async def _calculate_tower_progress_manual() -> List[TowerProgress]:
-        """Calcular progreso por torre manualmente"""
+        """Calcular progreso por torre manualmente (fallback si la vista no está disponible)"""
         try:
             tower_progress = []
             
             for torre in settings.TORRES:
                 # Obtener avances de la torre
-                avances_response = supabase_client.table('avances').select('porcentaje, fecha, ubicacion').eq('torre', torre).is_('deleted_at', 'null').execute()
+                avances_response = await supabase_async.table('avances').select('porcentaje, fecha, ubicacion').eq('torre', torre).is_('deleted_at', 'null').execute()
                 avances_data = avances_response.data
                 
                 # Obtener mediciones de la torre
-                mediciones_response = supabase_client.table('mediciones').select('estado').eq('torre', torre).execute()
+                mediciones_response = await supabase_async.table('mediciones').select('estado').eq('torre', torre).execute()
                 mediciones_data = mediciones_response.data
                 
                 # Calcular estadísticas
@@ -141,23 +197,11 @@ class DashboardService:
             )
     
     @staticmethod
+    @_cached('mediciones_estado')
     async def get_mediciones_estado() -> MedicionesEstado:
         """Obtener estado de las mediciones"""
         try:
-            response = supabase_client.table('mediciones').select('estado').execute()
-            mediciones_data = response.data
-            
-            ok = len([m for m in mediciones_data if m['estado'] == 'OK'])
-            advertencia = len([m for m in mediciones_data if m['estado'] == 'ADVERTENCIA'])
-            falla = len([m for m in mediciones_data if m['estado'] == 'FALLA'])
-            total = len(mediciones_data)
-            
-            return MedicionesEstado(
-                ok=ok,
-                advertencia=advertencia,
-                falla=falla,
-                total=total
-            )
+            return DashboardService._build_mediciones_estado(await DashboardService._get_snapshot())
             
         except Exception as e:
             raise HTTPException(
@@ -166,21 +210,22 @@ class DashboardService:
             )
     
     @staticmethod
+    @_cached('data')
     async def get_dashboard_data() -> DashboardData:
         """Obtener todos los datos del dashboard"""
         try:
-            # Obtener datos en paralelo
-            resumen = await DashboardService.get_dashboard_summary()
-            progreso_torres = await DashboardService.get_tower_progress()
-            mediciones_estado = await DashboardService.get_mediciones_estado()
-            
-            # Obtener actividad reciente (últimos 10 avances y mediciones)
-            actividad_reciente = await DashboardService._get_actividad_reciente()
+            # Obtener datos en paralelo: un snapshot de agregados compartido por
+            # resumen y estado de mediciones, progreso por torre y actividad reciente
+            snapshot, progreso_torres, actividad_reciente = await asyncio.gather(
+                DashboardService._get_snapshot(),
+                DashboardService.get_tower_progress(),
+                DashboardService._get_actividad_reciente()
+            )
             
             return DashboardData(
-                resumen=resumen,
+                resumen=DashboardService._build_summary(snapshot),
                 progreso_torres=progreso_torres,
-                mediciones_estado=mediciones_estado,
+                mediciones_estado=DashboardService._build_mediciones_estado(snapshot),
                 actividad_reciente=actividad_reciente
             )
             
@@ -194,17 +239,17 @@ class DashboardService:
     async def _get_actividad_reciente() -> List[dict]:
         """Obtener actividad reciente"""
         try:
-            # Obtener últimos avances
-            avances_response = supabase_client.table('avances').select('''
-                id, fecha, torre, ubicacion, categoria, porcentaje,
-                usuarios!avances_usuario_id_fkey(nombre)
-            ''').is_('deleted_at', 'null').order('fecha', desc=True).limit(5).execute()
-            
-            # Obtener últimas mediciones
-            mediciones_response = supabase_client.table('mediciones').select('''
-                id, fecha, torre, identificador, tipo_medicion, estado,
-                usuarios!mediciones_usuario_id_fkey(nombre)
-            ''').order('fecha', desc=True).limit(5).execute()
+            # Obtener últimos avances y últimas mediciones en paralelo
+            avances_response, mediciones_response = await asyncio.gather(
+                supabase_async.table('avances').select('''
+                    id, fecha, torre, ubicacion, categoria, porcentaje,
+                    usuarios!avances_usuario_id_fkey(nombre)
+                ''').is_('deleted_at', 'null').order('fecha', desc=True).limit(5).execute(),
+                supabase_async.table('mediciones').select('''
+                    id, fecha, torre, identificador, tipo_medicion, estado,
+                    usuarios!mediciones_usuario_id_fkey(nombre)
+                ''').order('fecha', desc=True).limit(5).execute()
+            )
             
             actividad = []
             
@@ -0,0 +1,273 @@
+import asyncio
+import csv
+import io
+import json
+from datetime import date, datetime, timedelta
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from fastapi import HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+
+from app.models.exportacion import FormatoExportacion
+from app.services.supabase_client import supabase_async
+from app.config import settings
+from app.utils.pagination import apply_keyset
+
+
+# Columnas exportadas por tabla (mismas que exportar_avances/exportar_mediciones)
+_COLUMNAS = {
+    'avances': (
+        'id', 'obra_id', 'fecha', 'torre', 'piso', 'sector', 'tipo_espacio', 'ubicacion',
+        'categoria', 'porcentaje', 'observaciones', 'foto_path', 'foto_url', 'usuario_id',
+        'sync_status', 'last_sync', 'created_at', 'updated_at'
+    ),
+    'mediciones': (
+        'id', 'obra_id', 'fecha', 'torre', 'piso', 'identificador', 'tipo_medicion', 'valores',
+        'estado', 'observaciones', 'usuario_id', 'sync_status', 'created_at', 'updated_at'
+    ),
+}
+
+_COLUMNAS_USUARIO = ('usuario_username', 'usuario_nombre', 'usuario_rol')
+
+_EMBED_USUARIO = {
+    'avances': 'usuarios!avances_usuario_id_fkey(username, nombre, rol)',
+    'mediciones': 'usuarios!mediciones_usuario_id_fkey(username, nombre, rol)',
+}
+
+MEDIA_TYPES = {
+    FormatoExportacion.NDJSON: 'application/x-ndjson',
+    FormatoExportacion.CSV: 'text/csv; charset=utf-8',
+    FormatoExportacion.PARQUET: 'application/vnd.apache.parquet',
+    FormatoExportacion.ARROW: 'application/vnd.apache.arrow.stream',
+}
+
+_FORMATOS_COLUMNARES = (FormatoExportacion.PARQUET, FormatoExportacion.ARROW)
+
+
+class ExportService:
+    """Exportación de avances y mediciones en streaming
+
+    Las filas se leen por páginas keyset (fecha, id) de EXPORT_PAGE_SIZE
+    registros y se serializan página a página, por lo que la memoria usada
+    no depende del tamaño de la exportación. La página siguiente se pide
+    mientras se envía la actual.
+
+    En modo incremental (`actualizado_desde`) se recorren por (updated_at, id)
+    las filas modificadas después de esa marca y hasta la marca de agua
+    tomada al iniciar, que se devuelve para la siguiente exportación. En
+    avances se incluyen las eliminadas (con `deleted_at`) para poder
+    aplicarlas en el destino.
+
+    `updated_at` es la hora de inicio de la transacción, así que una fila de
+    una transacción aún abierta al tomar la marca puede aparecer después con
+    un `updated_at` anterior a ella. Por eso cada exportación incremental
+    vuelve a leer los EXPORT_WATERMARK_OVERLAP segundos previos a la marca
+    recibida: las filas de esa ventana pueden llegar repetidas y el destino
+    debe aplicarlas por `id` (upsert).
+    """
+
+    @staticmethod
+    def columnas(tabla: str, incremental: bool = False) -> tuple:
+        """Columnas de la exportación de una tabla, en orden"""
+        eliminacion = ('deleted_at',) if incremental and tabla == 'avances' else ()
+        return _COLUMNAS[tabla] + eliminacion + _COLUMNAS_USUARIO
+
+    @staticmethod
+    async def marca_de_agua(tabla: str) -> Optional[str]:
+        """Mayor `updated_at` de la tabla (None si está vacía)"""
+        response = await supabase_async.table(tabla).select('updated_at').order(
+            'updated_at', desc=True
+        ).limit(1).execute()
+        return response.data[0]['updated_at'] if response.data else None
+
+    @staticmethod
+    async def _leer_pagina(
+        tabla: str,
+        cursor: Optional[tuple],
+        fecha_desde: Optional[date],
+        fecha_hasta: Optional[date],
+        torre: Optional[str],
+        incremental: Optional[Tuple[datetime, str]]
+    ) -> List[Dict[str, Any]]:
+        """Leer una página de la exportación después del cursor"""
+        columnas = ExportService.columnas(tabla, incremental=bool(incremental))
+        query = supabase_async.table(tabla).select(
+            f"{','.join(c for c in columnas if c not in _COLUMNAS_USUARIO)},{_EMBED_USUARIO[tabla]}"
+        )
+
+        if incremental:
+            desde, hasta = incremental
+            query = query.gt('updated_at', desde.isoformat()).lte('updated_at', hasta)
+        elif tabla == 'avances':
+            query = query.is_('deleted_at', 'null')
+        if torre:
+            query = query.eq('torre', torre)
+        # Rango de días completo, igual que DATE(fecha) en las funciones de exportación
+        if fecha_desde:
+            query = query.gte('fecha', fecha_desde.isoformat())
+        if fecha_hasta:
+            query = query.lt('fecha', (fecha_hasta + timedelta(days=1)).isoformat())
+
+        if incremental:
+            query = apply_keyset(query, cursor, columna='updated_at', desc=False)
+        else:
+            query = apply_keyset(query, cursor)
+
+        response = await query.limit(settings.EXPORT_PAGE_SIZE).execute()
+        return response.data or []
+
+    @staticmethod
+    async def iter_filas(
+        tabla: str,
+        fecha_desde: Optional[date] = None,
+        fecha_hasta: Optional[date] = None,
+        torre: Optional[str] = None,
+        incremental: Optional[Tuple[datetime, str]] = None
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Recorrer la exportación página a página, con el usuario aplanado en cada fila"""
+        orden = 'updated_at' if incremental else 'fecha'
+        pendiente = asyncio.create_task(
+            ExportService._leer_pagina(tabla, None, fecha_desde, fecha_hasta, torre, incremental)
+        )
+
+        try:
+            while pendiente is not None:
+                filas = await pendiente
+                pendiente = None
+
+                # Pedir la siguiente página antes de entregar la actual
+                if len(filas) == settings.EXPORT_PAGE_SIZE:
+                    ultima = filas[-1]
+                    pendiente = asyncio.create_task(ExportService._leer_pagina(
+                        tabla, (ultima[orden], ultima['id']), fecha_desde, fecha_hasta, torre, incremental
+                    ))
+
+                for fila in filas:
+                    usuario = fila.pop('usuarios', None) or {}
+                    fila['usuario_username'] = usuario.get('username')
+                    fila['usuario_nombre'] = usuario.get('nombre')
+                    fila['usuario_rol'] = usuario.get('rol')
+
+                if filas:
+                    yield filas
+        finally:
+            if pendiente is not None:
+                pendiente.cancel()
+
+    @staticmethod
+    async def stream(
+        tabla: str,
+        formato: FormatoExportacion,
+        fecha_desde: Optional[date] = None,
+        fecha_hasta: Optional[date] = None,
+        torre: Optional[str] = None,
+        incremental: Optional[Tuple[datetime, str]] = None
+    ) -> AsyncIterator[str]:
+        """Serializar la exportación como NDJSON o CSV, un bloque de texto por página"""
+        columnas = ExportService.columnas(tabla, incremental=bool(incremental))
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+
+        # Los encabezados salen junto con la primera página
+        if formato == FormatoExportacion.CSV:
+            writer.writerow(columnas)
+
+        async for filas in ExportService.iter_filas(tabla, fecha_desde, fecha_hasta, torre, incremental):
+            if formato == FormatoExportacion.CSV:
+                for fila in filas:
+                    writer.writerow([
+                        json.dumps(valor, ensure_ascii=False) if isinstance(valor, (dict, list))
+                        else '' if valor is None else valor
+                        for valor in (fila.get(columna) for columna in columnas)
+                    ])
+            else:
+                for fila in filas:
+                    buffer.write(json.dumps(fila, ensure_ascii=False, separators=(',', ':')))
+                    buffer.write('\n')
+
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+        if buffer.tell():
+            yield buffer.getvalue()
+
+    @staticmethod
+    async def stream_columnar(
+        tabla: str,
+        formato: FormatoExportacion,
+        fecha_desde: Optional[date] = None,
+        fecha_hasta: Optional[date] = None,
+        torre: Optional[str] = None,
+        incremental: Optional[Tuple[datetime, str]] = None
+    ) -> AsyncIterator[bytes]:
+        """Serializar la exportación como Parquet o Arrow IPC
+
+        Las páginas se acumulan hasta EXPORT_ROW_GROUP_SIZE filas y cada grupo
+        se escribe como un row group (o record batch) en un hilo aparte, así
+        la memoria queda acotada por el tamaño del grupo.
+        """
+        from app.utils.columnar import EscritorColumnar
+
+        escritor = EscritorColumnar(tabla, formato.value)
+        grupo: List[Dict[str, Any]] = []
+
+        async for filas in ExportService.iter_filas(tabla, fecha_desde, fecha_hasta, torre, incremental):
+            grupo.extend(filas)
+            if len(grupo) >= settings.EXPORT_ROW_GROUP_SIZE:
+                yield await run_in_threadpool(escritor.escribir, grupo)
+                grupo = []
+
+        if grupo:
+            yield await run_in_threadpool(escritor.escribir, grupo)
+        yield escritor.cerrar()
+
+    @staticmethod
+    async def exportar(
+        tabla: str,
+        formato: FormatoExportacion,
+        fecha_desde: Optional[date] = None,
+        fecha_hasta: Optional[date] = None,
+        torre: Optional[str] = None,
+        actualizado_desde: Optional[datetime] = None
+    ) -> Tuple[AsyncIterator, Optional[str]]:
+        """Iniciar una exportación y devolver (bloques, marca de agua)
+
+        La marca de agua es el mayor `updated_at` al iniciar: pasarla como
+        `actualizado_desde` en la siguiente exportación entrega lo modificado
+        después, más la ventana de EXPORT_WATERMARK_OVERLAP segundos anterior
+        a la marca (filas que pueden repetirse). La primera página se lee antes de devolver el
+        iterador para que un error de consulta se informe como 500 y no como
+        una respuesta cortada.
+        """
+        try:
+            marca = await ExportService.marca_de_agua(tabla)
+
+            incremental = None
+            if actualizado_desde:
+                # Releer la ventana previa a la marca: filas de transacciones que
+                # seguían abiertas cuando se tomó (sin filas no hay nada que leer)
+                desde = actualizado_desde - timedelta(seconds=settings.EXPORT_WATERMARK_OVERLAP)
+                incremental = (desde, marca or actualizado_desde.isoformat())
+
+            if formato in _FORMATOS_COLUMNARES:
+                bloques = ExportService.stream_columnar(tabla, formato, fecha_desde, fecha_hasta, torre, incremental)
+            else:
+                bloques = ExportService.stream(tabla, formato, fecha_desde, fecha_hasta, torre, incremental)
+
+            try:
+                primero = await bloques.__anext__()
+            except StopAsyncIteration:
+                primero = None
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error al exportar {tabla}: {str(e)}"
+            )
+
+        async def contenido():
+            if primero:
+                yield primero
+            async for bloque in bloques:
+                yield bloque
+
+        return contenido(), marca
@@ -0,0 +1,191 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, AsyncIterable, Dict, Optional, Set
+from fastapi import HTTPException, status
+
+from app.models.foto import FotoInfo
+from app.services.supabase_client import supabase_async
+from app.config import settings
+from app.utils.imagenes import generar_derivadas, ruta_derivada, ruta_desde_url
+
+
+BUCKET_FOTOS = 'avances-fotos'
+
+# Extensión del original según su tipo, para que el mismo contenido tenga siempre la misma ruta
+_EXTENSIONES = {'image/jpeg': 'jpg', 'image/png': 'png', 'image/webp': 'webp'}
+
+
+def _es_duplicado(response) -> bool:
+    """Storage rechazó la subida porque el objeto ya existe (409, o 400 con statusCode 409)"""
+    if response.status_code == 409:
+        return True
+    try:
+        return response.status_code == 400 and str(response.json().get('statusCode')) == '409'
+    except ValueError:
+        return False
+
+
+class FotoService:
+    """Registro de fotos por hash de contenido y generación de sus derivadas
+
+    Cada foto se guarda una sola vez en `fotos/<hash>.<ext>` y se registra
+    en la tabla `fotos`; los avances que adjuntan el mismo archivo
+    comparten el original y las derivadas (miniatura y versión mediana WebP).
+
+    Después de subir una foto nueva se programa su procesamiento en segundo
+    plano: el original se descarga de Storage, se redimensiona en un pool de
+    procesos (Pillow no libera el event loop ni escala bien con hilos) y las
+    derivadas se guardan junto al original. Al terminar se completan
+    `thumb_url` y `medium_url` de la foto y de los avances que la usan;
+    mientras tanto son nulas y los clientes usan `foto_url`.
+    """
+
+    _executor: Optional[ProcessPoolExecutor] = None
+    _semaforo: Optional[asyncio.Semaphore] = None
+    # Tareas en ejecución en este proceso (referencias para que no se recolecten)
+    _tareas: Set[asyncio.Task] = set()
+    # Fotos con derivadas en proceso en este worker
+    _en_proceso: Set[str] = set()
+
+    @staticmethod
+    def ruta(foto_hash: str, content_type: Optional[str]) -> str:
+        """Ruta en Storage del original de una foto según su hash"""
+        extension = _EXTENSIONES.get(content_type, 'jpg')
+        return f"los-encinos/fotos/{foto_hash[:2]}/{foto_hash}.{extension}"
+
+    @staticmethod
+    async def buscar(foto_hash: str) -> Optional[FotoInfo]:
+        """Foto registrada con ese hash, o None si nunca se subió"""
+        try:
+            response = await supabase_async.table('fotos').select(
+                'hash, url, thumb_url, medium_url, content_type, tamano'
+            ).eq('hash', foto_hash).limit(1).execute()
+
+            return FotoInfo(**response.data[0]) if response.data else None
+
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error al buscar foto: {str(e)}"
+            )
+
+    @staticmethod
+    async def subir(
+        chunks: AsyncIterable[bytes],
+        foto_hash: str,
+        content_type: str,
+        tamano: int,
+        usuario_id: str
+    ) -> FotoInfo:
+        """Enviar a Storage el contenido de una foto nueva y registrarla
+
+        El contenido llega por bloques y se envía a medida que se lee. Las
+        excepciones del iterador (por ejemplo, tamaño excedido) abortan la
+        subida y se propagan.
+        """
+        ruta = FotoService.ruta(foto_hash, content_type)
+        response = await supabase_async.upload_stream(BUCKET_FOTOS, ruta, chunks, content_type, tamano)
+
+        # Un objeto existente con esa ruta tiene el mismo contenido (subida concurrente)
+        if response.status_code != 200 and not _es_duplicado(response):
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Error al subir foto"
+            )
+
+        return await FotoService.registrar(foto_hash, ruta, content_type, tamano, usuario_id)
+
+    @staticmethod
+    async def registrar(foto_hash: str, ruta: str, content_type: str, tamano: int, usuario_id: str) -> FotoInfo:
+        """Registrar una foto recién subida (si otra petición la registró antes se usa esa)"""
+        url = await supabase_async.storage.from_(BUCKET_FOTOS).get_public_url(ruta)
+        fila: Dict[str, Any] = {
+            'hash': foto_hash,
+            'ruta': ruta,
+            'url': url,
+            'content_type': content_type,
+            'tamano': tamano,
+            'usuario_id': usuario_id
+        }
+        await supabase_async.table('fotos').upsert(fila, on_conflict='hash', ignore_duplicates=True).execute()
+
+        return await FotoService.buscar(foto_hash) or FotoInfo(**fila)
+
+    @staticmethod
+    def _get_executor() -> ProcessPoolExecutor:
+        """Pool de procesos, creado al procesar la primera foto"""
+        if FotoService._executor is None:
+            # spawn: no se heredan los hilos ni las conexiones del proceso de la API
+            FotoService._executor = ProcessPoolExecutor(
+                max_workers=settings.IMAGE_WORKERS,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+            FotoService._semaforo = asyncio.Semaphore(settings.IMAGE_WORKERS)
+        return FotoService._executor
+
+    @staticmethod
+    def programar(foto_url: str):
+        """Generar las derivadas de una foto en segundo plano (una vez por foto)"""
+        if foto_url in FotoService._en_proceso:
+            return
+        FotoService._en_proceso.add(foto_url)
+
+        tarea = asyncio.create_task(FotoService.procesar(foto_url))
+        FotoService._tareas.add(tarea)
+        tarea.add_done_callback(FotoService._tareas.discard)
+        tarea.add_done_callback(lambda _: FotoService._en_proceso.discard(foto_url))
+
+    @staticmethod
+    async def procesar(foto_url: str) -> Optional[Dict[str, str]]:
+        """Generar y guardar las derivadas de una foto; devuelve sus URLs o None si falla"""
+        ruta = ruta_desde_url(foto_url, BUCKET_FOTOS)
+        if not ruta:
+            print(f"⚠️  Foto fuera del bucket {BUCKET_FOTOS}: {foto_url}")
+            return None
+
+        executor = FotoService._get_executor()
+        bucket = supabase_async.storage.from_(BUCKET_FOTOS)
+
+        try:
+            # Como máximo un original descargado por proceso del pool
+            async with FotoService._semaforo:
+                original = await bucket.download(ruta)
+                derivadas = await asyncio.get_running_loop().run_in_executor(
+                    executor, generar_derivadas, original, settings.THUMB_SIZE, settings.MEDIUM_SIZE
+                )
+                del original
+
+            urls = {}
+            for nombre, contenido in derivadas.items():
+                ruta_salida = ruta_derivada(ruta, nombre)
+                await bucket.upload(ruta_salida, contenido, {
+                    'content-type': 'image/webp',
+                    'cache-control': 'max-age=31536000',
+                    'x-upsert': 'true'
+                })
+                urls[f"{nombre}_url"] = await bucket.get_public_url(ruta_salida)
+
+            # La foto registrada y todos los avances que la usan
+            await supabase_async.table('fotos').update(urls).eq('url', foto_url).execute()
+            await supabase_async.table('avances').update(urls).eq('foto_url', foto_url).execute()
+            return urls
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"❌ Error generando derivadas de la foto {ruta}: {e}")
+            return None
+
+    @staticmethod
+    async def shutdown():
+        """Cancelar el procesamiento pendiente y cerrar el pool de procesos"""
+        tareas = list(FotoService._tareas)
+        for tarea in tareas:
+            tarea.cancel()
+        await asyncio.gather(*tareas, return_exceptions=True)
+
+        if FotoService._executor is not None:
+            FotoService._executor.shutdown(wait=False, cancel_futures=True)
+            FotoService._executor = None
+            FotoService._semaforo = None
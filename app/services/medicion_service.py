@@ -1,26 +1,68 @@
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from datetime import datetime, date
 from fastapi import HTTPException, status
+from pydantic import ValidationError
+import uuid
 
-from app.models.medicion import Medicion, MedicionCreate, MedicionUpdate, MedicionResponse, EstadoMedicion, TipoMedicion
-from app.services.supabase_client import supabase_client
+from app.models.medicion import Medicion, MedicionCreate, MedicionUpdate, MedicionResponse, EstadoMedicion, TipoMedicion, MedicionListItem, MedicionExport, MedicionBulkItemResult, MedicionBulkResponse
+from app.models.proyeccion import Proyeccion
+from app.models.configuracion import RangosMedicion
+from app.services.supabase_client import supabase_async, returning
+from app.services.dashboard_service import DashboardService
+from app.services.configuracion_service import ConfiguracionService, RANGOS_MEDICION_DEFAULT, MARGEN_ADVERTENCIA_DEFAULT
 from app.config import settings
+from app.utils.pagination import decode_cursor, apply_keyset
+from app.utils.validators import validate_torre, validate_piso
+from app.utils.clasificacion import clasificar_mediciones
+
+
+# Columnas y modelo de respuesta de cada proyección de los listados
+_SELECT_MEDICIONES = {
+    Proyeccion.LIST: '''
+        id, fecha, torre, identificador, tipo_medicion, valores, estado,
+        usuarios!mediciones_usuario_id_fkey(nombre)
+    ''',
+    Proyeccion.DETAIL: '''
+        id, fecha, torre, piso, identificador, tipo_medicion, valores, estado,
+        observaciones, sync_status, created_at, updated_at,
+        usuarios!mediciones_usuario_id_fkey(id, nombre, username, rol)
+    ''',
+    Proyeccion.EXPORT: '''
+        *,
+        usuarios!mediciones_usuario_id_fkey(id, nombre, username, rol)
+    '''
+}
+
+_MODELO_MEDICIONES = {
+    Proyeccion.LIST: MedicionListItem,
+    Proyeccion.DETAIL: MedicionResponse,
+    Proyeccion.EXPORT: MedicionExport
+}
+
+# Representación completa (fila + usuario) de las lecturas por ID y las escrituras
+_SELECT_MEDICION_COMPLETO = '''
+    *,
+    usuarios!mediciones_usuario_id_fkey(id, nombre, username, rol)
+'''
+
+# Rangos por defecto para cálculos sin configuración cargada
+_RANGOS_DEFAULT = RangosMedicion(
+    rangos=RANGOS_MEDICION_DEFAULT,
+    margen_advertencia=MARGEN_ADVERTENCIA_DEFAULT
+)
 
 
 class MedicionService:
     """Servicio para gestión de mediciones"""
     
-    # Rangos de medición para validación automática
-    RANGOS_MEDICION = {
-        'alambrico': {'min': 45, 'max': 75},
-        'coaxial': {'min': 45, 'max': 75},
-        'fibra_potencia': {'min': -30, 'max': -8},
-        'wifi': {'min': -80, 'max': -30}
-    }
-    
     @staticmethod
-    def _calcular_estado_medicion(tipo_medicion: TipoMedicion, valores: dict) -> EstadoMedicion:
+    def _calcular_estado_medicion(
+        tipo_medicion: TipoMedicion,
+        valores: dict,
+        rangos: Optional[RangosMedicion] = None
+    ) -> EstadoMedicion:
         """Calcular estado automático de la medición basado en valores"""
+        rangos = rangos or _RANGOS_DEFAULT
         try:
             if tipo_medicion == TipoMedicion.CERTIFICACION:
                 cert_value = valores.get('certificacion')
@@ -38,25 +80,25 @@ class MedicionService:
                 valor_key = 'alambrico_t1' if tipo_medicion == TipoMedicion.ALAMBRICO_T1 else 'alambrico_t2'
                 valor = valores.get(valor_key)
                 if valor is not None:
-                    estados.append(MedicionService._validar_rango(valor, 'alambrico'))
+                    estados.append(MedicionService._validar_rango(valor, 'alambrico', rangos))
             
             elif tipo_medicion == TipoMedicion.COAXIAL:
                 valor = valores.get('coaxial')
                 if valor is not None:
-                    estados.append(MedicionService._validar_rango(valor, 'coaxial'))
+                    estados.append(MedicionService._validar_rango(valor, 'coaxial', rangos))
             
             elif tipo_medicion == TipoMedicion.FIBRA:
                 potencia_tx = valores.get('potencia_tx')
                 potencia_rx = valores.get('potencia_rx')
                 if potencia_tx is not None:
-                    estados.append(MedicionService._validar_rango(potencia_tx, 'fibra_potencia'))
+                    estados.append(MedicionService._validar_rango(potencia_tx, 'fibra_potencia', rangos))
                 if potencia_rx is not None:
-                    estados.append(MedicionService._validar_rango(potencia_rx, 'fibra_potencia'))
+                    estados.append(MedicionService._validar_rango(potencia_rx, 'fibra_potencia', rangos))
             
             elif tipo_medicion == TipoMedicion.WIFI:
                 valor = valores.get('wifi')
                 if valor is not None:
-                    estados.append(MedicionService._validar_rango(valor, 'wifi'))
+                    estados.append(MedicionService._validar_rango(valor, 'wifi', rangos))
             
             # Determinar estado final
             if EstadoMedicion.FALLA in estados:
@@ -70,17 +112,34 @@ class MedicionService:
             return EstadoMedicion.OK
     
     @staticmethod
-    def _validar_rango(valor: float, tipo_rango: str) -> EstadoMedicion:
+    def _calcular_estados_lote(mediciones: List[MedicionCreate], rangos: RangosMedicion) -> List[EstadoMedicion]:
+        """Calcular el estado de un lote de mediciones (mismo orden recibido)
+
+        Usa el clasificador vectorizado, equivalente a `_calcular_estado_medicion`
+        (ver scripts/verificar_clasificador.py).
+        """
+        rangos_dict = rangos.dict()
+        estados = clasificar_mediciones(
+            [m.tipo_medicion for m in mediciones],
+            [m.valores.dict() for m in mediciones],
+            rangos_dict['rangos'],
+            rangos_dict['margen_advertencia']
+        )
+        return [EstadoMedicion(estado) for estado in estados]
+    
+    @staticmethod
+    def _validar_rango(valor: float, tipo_rango: str, rangos: RangosMedicion) -> EstadoMedicion:
         """Validar si un valor está en el rango correcto"""
-        rango = MedicionService.RANGOS_MEDICION.get(tipo_rango)
+        rango = rangos.rangos.get(tipo_rango)
         if not rango:
             return EstadoMedicion.OK
         
-        min_val, max_val = rango['min'], rango['max']
+        min_val, max_val = rango.min, rango.max
+        margen = rangos.margen_advertencia
         
         if valor < min_val or valor > max_val:
             return EstadoMedicion.FALLA
-        elif valor < min_val + 5 or valor > max_val - 5:  # Zona de advertencia
+        elif valor < min_val + margen or valor > max_val - margen:  # Zona de advertencia
             return EstadoMedicion.ADVERTENCIA
         else:
             return EstadoMedicion.OK
@@ -95,46 +154,68 @@ class MedicionService:
         fecha_hasta: Optional[date] = None,
         search: Optional[str] = None,
         limit: int = 100,
-        offset: int = 0
-    ) -> List[MedicionResponse]:
+        offset: int = 0,
+        cursor: Optional[str] = None,
+        fields: Proyeccion = Proyeccion.DETAIL
+    ) -> list:
         """Obtener mediciones con filtros"""
+        # Con cursor se pagina por (fecha, id) y se ignora el offset; las búsquedas
+        # se ordenan por relevancia y paginan con offset
+        try:
+            keyset = decode_cursor(cursor) if cursor else None
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+        
         try:
-            query = supabase_client.table('mediciones').select('''
-                *,
-                usuarios!mediciones_usuario_id_fkey(id, nombre, username, rol)
-            ''')
-            
-            # Aplicar filtros
-            if torre:
-                query = query.eq('torre', torre)
-            if piso:
-                query = query.eq('piso', piso)
-            if tipo_medicion:
-                query = query.eq('tipo_medicion', tipo_medicion)
-            if estado:
-                query = query.eq('estado', estado)
-            if fecha_desde:
-                query = query.gte('fecha', fecha_desde.isoformat())
-            if fecha_hasta:
-                query = query.lte('fecha', fecha_hasta.isoformat())
             if search:
-                query = query.or_(f'identificador.ilike.%{search}%,observaciones.ilike.%{search}%')
-            
-            # Ordenar y paginar
-            response = query.order('fecha', desc=True).range(offset, offset + limit - 1).execute()
+                # Búsqueda indexada (texto completo + trigramas) ordenada por relevancia;
+                # el término viaja como parámetro de la función, no dentro del filtro
+                response = await supabase_async.rpc('buscar_mediciones', {
+                    'termino': search,
+                    'p_torre': torre,
+                    'p_piso': piso,
+                    'p_tipo_medicion': tipo_medicion,
+                    'p_estado': estado,
+                    'p_fecha_desde': fecha_desde.isoformat() if fecha_desde else None,
+                    'p_fecha_hasta': fecha_hasta.isoformat() if fecha_hasta else None,
+                    'limite': limit,
+                    'desplazamiento': offset
+                }).execute()
+            else:
+                query = supabase_async.table('mediciones').select(_SELECT_MEDICIONES[fields])
+                
+                # Aplicar filtros
+                if torre:
+                    query = query.eq('torre', torre)
+                if piso:
+                    query = query.eq('piso', piso)
+                if tipo_medicion:
+                    query = query.eq('tipo_medicion', tipo_medicion)
+                if estado:
+                    query = query.eq('estado', estado)
+                if fecha_desde:
+                    query = query.gte('fecha', fecha_desde.isoformat())
+                if fecha_hasta:
+                    query = query.lte('fecha', fecha_hasta.isoformat())
+                
+                # Ordenar y paginar
+                query = apply_keyset(query, keyset)
+                if keyset:
+                    response = await query.limit(limit).execute()
+                else:
+                    response = await query.range(offset, offset + limit - 1).execute()
             
             # Formatear respuesta
             mediciones = []
+            modelo = _MODELO_MEDICIONES[fields]
             for medicion_data in response.data:
                 usuario_data = medicion_data.pop('usuarios', None)
-                medicion_response = MedicionResponse(**medicion_data)
+                medicion_response = modelo(**medicion_data)
                 if usuario_data:
-                    medicion_response.usuario = {
-                        'id': usuario_data['id'],
-                        'nombre': usuario_data['nombre'],
-                        'username': usuario_data['username'],
-                        'rol': usuario_data['rol']
-                    }
+                    medicion_response.usuario = usuario_data
                 mediciones.append(medicion_response)
             
             return mediciones
@@ -145,31 +226,32 @@ class MedicionService:
                 detail=f"Error al obtener mediciones: {str(e)}"
             )
     
+    @staticmethod
+    def _format_medicion(medicion_data: dict) -> MedicionResponse:
+        """Convertir fila con usuario embebido al modelo de respuesta"""
+        usuario_data = medicion_data.pop('usuarios', None)
+        medicion_response = MedicionResponse(**medicion_data)
+        
+        if usuario_data:
+            medicion_response.usuario = {
+                'id': usuario_data['id'],
+                'nombre': usuario_data['nombre'],
+                'username': usuario_data['username'],
+                'rol': usuario_data['rol']
+            }
+        
+        return medicion_response
+    
     @staticmethod
     async def get_medicion_by_id(medicion_id: str) -> Optional[MedicionResponse]:
         """Obtener medición por ID"""
         try:
-            response = supabase_client.table('mediciones').select('''
-                *,
-                usuarios!mediciones_usuario_id_fkey(id, nombre, username, rol)
-            ''').eq('id', medicion_id).execute()
+            response = await supabase_async.table('mediciones').select(_SELECT_MEDICION_COMPLETO).eq('id', medicion_id).execute()
             
             if not response.data:
                 return None
             
-            medicion_data = response.data[0]
-            usuario_data = medicion_data.pop('usuarios', None)
-            medicion_response = MedicionResponse(**medicion_data)
-            
-            if usuario_data:
-                medicion_response.usuario = {
-                    'id': usuario_data['id'],
-                    'nombre': usuario_data['nombre'],
-                    'username': usuario_data['username'],
-                    'rol': usuario_data['rol']
-                }
-            
-            return medicion_response
+            return MedicionService._format_medicion(response.data[0])
             
         except Exception as e:
             raise HTTPException(
@@ -177,18 +259,33 @@ class MedicionService:
                 detail=f"Error al obtener medición: {str(e)}"
             )
     
+    @staticmethod
+    def _errores_obra(torre: Optional[str], piso: Optional[int]) -> List[str]:
+        """Restricciones de la obra que el modelo no cubre (torres y pisos configurados)"""
+        errores = []
+        if torre is not None and not validate_torre(torre):
+            errores.append(f"torre: {torre} no pertenece a la obra")
+        if piso is not None and not validate_piso(piso):
+            errores.append(f"piso: {piso} no pertenece a la obra")
+        return errores
+    
     @staticmethod
     async def create_medicion(medicion_data: MedicionCreate, usuario_id: str) -> MedicionResponse:
         """Crear nueva medición"""
+        errores = MedicionService._errores_obra(medicion_data.torre, medicion_data.piso)
+        if errores:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="; ".join(errores))
+        
         try:
             # Preparar datos de la medición
             medicion_dict = medicion_data.dict()
             valores_dict = medicion_dict.pop('valores')
             
-            # Calcular estado automáticamente
+            # Calcular estado automáticamente con los rangos vigentes
             estado = MedicionService._calcular_estado_medicion(
                 medicion_data.tipo_medicion, 
-                valores_dict
+                valores_dict,
+                await ConfiguracionService.get_rangos_medicion()
             )
             
             medicion_dict.update({
@@ -200,7 +297,9 @@ class MedicionService:
             })
             
             # Insertar en base de datos
-            response = supabase_client.table('mediciones').insert(medicion_dict).execute()
+            response = await returning(
+                supabase_async.table('mediciones').insert(medicion_dict), _SELECT_MEDICION_COMPLETO
+            ).execute()
             
             if not response.data:
                 raise HTTPException(
@@ -208,8 +307,10 @@ class MedicionService:
                     detail="Error al crear medición"
                 )
             
-            # Obtener medición completa con usuario
-            return await MedicionService.get_medicion_by_id(response.data[0]['id'])
+            DashboardService.invalidate_cache()
+            
+            # La inserción ya devuelve la fila completa con usuario
+            return MedicionService._format_medicion(response.data[0])
             
         except HTTPException:
             raise
@@ -232,22 +333,32 @@ class MedicionService:
                     detail="No hay datos para actualizar"
                 )
             
+            errores = MedicionService._errores_obra(update_data.get('torre'), update_data.get('piso'))
+            if errores:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="; ".join(errores))
+            
             # Si se actualizan valores, recalcular estado
             if 'valores' in update_data and 'tipo_medicion' in update_data:
                 estado = MedicionService._calcular_estado_medicion(
                     update_data['tipo_medicion'],
-                    update_data['valores']
+                    update_data['valores'],
+                    await ConfiguracionService.get_rangos_medicion()
                 )
                 update_data['estado'] = estado.value
             
             update_data['sync_status'] = 'synced'
             
-            response = supabase_client.table('mediciones').update(update_data).eq('id', medicion_id).execute()
+            response = await returning(
+                supabase_async.table('mediciones').update(update_data).eq('id', medicion_id),
+                _SELECT_MEDICION_COMPLETO
+            ).execute()
             
             if not response.data:
                 return None
             
-            return await MedicionService.get_medicion_by_id(medicion_id)
+            DashboardService.invalidate_cache()
+            
+            return MedicionService._format_medicion(response.data[0])
             
         except HTTPException:
             raise
@@ -257,13 +368,98 @@ class MedicionService:
                 detail=f"Error al actualizar medición: {str(e)}"
             )
     
+    @staticmethod
+    async def create_mediciones_bulk(items: List[Dict[str, Any]], usuario_id: str) -> MedicionBulkResponse:
+        """Registrar un lote de mediciones
+
+        Los ítems válidos se insertan en bloques dentro de una sola transacción;
+        los inválidos se informan por índice sin afectar al resto.
+        """
+        if len(items) > settings.MAX_BULK_MEDICIONES:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"El lote supera el máximo de {settings.MAX_BULK_MEDICIONES} mediciones"
+            )
+        
+        # Validar todos los ítems en una pasada
+        resultados: List[Optional[MedicionBulkItemResult]] = [None] * len(items)
+        validas = []
+        for indice, item in enumerate(items):
+            try:
+                medicion = MedicionCreate(**item)
+            except ValidationError as e:
+                resultados[indice] = MedicionBulkItemResult(
+                    indice=indice,
+                    ok=False,
+                    errores=[
+                        f"{' -> '.join(str(loc) for loc in error['loc'])}: {error['msg']}"
+                        for error in e.errors()
+                    ]
+                )
+                continue
+            
+            # Restricciones de la obra que el modelo no cubre (igual que al crear una)
+            errores = MedicionService._errores_obra(medicion.torre, medicion.piso)
+            if errores:
+                resultados[indice] = MedicionBulkItemResult(indice=indice, ok=False, errores=errores)
+                continue
+            
+            validas.append((indice, medicion))
+        
+        # Calcular estados del lote y preparar filas
+        estados = MedicionService._calcular_estados_lote(
+            [medicion for _, medicion in validas],
+            await ConfiguracionService.get_rangos_medicion()
+        )
+        filas = []
+        for (indice, medicion), estado in zip(validas, estados):
+            medicion_id = str(uuid.uuid4())
+            fila = medicion.dict()
+            fila.update({
+                'id': medicion_id,
+                'obra_id': settings.OBRA_ID,
+                'usuario_id': usuario_id,
+                'fecha': medicion.fecha.isoformat(),
+                'estado': estado.value,
+                'sync_status': 'synced'
+            })
+            filas.append(fila)
+            resultados[indice] = MedicionBulkItemResult(
+                indice=indice, ok=True, id=medicion_id, estado=estado.value
+            )
+        
+        if filas:
+            try:
+                await supabase_async.rpc('insertar_mediciones_lote', {
+                    'p_filas': filas,
+                    'p_tamano_lote': settings.BULK_INSERT_CHUNK_SIZE
+                }).execute()
+            except Exception as e:
+                raise HTTPException(
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    detail=f"Error al insertar lote de mediciones: {str(e)}"
+                )
+            
+            DashboardService.invalidate_cache()
+        
+        return MedicionBulkResponse(
+            total=len(items),
+            creadas=len(filas),
+            rechazadas=len(items) - len(filas),
+            resultados=resultados
+        )
+    
     @staticmethod
     async def delete_medicion(medicion_id: str) -> bool:
         """Eliminar medición"""
         try:
-            response = supabase_client.table('mediciones').delete().eq('id', medicion_id).execute()
+            response = await supabase_async.table('mediciones').delete().eq('id', medicion_id).execute()
+            
+            if not response.data:
+                return False
             
-            return len(response.data) > 0
+            DashboardService.invalidate_cache()
+            return True
             
         except Exception as e:
             raise HTTPException(
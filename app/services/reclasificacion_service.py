@@ -0,0 +1,167 @@
+import asyncio
+from collections import Counter
+from datetime import datetime
+from typing import Optional, Set
+from fastapi import HTTPException, status
+
+from app.models.configuracion import RangosMedicion, ReclasificacionTrabajo
+from app.services.supabase_client import supabase_async
+from app.services.dashboard_service import DashboardService
+from app.config import settings
+from app.utils.clasificacion import clasificar_mediciones
+from app.utils.pagination import apply_keyset
+
+
+# IDs por UPDATE: van en la URL (`id=in.(...)`), unos 37 bytes cada uno
+_IDS_POR_UPDATE = 100
+
+
+class ReclasificacionService:
+    """Reclasificación en segundo plano de las mediciones guardadas
+
+    Recorre `mediciones` por lotes con paginación keyset (fecha, id), calcula
+    el estado con los rangos nuevos y actualiza solo las filas cuyo estado
+    cambió. El progreso se guarda en `reclasificaciones_mediciones` para
+    poder consultarlo desde cualquier worker.
+    """
+
+    # Tareas en ejecución en este proceso (referencias para que no se recolecten)
+    _tareas: Set[asyncio.Task] = set()
+
+    @staticmethod
+    async def start(rangos: RangosMedicion, usuario_id: Optional[str] = None) -> ReclasificacionTrabajo:
+        """Registrar un trabajo de reclasificación y ejecutarlo en segundo plano"""
+        try:
+            # Un cambio de rangos deja obsoleto cualquier trabajo en curso
+            await supabase_async.table('reclasificaciones_mediciones').update({
+                'estado': 'cancelado',
+                'terminado': datetime.utcnow().isoformat()
+            }).eq('estado', 'en_curso').execute()
+
+            total_response = await supabase_async.table('mediciones').select('id', count='exact').limit(1).execute()
+
+            response = await supabase_async.table('reclasificaciones_mediciones').insert({
+                'estado': 'en_curso',
+                'rangos': rangos.dict(),
+                'total': total_response.count or 0,
+                'usuario_id': usuario_id
+            }).execute()
+
+            trabajo = ReclasificacionTrabajo(**response.data[0])
+
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error al iniciar reclasificación de mediciones: {str(e)}"
+            )
+
+        tarea = asyncio.create_task(ReclasificacionService._run(trabajo.id, rangos))
+        ReclasificacionService._tareas.add(tarea)
+        tarea.add_done_callback(ReclasificacionService._tareas.discard)
+
+        return trabajo
+
+    @staticmethod
+    async def _run(trabajo_id: str, rangos: RangosMedicion):
+        """Recorrer las mediciones por lotes y actualizar los estados que cambian"""
+        rangos_dict = rangos.dict()
+        procesadas = 0
+        detalle: Counter = Counter()
+        cursor = None
+
+        try:
+            while True:
+                query = supabase_async.table('mediciones').select('id, fecha, tipo_medicion, valores, estado')
+                response = await apply_keyset(query, cursor).limit(settings.RECLASIFICACION_BATCH_SIZE).execute()
+                filas = response.data or []
+                if not filas:
+                    break
+
+                nuevos = clasificar_mediciones(
+                    [fila['tipo_medicion'] for fila in filas],
+                    [fila['valores'] for fila in filas],
+                    rangos_dict['rangos'],
+                    rangos_dict['margen_advertencia']
+                )
+
+                # Una actualización por estado destino, solo con las filas que cambian
+                cambios = {}
+                for fila, nuevo in zip(filas, nuevos):
+                    if fila['estado'] != nuevo:
+                        cambios.setdefault(nuevo, []).append(fila['id'])
+                        detalle[f"{fila['estado']}->{nuevo}"] += 1
+
+                for nuevo, ids in cambios.items():
+                    for inicio in range(0, len(ids), _IDS_POR_UPDATE):
+                        await supabase_async.table('mediciones').update({'estado': nuevo}).in_(
+                            'id', ids[inicio:inicio + _IDS_POR_UPDATE]
+                        ).execute()
+
+                procesadas += len(filas)
+                ultima = filas[-1]
+                cursor = (ultima['fecha'], ultima['id'])
+
+                # Registrar progreso; si el trabajo fue cancelado no hay fila en curso
+                progreso = await supabase_async.table('reclasificaciones_mediciones').update({
+                    'procesadas': procesadas,
+                    'cambiadas': sum(detalle.values()),
+                    'detalle': dict(detalle),
+                    'actualizado': datetime.utcnow().isoformat()
+                }).eq('id', trabajo_id).eq('estado', 'en_curso').execute()
+                if not progreso.data:
+                    return
+
+                if len(filas) < settings.RECLASIFICACION_BATCH_SIZE:
+                    break
+
+            await ReclasificacionService._finish(trabajo_id, 'completado')
+
+        except asyncio.CancelledError:
+            await ReclasificacionService._finish(trabajo_id, 'cancelado')
+            raise
+        except Exception as e:
+            print(f"❌ Error en reclasificación de mediciones {trabajo_id}: {e}")
+            await ReclasificacionService._finish(trabajo_id, 'error', str(e))
+        finally:
+            if detalle:
+                DashboardService.invalidate_cache()
+
+    @staticmethod
+    async def _finish(trabajo_id: str, estado: str, error: Optional[str] = None):
+        """Cerrar el trabajo con su estado final"""
+        try:
+            await supabase_async.table('reclasificaciones_mediciones').update({
+                'estado': estado,
+                'error': error,
+                'terminado': datetime.utcnow().isoformat()
+            }).eq('id', trabajo_id).eq('estado', 'en_curso').execute()
+        except Exception as e:
+            print(f"⚠️  No se pudo cerrar la reclasificación {trabajo_id}: {e}")
+
+    @staticmethod
+    async def get_trabajo(trabajo_id: Optional[str] = None) -> Optional[ReclasificacionTrabajo]:
+        """Obtener un trabajo por ID, o el más reciente si no se indica"""
+        try:
+            query = supabase_async.table('reclasificaciones_mediciones').select('*')
+            if trabajo_id:
+                query = query.eq('id', trabajo_id)
+            response = await query.order('iniciado', desc=True).limit(1).execute()
+
+            if not response.data:
+                return None
+
+            return ReclasificacionTrabajo(**response.data[0])
+
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error al obtener reclasificación: {str(e)}"
+            )
+
+    @staticmethod
+    async def shutdown():
+        """Cancelar los trabajos en ejecución al detener la aplicación"""
+        tareas = list(ReclasificacionService._tareas)
+        for tarea in tareas:
+            tarea.cancel()
+        await asyncio.gather(*tareas, return_exceptions=True)
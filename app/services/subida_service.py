@@ -0,0 +1,253 @@
+import json
+import tempfile
+import time
+import uuid
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict
+from fastapi import HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+import aiofiles
+
+from app.models.foto import SubidaFotoCreate, SubidaFotoEstado
+from app.services.foto_service import FotoService
+from app.config import settings
+from app.utils.upload_limit import hash_archivo
+
+
+# Espacio de nombres de los IDs de subida (un ID fijo por usuario y archivo)
+_NAMESPACE_SUBIDAS = uuid.UUID('6f0b5e0a-3c1d-4b7e-9a52-2d8f4c9e1a37')
+
+
+def _directorio() -> Path:
+    """Directorio de las subidas en curso, compartido por los workers del host"""
+    directorio = Path(settings.UPLOAD_TMP_DIR or Path(tempfile.gettempdir()) / 'bdpa-subidas')
+    directorio.mkdir(parents=True, exist_ok=True)
+    return directorio
+
+
+class SubidaFotoService:
+    """Subidas de fotos por partes, reanudables después de un corte
+
+    Cada subida se guarda en disco como `<id>.part` (los bytes recibidos) y
+    `<id>.json` (hash, tamaño, tipo y usuario). El ID depende del usuario y
+    del hash del archivo, así que volver a iniciar la misma foto retoma la
+    subida pendiente aunque el cliente se haya reiniciado. Al terminar se
+    verifica el hash, la foto pasa a Storage por el mismo camino que las
+    subidas directas y los archivos locales se borran.
+
+    El estado vive en el disco del host: con varios servidores las peticiones
+    de una subida deben llegar al mismo (o UPLOAD_TMP_DIR ser compartido).
+    """
+
+    @staticmethod
+    def _rutas(subida_id: str):
+        """Archivos de datos y metadatos de una subida (404 si el ID no es válido)"""
+        try:
+            subida_id = str(uuid.UUID(subida_id))
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Subida no encontrada")
+        directorio = _directorio()
+        return directorio / f"{subida_id}.part", directorio / f"{subida_id}.json"
+
+    @staticmethod
+    def _leer(subida_id: str, usuario_id: str) -> Dict[str, Any]:
+        """Metadatos de una subida del usuario con los bytes recibidos hasta ahora"""
+        parte, meta = SubidaFotoService._rutas(subida_id)
+        try:
+            datos = json.loads(meta.read_text())
+            datos['offset'] = parte.stat().st_size
+        except (OSError, ValueError):
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Subida no encontrada")
+
+        if datos['usuario_id'] != usuario_id:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Subida no encontrada")
+        return datos
+
+    @staticmethod
+    def _estado(datos: Dict[str, Any], foto=None) -> SubidaFotoEstado:
+        """Respuesta con el estado de una subida"""
+        return SubidaFotoEstado(
+            id=datos.get('id'),
+            offset=datos.get('offset', 0),
+            tamano=datos['tamano'],
+            tamano_parte=settings.UPLOAD_PART_SIZE,
+            foto=foto
+        )
+
+    @staticmethod
+    def _borrar(subida_id: str):
+        """Borrar los archivos locales de una subida"""
+        for ruta in SubidaFotoService._rutas(subida_id):
+            try:
+                ruta.unlink()
+            except FileNotFoundError:
+                pass
+
+    @staticmethod
+    def _limpiar_vencidas():
+        """Borrar las subidas sin actividad por más de UPLOAD_SESSION_TTL segundos"""
+        limite = time.time() - settings.UPLOAD_SESSION_TTL
+        for ruta in _directorio().glob('*.part'):
+            try:
+                if ruta.stat().st_mtime < limite:
+                    ruta.unlink()
+                    ruta.with_suffix('.json').unlink(missing_ok=True)
+            except OSError:
+                pass
+
+    @staticmethod
+    async def iniciar(datos: SubidaFotoCreate, usuario_id: str) -> SubidaFotoEstado:
+        """Iniciar (o retomar) la subida de una foto
+
+        Si el servidor ya tiene un archivo con ese hash se responde con la foto
+        y no hace falta enviar nada.
+        """
+        if datos.content_type not in settings.ALLOWED_IMAGE_TYPES:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Tipo de archivo no permitido")
+        if datos.tamano > settings.MAX_FILE_SIZE:
+            raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="Archivo demasiado grande")
+
+        existente = await FotoService.buscar(datos.hash)
+        if existente:
+            return SubidaFotoEstado(tamano=datos.tamano, offset=datos.tamano,
+                                    tamano_parte=settings.UPLOAD_PART_SIZE, foto=existente)
+
+        try:
+            await run_in_threadpool(SubidaFotoService._limpiar_vencidas)
+
+            subida_id = str(uuid.uuid5(_NAMESPACE_SUBIDAS, f"{usuario_id}:{datos.hash}"))
+            parte, meta = SubidaFotoService._rutas(subida_id)
+            metadatos = {
+                'id': subida_id,
+                'hash': datos.hash,
+                'tamano': datos.tamano,
+                'content_type': datos.content_type,
+                'usuario_id': usuario_id
+            }
+
+            # Una subida pendiente del mismo archivo se retoma donde quedó
+            if meta.exists() and json.loads(meta.read_text()) == metadatos and parte.exists():
+                return SubidaFotoService._estado(SubidaFotoService._leer(subida_id, usuario_id))
+
+            parte.write_bytes(b'')
+            meta.write_text(json.dumps(metadatos))
+            return SubidaFotoService._estado({**metadatos, 'offset': 0})
+
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error al iniciar subida de foto: {str(e)}"
+            )
+
+    @staticmethod
+    async def obtener(subida_id: str, usuario_id: str) -> SubidaFotoEstado:
+        """Estado de una subida: bytes recibidos para continuar desde ahí"""
+        return SubidaFotoService._estado(SubidaFotoService._leer(subida_id, usuario_id))
+
+    @staticmethod
+    async def escribir_parte(
+        subida_id: str,
+        usuario_id: str,
+        offset: int,
+        contenido: AsyncIterator[bytes]
+    ) -> SubidaFotoEstado:
+        """Escribir una parte en la posición `offset`
+
+        El offset no puede ser mayor que lo ya recibido (409 con el offset
+        actual); uno menor reescribe bytes que ya estaban, lo que permite
+        reenviar una parte cuya respuesta se perdió. Lo recibido antes de un
+        corte queda guardado.
+        """
+        datos = SubidaFotoService._leer(subida_id, usuario_id)
+        if offset > datos['offset']:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Offset inválido: se recibieron {datos['offset']} bytes"
+            )
+
+        parte, _ = SubidaFotoService._rutas(subida_id)
+        posicion = offset
+        try:
+            async with aiofiles.open(parte, 'r+b') as archivo:
+                await archivo.seek(offset)
+                async for bloque in contenido:
+                    if posicion + len(bloque) > datos['tamano']:
+                        raise HTTPException(
+                            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                            detail="La parte excede el tamaño declarado del archivo"
+                        )
+                    await archivo.write(bloque)
+                    posicion += len(bloque)
+
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error al guardar parte de la foto: {str(e)}"
+            )
+
+        return SubidaFotoService._estado({**datos, 'offset': max(posicion, datos['offset'])})
+
+    @staticmethod
+    async def _leer_parte(ruta: Path) -> AsyncIterator[bytes]:
+        """Leer lo recibido por bloques para enviarlo a Storage"""
+        async with aiofiles.open(ruta, 'rb') as archivo:
+            while True:
+                bloque = await archivo.read(settings.UPLOAD_CHUNK_SIZE)
+                if not bloque:
+                    break
+                yield bloque
+
+    @staticmethod
+    async def finalizar(subida_id: str, usuario_id: str) -> SubidaFotoEstado:
+        """Verificar la subida completa y guardar la foto en Storage"""
+        datos = SubidaFotoService._leer(subida_id, usuario_id)
+        if datos['offset'] != datos['tamano']:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Subida incompleta: se recibieron {datos['offset']} de {datos['tamano']} bytes"
+            )
+
+        parte, _ = SubidaFotoService._rutas(subida_id)
+        try:
+            def calcular_hash() -> str:
+                with open(parte, 'rb') as archivo:
+                    return hash_archivo(archivo, datos['tamano'], settings.UPLOAD_CHUNK_SIZE)
+
+            if await run_in_threadpool(calcular_hash) != datos['hash']:
+                # Contenido corrupto: hay que subirlo de nuevo desde el inicio
+                SubidaFotoService._borrar(subida_id)
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="El contenido recibido no coincide con el hash declarado"
+                )
+
+            foto = await FotoService.buscar(datos['hash'])
+            if not foto:
+                foto = await FotoService.subir(
+                    SubidaFotoService._leer_parte(parte),
+                    datos['hash'],
+                    datos['content_type'],
+                    datos['tamano'],
+                    usuario_id
+                )
+
+            SubidaFotoService._borrar(subida_id)
+            return SubidaFotoService._estado(datos, foto)
+
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error al finalizar subida de foto: {str(e)}"
+            )
+
+    @staticmethod
+    async def cancelar(subida_id: str, usuario_id: str):
+        """Descartar una subida y lo recibido hasta ahora"""
+        SubidaFotoService._leer(subida_id, usuario_id)
+        SubidaFotoService._borrar(subida_id)
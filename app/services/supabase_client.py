@@ -1,3 +1,8 @@
+from typing import AsyncIterable, Optional
+
+import httpx
+from postgrest import AsyncPostgrestClient
+from storage3 import AsyncStorageClient
 from supabase import create_client, Client
 from app.config import settings
 
@@ -11,4 +16,110 @@ supabase_client: Client = create_client(
 supabase_service: Client = create_client(
     settings.SUPABASE_URL,
     settings.SUPABASE_SERVICE_KEY
-)
\ No newline at end of file
+)
+
+
+class _PooledPostgrestClient(AsyncPostgrestClient):
+    """Cliente PostgREST asíncrono con límites de pool configurables"""
+
+    def create_session(self, base_url: str, headers: dict, timeout) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            base_url=base_url,
+            headers=headers,
+            timeout=timeout,
+            follow_redirects=True,
+            verify=settings.SSL_VERIFY,
+            limits=httpx.Limits(
+                max_connections=settings.DATABASE_POOL_SIZE + settings.DATABASE_MAX_OVERFLOW,
+                max_keepalive_connections=settings.DATABASE_POOL_SIZE,
+                keepalive_expiry=settings.DATABASE_KEEPALIVE_EXPIRY
+            )
+        )
+
+
+class AsyncSupabaseClient:
+    """Cliente asíncrono de Supabase usado por los servicios de la API
+
+    Las consultas se ejecutan con `await ....execute()` sobre un pool de
+    conexiones HTTP compartido, de modo que una consulta lenta no bloquea
+    el event loop de uvicorn.
+    """
+
+    def __init__(self, url: str, key: str):
+        headers = {
+            "apiKey": key,
+            "Authorization": f"Bearer {key}"
+        }
+        self.postgrest = _PooledPostgrestClient(
+            f"{url}/rest/v1",
+            headers=headers,
+            timeout=settings.QUERY_TIMEOUT
+        )
+        self.storage = AsyncStorageClient(f"{url}/storage/v1", headers)
+        # Sesión propia para subir objetos por bloques (storage3 exige el contenido completo)
+        self.storage_http = httpx.AsyncClient(
+            base_url=f"{url}/storage/v1",
+            headers=headers,
+            timeout=settings.QUERY_TIMEOUT,
+            verify=settings.SSL_VERIFY,
+            limits=httpx.Limits(
+                max_connections=settings.DATABASE_POOL_SIZE,
+                max_keepalive_connections=settings.DATABASE_POOL_SIZE,
+                keepalive_expiry=settings.DATABASE_KEEPALIVE_EXPIRY
+            )
+        )
+
+    def table(self, table_name: str):
+        """Iniciar consulta sobre una tabla o vista"""
+        return self.postgrest.from_(table_name)
+
+    def rpc(self, fn: str, params: dict = None):
+        """Iniciar llamada a una función de base de datos"""
+        return self.postgrest.rpc(fn, params or {})
+
+    async def upload_stream(
+        self,
+        bucket: str,
+        path: str,
+        chunks: AsyncIterable[bytes],
+        content_type: str,
+        size: Optional[int] = None
+    ) -> httpx.Response:
+        """Subir un objeto a Storage enviando el cuerpo a medida que se lee
+
+        Cada bloque se escribe en el socket antes de pedir el siguiente, así
+        la memoria usada no depende del tamaño del archivo. Con `size` se
+        envía Content-Length; sin él, el cuerpo va con Transfer-Encoding
+        chunked. Una excepción del iterador aborta la subida.
+        """
+        headers = {
+            'Content-Type': content_type,
+            'Cache-Control': 'max-age=3600',
+            'x-upsert': 'false'
+        }
+        if size is not None:
+            headers['Content-Length'] = str(size)
+
+        return await self.storage_http.post(f"/object/{bucket}/{path}", content=chunks, headers=headers)
+
+    async def aclose(self):
+        """Cerrar las conexiones del pool"""
+        await self.postgrest.aclose()
+        await self.storage_http.aclose()
+
+
+def returning(query, columns: str):
+    """Pedir que una escritura (insert/update) devuelva `columns`, incluidos embebidos
+
+    PostgREST acepta `select` también en escrituras con `return=representation`,
+    así la fila escrita y sus relaciones llegan en la misma respuesta.
+    """
+    query.params = query.params.set('select', ''.join(columns.split()))
+    return query
+
+
+# Cliente asíncrono global para los servicios
+supabase_async = AsyncSupabaseClient(
+    settings.SUPABASE_URL,
+    settings.SUPABASE_KEY
+)
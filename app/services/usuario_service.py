@@ -2,7 +2,7 @@ from typing import List, Optional
 from fastapi import HTTPException, status
 
 from app.models.usuario import Usuario, UsuarioCreate, UsuarioUpdate, UsuarioResponse
-from app.services.supabase_client import supabase_client
+from app.services.supabase_client import supabase_async
 from app.services.auth_service import AuthService
 
 
@@ -13,7 +13,7 @@ class UsuarioService:
     async def get_all_usuarios() -> List[UsuarioResponse]:
         """Obtener todos los usuarios"""
         try:
-            response = supabase_client.table('usuarios').select('*').eq('activo', True).order('nombre').execute()
+            response = await supabase_async.table('usuarios').select('*').eq('activo', True).order('nombre').execute()
             
             return [UsuarioResponse(**user) for user in response.data]
             
@@ -27,7 +27,7 @@ class UsuarioService:
     async def get_usuario_by_id(usuario_id: str) -> Optional[UsuarioResponse]:
         """Obtener usuario por ID"""
         try:
-            response = supabase_client.table('usuarios').select('*').eq('id', usuario_id).execute()
+            response = await supabase_async.table('usuarios').select('*').eq('id', usuario_id).execute()
             
             if not response.data:
                 return None
@@ -45,7 +45,7 @@ class UsuarioService:
         """Crear nuevo usuario"""
         try:
             # Verificar si el username ya existe
-            existing = supabase_client.table('usuarios').select('id').eq('username', usuario_data.username).execute()
+            existing = await supabase_async.table('usuarios').select('id').eq('username', usuario_data.username).execute()
             
             if existing.data:
                 raise HTTPException(
@@ -58,7 +58,7 @@ class UsuarioService:
             password = user_dict.pop('password')  # Extraer contraseña
             
             # Hashear contraseña usando la función de Supabase
-            hash_response = supabase_client.rpc('hash_password', {'password': password}).execute()
+            hash_response = await supabase_async.rpc('hash_password', {'password': password}).execute()
             
             if not hash_response.data:
                 raise HTTPException(
@@ -69,7 +69,7 @@ class UsuarioService:
             # Agregar hash de contraseña a los datos
             user_dict['password_hash'] = hash_response.data
             
-            response = supabase_client.table('usuarios').insert(user_dict).execute()
+            response = await supabase_async.table('usuarios').insert(user_dict).execute()
             
             if not response.data:
                 raise HTTPException(
@@ -100,7 +100,10 @@ class UsuarioService:
                     detail="No hay datos para actualizar"
                 )
             
-            response = supabase_client.table('usuarios').update(update_data).eq('id', usuario_id).execute()
+            response = await supabase_async.table('usuarios').update(update_data).eq('id', usuario_id).execute()
+            
+            # Rol o estado pueden haber cambiado: no seguir sirviendo la copia cacheada
+            AuthService.invalidate_user(usuario_id)
             
             if not response.data:
                 return None
@@ -119,7 +122,10 @@ class UsuarioService:
     async def delete_usuario(usuario_id: str) -> bool:
         """Desactivar usuario (soft delete)"""
         try:
-            response = supabase_client.table('usuarios').update({'activo': False}).eq('id', usuario_id).execute()
+            response = await supabase_async.table('usuarios').update({'activo': False}).eq('id', usuario_id).execute()
+            
+            # La desactivación se aplica en la siguiente petición del usuario
+            AuthService.invalidate_user(usuario_id)
             
             return len(response.data) > 0
             
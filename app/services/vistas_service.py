@@ -0,0 +1,107 @@
+import asyncio
+import time
+from typing import Optional
+from fastapi.concurrency import run_in_threadpool
+
+from app.services.supabase_client import supabase_service
+from app.config import settings
+
+
+class VistasService:
+    """Refresco de las vistas materializadas de progreso
+
+    Las escrituras de la API llaman a `notify_write()`; un ciclo en segundo
+    plano espera `MATVIEW_REFRESH_DEBOUNCE` segundos sin escrituras (nunca más
+    de la mitad de `MATVIEW_MAX_STALENESS`) y ejecuta
+    `refrescar_vistas_materializadas`. El mismo ciclo verifica periódicamente
+    para recoger escrituras hechas fuera de la API.
+
+    La función solo puede ejecutarla el rol de servicio (un refresco forzado
+    es costoso), así que se llama con el cliente de servicio.
+    """
+
+    _ultima_escritura: Optional[float] = None
+    _ultima_verificacion: Optional[float] = None
+    _ultimo_error: Optional[str] = None
+    _evento: Optional[asyncio.Event] = None
+
+    @staticmethod
+    def _get_evento() -> asyncio.Event:
+        if VistasService._evento is None:
+            VistasService._evento = asyncio.Event()
+        return VistasService._evento
+
+    @staticmethod
+    def notify_write():
+        """Registrar una escritura que deja las vistas desactualizadas"""
+        VistasService._ultima_escritura = time.monotonic()
+        VistasService._get_evento().set()
+
+    @staticmethod
+    def is_fresh() -> bool:
+        """Indicar si las vistas materializadas cumplen el límite de desactualización"""
+        ahora = time.monotonic()
+        verificacion = VistasService._ultima_verificacion
+        escritura = VistasService._ultima_escritura
+
+        if verificacion is None or ahora - verificacion > settings.MATVIEW_MAX_STALENESS:
+            return False
+
+        # Escritura local todavía no incluida y más antigua que el límite
+        if escritura is not None and escritura > verificacion and ahora - escritura > settings.MATVIEW_MAX_STALENESS:
+            return False
+
+        return True
+
+    @staticmethod
+    async def refresh(forzar: bool = False) -> dict:
+        """Refrescar las vistas materializadas si hay cambios pendientes"""
+        inicio = time.monotonic()
+        try:
+            response = await run_in_threadpool(
+                supabase_service.rpc('refrescar_vistas_materializadas', {'forzar': forzar}).execute
+            )
+            resultado = response.data or {}
+        except Exception as e:
+            if str(e) != VistasService._ultimo_error:
+                print(f"⚠️  Error refrescando vistas materializadas: {e}")
+            VistasService._ultimo_error = str(e)
+            return {'refrescado': False, 'motivo': 'error'}
+
+        VistasService._ultimo_error = None
+        if resultado.get('motivo') != 'en_curso':
+            VistasService._ultima_verificacion = inicio
+
+        if resultado.get('refrescado'):
+            # El dashboard cacheado pudo construirse con datos previos al refresco
+            from app.services.dashboard_service import dashboard_cache
+            dashboard_cache.invalidate()
+
+        return resultado
+
+    @staticmethod
+    async def run_refresh_loop():
+        """Ciclo de refresco con debounce (se ejecuta durante la vida de la app)"""
+        evento = VistasService._get_evento()
+        intervalo = settings.MATVIEW_MAX_STALENESS / 2
+
+        while True:
+            try:
+                await asyncio.wait_for(evento.wait(), timeout=intervalo)
+            except asyncio.TimeoutError:
+                pass
+
+            if evento.is_set():
+                # Esperar a que se calmen las escrituras, con tope de espera
+                limite = time.monotonic() + intervalo
+                while True:
+                    espera = min(
+                        VistasService._ultima_escritura + settings.MATVIEW_REFRESH_DEBOUNCE,
+                        limite
+                    ) - time.monotonic()
+                    if espera <= 0:
+                        break
+                    await asyncio.sleep(espera)
+                evento.clear()
+
+            await VistasService.refresh()
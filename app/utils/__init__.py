@@ -4,11 +4,14 @@ Utilidades para la API BDPA Los Encinos
 
 from .validators import validate_torre, validate_piso, validate_sector
 from .helpers import format_date, calculate_percentage
+from .cache import TTLCache, get_cache_stats
 
 __all__ = [
     "validate_torre",
     "validate_piso", 
     "validate_sector",
     "format_date",
-    "calculate_percentage"
+    "calculate_percentage",
+    "TTLCache",
+    "get_cache_stats"
 ]
\ No newline at end of file
@@ -0,0 +1,96 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+
+# Registro de caches para exponer sus métricas
+_caches: Dict[str, "TTLCache"] = {}
+
+
+class TTLCache:
+    """Cache en memoria con expiración por entrada y contadores de aciertos
+
+    Es local a cada proceso: con varios workers cada uno mantiene su propia
+    copia y el TTL acota cuánto puede quedar desactualizada.
+    """
+
+    def __init__(self, name: str, ttl: float, max_items: int = 1000):
+        self.name = name
+        self.ttl = ttl
+        self.max_items = max_items
+        self._items: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._locks: Dict[Hashable, asyncio.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._generation = 0
+        _caches[name] = self
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Obtener valor vigente o None"""
+        item = self._items.get(key)
+        if item is not None:
+            expires_at, value = item
+            if expires_at > time.monotonic():
+                self._items.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._items[key]
+
+        self.misses += 1
+        return None
+
+    def set(self, key: Hashable, value: Any):
+        """Guardar valor con el TTL configurado"""
+        self._items[key] = (time.monotonic() + self.ttl, value)
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_items:
+            self._items.popitem(last=False)
+
+    def invalidate(self, *keys: Hashable):
+        """Eliminar entradas (todas si no se indican claves)"""
+        if not keys:
+            self._items.clear()
+        for key in keys:
+            self._items.pop(key, None)
+        self.invalidations += 1
+        self._generation += 1
+
+    async def get_or_set(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Obtener valor o cargarlo, evitando cargas concurrentes de la misma clave"""
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            # Otra petición pudo cargarlo mientras esperábamos
+            item = self._items.get(key)
+            if item is not None and item[0] > time.monotonic():
+                return item[1]
+
+            generation = self._generation
+            value = await loader()
+            # No guardar si hubo una invalidación durante la carga
+            if generation == self._generation:
+                self.set(key, value)
+            return value
+
+    def stats(self) -> dict:
+        """Métricas de uso del cache"""
+        total = self.hits + self.misses
+        return {
+            "ttl": self.ttl,
+            "size": len(self._items),
+            "max_items": self.max_items,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0
+        }
+
+
+def get_cache_stats() -> dict:
+    """Métricas de todos los caches registrados"""
+    return {name: cache.stats() for name, cache in _caches.items()}
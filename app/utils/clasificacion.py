@@ -0,0 +1,154 @@
+import numbers
+from collections import abc
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+
+import numpy as np
+
+
+# Códigos de estado: el mayor de cada medición es su estado final
+OK, ADVERTENCIA, FALLA = 0, 1, 2
+ESTADOS = np.array(['OK', 'ADVERTENCIA', 'FALLA'])
+
+# (tipo de medición, columna de valores, nombre del rango)
+REGLAS = (
+    ('alambrico-t1', 'alambrico_t1', 'alambrico'),
+    ('alambrico-t2', 'alambrico_t2', 'alambrico'),
+    ('coaxial', 'coaxial', 'coaxial'),
+    ('fibra', 'potencia_tx', 'fibra_potencia'),
+    ('fibra', 'potencia_rx', 'fibra_potencia'),
+    ('wifi', 'wifi', 'wifi'),
+)
+
+COLUMNAS = tuple(dict.fromkeys(columna for _, columna, _ in REGLAS))
+
+# Columnas que se evalúan para cada tipo
+_COLUMNAS_POR_TIPO: Dict[str, tuple] = {}
+for _tipo, _columna, _ in REGLAS:
+    _COLUMNAS_POR_TIPO[_tipo] = _COLUMNAS_POR_TIPO.get(_tipo, ()) + (_columna,)
+
+
+def clasificar_columnas(
+    tipos: np.ndarray,
+    columnas: Mapping[str, np.ndarray],
+    rangos: Mapping[str, Mapping[str, float]],
+    margen: float,
+    certificacion: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """Clasificar un lote en formato columnar y devolver los códigos de estado
+
+    `tipos` es un arreglo de strings con el tipo de medición; `columnas` tiene
+    un arreglo float por columna de valores (NaN = sin valor) y
+    `certificacion` el estado de certificación como string ('' = sin valor).
+    Un valor fuera del rango es FALLA, a menos de `margen` unidades de los
+    bordes es ADVERTENCIA y en otro caso OK; fibra toma el peor de TX y RX.
+    """
+    tipos = np.asarray(tipos)
+    codigos = np.zeros(len(tipos), dtype=np.int8)
+
+    with np.errstate(invalid='ignore'):
+        for tipo, columna, nombre_rango in REGLAS:
+            rango = rangos.get(nombre_rango)
+            valores = columnas.get(columna)
+            if not rango or valores is None:
+                continue
+
+            minimo, maximo = rango['min'], rango['max']
+            aplica = (tipos == tipo) & ~np.isnan(valores)
+            codigo = np.where(
+                (valores < minimo) | (valores > maximo),
+                FALLA,
+                np.where(
+                    (valores < minimo + margen) | (valores > maximo - margen),
+                    ADVERTENCIA,
+                    OK
+                )
+            )
+            codigos = np.where(aplica, np.maximum(codigos, codigo), codigos)
+
+    if certificacion is not None:
+        es_certificacion = tipos == 'certificacion'
+        codigos[es_certificacion & (certificacion == 'RECHAZADO')] = FALLA
+        codigos[es_certificacion & (certificacion == 'APROBADO_CON_OBSERVACIONES')] = ADVERTENCIA
+
+    return codigos.astype(np.int8)
+
+
+# Tipos que numpy convierte a float igual que las comparaciones de Python
+# (None pasa a NaN, es decir, sin valor)
+_TIPOS_DIRECTOS = frozenset({float, int, bool, type(None)})
+
+
+def _a_float(valor: Any) -> Optional[float]:
+    """Convertir un valor a float; None si no es comparable con los rangos"""
+    if valor is None:
+        return np.nan
+    if not isinstance(valor, numbers.Number) or isinstance(valor, complex):
+        return None
+    try:
+        return float(valor)
+    except OverflowError:
+        return np.inf if valor > 0 else -np.inf
+
+
+def columnas_desde_filas(tipos: Sequence[Any], valores: Sequence[Any]) -> tuple:
+    """Convertir mediciones fila a fila (dicts de valores) al formato columnar
+
+    Devuelve (tipos, columnas, certificacion, invalidas). `invalidas` marca las
+    filas con un valor no numérico en una columna de su tipo: esas mediciones
+    se clasifican como OK, igual que las reglas fila a fila.
+    """
+    n = len(tipos)
+    tipos_array = np.array([getattr(tipo, 'value', tipo) for tipo in tipos], dtype=object)
+    es_mapping = np.fromiter(
+        (type(fila) is dict or isinstance(fila, abc.Mapping) for fila in valores), dtype=bool, count=n
+    )
+    invalidas = ~es_mapping
+    columnas = {}
+
+    for columna in COLUMNAS:
+        columnas[columna] = np.full(n, np.nan)
+        tipos_columna = [tipo for tipo, columnas_tipo in _COLUMNAS_POR_TIPO.items() if columna in columnas_tipo]
+        aplica = es_mapping.copy()
+        aplica &= np.logical_or.reduce([tipos_array == tipo for tipo in tipos_columna])
+        indices = np.flatnonzero(aplica)
+        crudos = [valores[i].get(columna) for i in indices]
+
+        # Camino rápido: todos los valores son números de Python o None
+        if all(type(valor) in _TIPOS_DIRECTOS for valor in crudos):
+            try:
+                columnas[columna][indices] = np.array(crudos, dtype=float)
+                continue
+            except OverflowError:
+                pass
+
+        for i, valor in zip(indices, crudos):
+            convertido = _a_float(valor)
+            if convertido is None:
+                invalidas[i] = True
+            else:
+                columnas[columna][i] = convertido
+
+    certificacion = np.full(n, '', dtype=object)
+    for i in np.flatnonzero((tipos_array == 'certificacion') & es_mapping):
+        estado_certificacion = valores[i].get('certificacion')
+        if isinstance(estado_certificacion, str):
+            certificacion[i] = estado_certificacion
+
+    return tipos_array, columnas, certificacion, invalidas
+
+
+def clasificar_mediciones(
+    tipos: Sequence[Any],
+    valores: Sequence[Any],
+    rangos: Mapping[str, Mapping[str, float]],
+    margen: float
+) -> List[str]:
+    """Clasificar mediciones fila a fila y devolver sus estados como strings"""
+    if not len(tipos):
+        return []
+
+    tipos_array, columnas, certificacion, invalidas = columnas_desde_filas(tipos, valores)
+    codigos = clasificar_columnas(tipos_array, columnas, rangos, margen, certificacion)
+    codigos[invalidas] = OK
+
+    return ESTADOS[codigos].tolist()
@@ -0,0 +1,153 @@
+from numbers import Real
+from typing import Any, Dict, List
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+# Formatos columnares soportados
+PARQUET = 'parquet'
+ARROW = 'arrow'
+
+# Claves numéricas de `valores` que pasan a columnas propias (ValoresMedicion)
+COLUMNAS_VALORES = ('alambrico_t1', 'alambrico_t2', 'coaxial', 'potencia_tx', 'potencia_rx', 'atenuacion', 'wifi')
+
+_TIMESTAMP = pa.timestamp('us', tz='UTC')
+
+_COLUMNAS_USUARIO = [
+    pa.field('usuario_username', pa.string()),
+    pa.field('usuario_nombre', pa.string()),
+    pa.field('usuario_rol', pa.string()),
+]
+
+ESQUEMAS = {
+    'avances': pa.schema([
+        pa.field('id', pa.string(), nullable=False),
+        pa.field('obra_id', pa.string()),
+        pa.field('fecha', _TIMESTAMP),
+        pa.field('torre', pa.string()),
+        pa.field('piso', pa.int16()),
+        pa.field('sector', pa.string()),
+        pa.field('tipo_espacio', pa.string()),
+        pa.field('ubicacion', pa.string()),
+        pa.field('categoria', pa.string()),
+        pa.field('porcentaje', pa.int16()),
+        pa.field('observaciones', pa.string()),
+        pa.field('foto_path', pa.string()),
+        pa.field('foto_url', pa.string()),
+        pa.field('usuario_id', pa.string()),
+        pa.field('sync_status', pa.string()),
+        pa.field('last_sync', _TIMESTAMP),
+        pa.field('created_at', _TIMESTAMP),
+        pa.field('updated_at', _TIMESTAMP),
+        pa.field('deleted_at', _TIMESTAMP),
+    ] + _COLUMNAS_USUARIO),
+    'mediciones': pa.schema([
+        pa.field('id', pa.string(), nullable=False),
+        pa.field('obra_id', pa.string()),
+        pa.field('fecha', _TIMESTAMP),
+        pa.field('torre', pa.string()),
+        pa.field('piso', pa.int16()),
+        pa.field('identificador', pa.string()),
+        pa.field('tipo_medicion', pa.string()),
+        pa.field('estado', pa.string()),
+    ] + [pa.field(columna, pa.float64()) for columna in COLUMNAS_VALORES] + [
+        pa.field('certificacion', pa.string()),
+        pa.field('observaciones', pa.string()),
+        pa.field('usuario_id', pa.string()),
+        pa.field('sync_status', pa.string()),
+        pa.field('created_at', _TIMESTAMP),
+        pa.field('updated_at', _TIMESTAMP),
+    ] + _COLUMNAS_USUARIO),
+}
+
+# Columnas que salen de `valores` en vez de la fila
+_DESDE_VALORES = frozenset(COLUMNAS_VALORES + ('certificacion',))
+
+
+def _numero(valor: Any) -> Any:
+    """Valor numérico de `valores`; None si no es un número"""
+    return valor if isinstance(valor, Real) and not isinstance(valor, bool) else None
+
+
+def tabla_arrow(tabla: str, filas: List[Dict[str, Any]]) -> pa.Table:
+    """Convertir filas de PostgREST a una tabla Arrow con el esquema de la tabla
+
+    En mediciones, `valores` se aplana en una columna float por cada valor
+    numérico y una columna de texto para la certificación.
+    """
+    esquema = ESQUEMAS[tabla]
+    columnas = []
+
+    for campo in esquema:
+        if tabla == 'mediciones' and campo.name in _DESDE_VALORES:
+            valores = [(fila.get('valores') or {}).get(campo.name) for fila in filas]
+            if campo.name != 'certificacion':
+                valores = [_numero(valor) for valor in valores]
+        else:
+            valores = [fila.get(campo.name) for fila in filas]
+
+        if pa.types.is_timestamp(campo.type):
+            # PostgREST entrega timestamptz como texto ISO 8601 con offset
+            columnas.append(pa.array(valores, pa.string()).cast(campo.type))
+        else:
+            columnas.append(pa.array(valores, campo.type))
+
+    return pa.Table.from_arrays(columnas, schema=esquema)
+
+
+class _Sumidero:
+    """Archivo de salida en memoria que se vacía después de cada escritura"""
+
+    closed = False
+
+    def __init__(self):
+        self._partes: List[bytes] = []
+
+    def write(self, datos) -> int:
+        self._partes.append(bytes(datos))
+        return len(datos)
+
+    def flush(self):
+        pass
+
+    def drenar(self) -> bytes:
+        datos = b''.join(self._partes)
+        self._partes.clear()
+        return datos
+
+
+class EscritorColumnar:
+    """Escritor incremental de Parquet o Arrow IPC (stream)
+
+    Cada llamada a `escribir` agrega un row group (Parquet) o un record batch
+    (Arrow) y devuelve los bytes generados, listos para enviarse; `cerrar`
+    devuelve el final del archivo (footer de Parquet o marca de fin de Arrow).
+    """
+
+    def __init__(self, tabla: str, formato: str):
+        self.tabla = tabla
+        self.formato = formato
+        self._sumidero = _Sumidero()
+        esquema = ESQUEMAS[tabla]
+
+        if formato == PARQUET:
+            self._writer = pq.ParquetWriter(self._sumidero, esquema, compression='zstd')
+        elif formato == ARROW:
+            self._writer = pa.ipc.new_stream(self._sumidero, esquema)
+        else:
+            raise ValueError(f"Formato columnar no soportado: {formato}")
+
+    def escribir(self, filas: List[Dict[str, Any]]) -> bytes:
+        """Escribir un bloque de filas y devolver los bytes producidos"""
+        tabla = tabla_arrow(self.tabla, filas)
+        if self.formato == PARQUET:
+            self._writer.write_table(tabla, row_group_size=max(len(filas), 1))
+        else:
+            self._writer.write_table(tabla)
+        return self._sumidero.drenar()
+
+    def cerrar(self) -> bytes:
+        """Cerrar el archivo y devolver los últimos bytes"""
+        self._writer.close()
+        return self._sumidero.drenar()
@@ -0,0 +1,53 @@
+import io
+from typing import Dict, Optional
+
+from PIL import Image, ImageOps
+
+
+_CALIDAD_WEBP = {'thumb': 70, 'medium': 80}
+
+
+def ruta_derivada(ruta: str, nombre: str) -> str:
+    """Ruta en Storage de una derivada, junto al original (`foto.jpg` -> `foto_thumb.webp`)"""
+    base = ruta.rsplit('.', 1)[0] if '.' in ruta.rsplit('/', 1)[-1] else ruta
+    return f"{base}_{nombre}.webp"
+
+
+def ruta_desde_url(url: Optional[str], bucket: str) -> Optional[str]:
+    """Ruta del objeto dentro del bucket a partir de su URL pública"""
+    if not url:
+        return None
+    marcador = f"/object/public/{bucket}/"
+    if marcador not in url:
+        return None
+    return url.split('?', 1)[0].split(marcador, 1)[1]
+
+
+def generar_derivadas(datos: bytes, lado_thumb: int, lado_medium: int) -> Dict[str, bytes]:
+    """Generar la miniatura y la versión mediana en WebP de una foto
+
+    Se ejecuta en un proceso aparte. Las derivadas quedan rotadas según la
+    orientación EXIF y sin metadatos, de modo que se muestran derechas en
+    cualquier visor. Nunca se amplía una foto más chica que el tamaño pedido.
+    """
+    with Image.open(io.BytesIO(datos)) as original:
+        # En JPEG decodifica directamente a una escala reducida (mucho menos memoria)
+        original.draft('RGB', (lado_medium, lado_medium))
+        imagen = ImageOps.exif_transpose(original)
+
+        modo = 'RGBA' if 'A' in imagen.getbands() or 'transparency' in imagen.info else 'RGB'
+        if imagen.mode != modo:
+            imagen = imagen.convert(modo)
+
+        medium = imagen.copy()
+        medium.thumbnail((lado_medium, lado_medium), Image.LANCZOS)
+        thumb = medium.copy()
+        thumb.thumbnail((lado_thumb, lado_thumb), Image.LANCZOS)
+
+    resultado = {}
+    for nombre, derivada in (('thumb', thumb), ('medium', medium)):
+        salida = io.BytesIO()
+        derivada.save(salida, 'WEBP', quality=_CALIDAD_WEBP[nombre], method=4)
+        resultado[nombre] = salida.getvalue()
+    return resultado
+
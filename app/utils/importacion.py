@@ -0,0 +1,150 @@
+import codecs
+import csv
+import io
+import unicodedata
+from datetime import date, datetime
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+
+# Extensiones aceptadas para importar planillas
+FORMATOS_IMPORTACION = ('csv', 'xlsx')
+
+# Tamaño de lectura al contar líneas de un CSV
+_BLOQUE_LECTURA = 1024 * 1024
+
+# Encabezados alternativos frecuentes en las planillas de obra
+_ALIAS_COLUMNAS = {
+    'tipo': 'tipo_espacio',
+    'espacio': 'tipo_espacio',
+    'avance': 'porcentaje',
+    '%': 'porcentaje',
+    'observacion': 'observaciones',
+    'obs': 'observaciones',
+}
+
+
+def normalizar_columna(nombre: Any) -> str:
+    """Normalizar un encabezado: minúsculas, sin acentos y con '_' en vez de espacios"""
+    texto = unicodedata.normalize('NFKD', str(nombre or '')).encode('ascii', 'ignore').decode()
+    texto = '_'.join(texto.strip().lower().replace('-', ' ').split())
+    return _ALIAS_COLUMNAS.get(texto, texto)
+
+
+def parse_fecha(valor: Any) -> Any:
+    """Convertir fechas escritas a mano (dd/mm/aaaa, dd-mm-aaaa) a datetime
+
+    Los valores que no calzan con esos formatos se devuelven tal cual para que
+    los valide el modelo.
+    """
+    if isinstance(valor, datetime):
+        return valor
+    if isinstance(valor, date):
+        return datetime(valor.year, valor.month, valor.day)
+    if isinstance(valor, str):
+        for formato in ('%d/%m/%Y', '%d-%m-%Y', '%d/%m/%y'):
+            try:
+                return datetime.strptime(valor.strip(), formato)
+            except ValueError:
+                continue
+    return valor
+
+
+class LectorFilas:
+    """Lector incremental de una planilla CSV o XLSX
+
+    Recorre el archivo fila a fila sin cargarlo completo en memoria y entrega
+    cada fila como (número de fila en la planilla, dict columna -> valor). Las
+    celdas vacías no aparecen en el dict y las filas vacías se omiten;
+    `fila_actual` es la última fila leída.
+    """
+
+    def __init__(self, archivo: BinaryIO, formato: str):
+        self.formato = formato
+        self.total_estimado: Optional[int] = None
+        self._libro = None
+
+        if formato == 'csv':
+            self._filas = self._abrir_csv(archivo)
+        elif formato == 'xlsx':
+            self._filas = self._abrir_xlsx(archivo)
+        else:
+            raise ValueError(f"Formato no soportado: use {' o '.join(FORMATOS_IMPORTACION)}")
+
+        try:
+            encabezados = next(self._filas)
+        except StopIteration:
+            raise ValueError("El archivo está vacío")
+
+        self.columnas = [normalizar_columna(nombre) for nombre in encabezados]
+        self.fila_actual = 1
+
+    def _abrir_csv(self, archivo: BinaryIO) -> Iterator[List[Any]]:
+        # Contar líneas por bloques para estimar el total (los saltos de línea
+        # dentro de campos entre comillas lo sobreestiman levemente) y
+        # comprobar que sea UTF-8; si no, es un CSV de Excel en Windows-1252
+        lineas = 0
+        decodificador = codecs.getincrementaldecoder('utf-8')()
+        encoding = 'utf-8-sig'
+        while True:
+            bloque = archivo.read(_BLOQUE_LECTURA)
+            if not bloque:
+                break
+            lineas += bloque.count(b'\n')
+            if encoding != 'cp1252':
+                try:
+                    decodificador.decode(bloque)
+                except UnicodeDecodeError:
+                    encoding = 'cp1252'
+        archivo.seek(0)
+        self.total_estimado = max(lineas - 1, 0)
+
+        texto = io.TextIOWrapper(archivo, encoding=encoding, newline='')
+        # Excel en español separa con ';' en vez de ','
+        primera = texto.readline()
+        texto.seek(0)
+        delimitador = ';' if primera.count(';') > primera.count(',') else ','
+        return csv.reader(texto, delimiter=delimitador)
+
+    def _abrir_xlsx(self, archivo: BinaryIO) -> Iterator[List[Any]]:
+        from openpyxl import load_workbook
+
+        # read_only recorre las filas desde el zip sin construir la hoja en memoria
+        self._libro = load_workbook(archivo, read_only=True, data_only=True)
+        hoja = self._libro.active
+        if hoja.max_row:
+            self.total_estimado = max(hoja.max_row - 1, 0)
+        return hoja.iter_rows(values_only=True)
+
+    def siguientes(self, cantidad: int) -> List[Tuple[int, Dict[str, Any]]]:
+        """Leer hasta `cantidad` filas con datos; lista vacía al terminar"""
+        filas = []
+        for valores in self._filas:
+            self.fila_actual += 1
+            fila = {}
+            for columna, valor in zip(self.columnas, valores):
+                if isinstance(valor, str):
+                    valor = valor.strip() or None
+                if columna and valor is not None:
+                    fila[columna] = valor
+            if not fila:
+                continue
+
+            filas.append((self.fila_actual, fila))
+            if len(filas) >= cantidad:
+                break
+
+        return filas
+
+    def close(self):
+        """Liberar el libro XLSX abierto"""
+        if self._libro is not None:
+            self._libro.close()
+            self._libro = None
+
+
+def formato_archivo(nombre: Optional[str]) -> str:
+    """Formato de importación según la extensión del archivo"""
+    extension = (nombre or '').rsplit('.', 1)[-1].lower() if '.' in (nombre or '') else ''
+    if extension not in FORMATOS_IMPORTACION:
+        raise ValueError(f"Formato no soportado: use {' o '.join(FORMATOS_IMPORTACION)}")
+    return extension
@@ -0,0 +1,52 @@
+import base64
+import uuid
+from datetime import datetime
+from typing import Optional, Tuple, Union
+
+
+# Header con el cursor de la siguiente página en los listados
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(fecha: Union[datetime, str], id: str) -> str:
+    """Codificar la posición (fecha, id) del último registro de una página"""
+    if isinstance(fecha, datetime):
+        fecha = fecha.isoformat()
+    return base64.urlsafe_b64encode(f"{fecha}|{id}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    """Decodificar cursor a (fecha, id); ValueError si no es válido"""
+    try:
+        padding = "=" * (-len(cursor) % 4)
+        fecha, id = base64.urlsafe_b64decode(cursor + padding).decode().split("|", 1)
+        datetime.fromisoformat(fecha.replace("Z", "+00:00"))
+        uuid.UUID(id)
+    except Exception:
+        raise ValueError("Cursor de paginación inválido")
+
+    return fecha, id
+
+
+def apply_keyset(query, cursor: Optional[Tuple[str, str]], columna: str = 'fecha', desc: bool = True):
+    """Ordenar por (columna, id) y continuar después del cursor
+
+    Por defecto ordena por fecha descendente, como los listados. `columna <=
+    cursor` (o `>=` en orden ascendente) permite recorrer el índice por esa
+    columna; el `or` descarta los registros con el mismo valor ya entregados.
+    """
+    if cursor:
+        valor, id = cursor
+        if desc:
+            query = query.lte(columna, valor).or_(f'{columna}.lt."{valor}",id.lt.{id}')
+        else:
+            query = query.gte(columna, valor).or_(f'{columna}.gt."{valor}",id.gt.{id}')
+    return query.order(columna, desc=desc).order('id', desc=desc)
+
+
+def next_cursor(items: list, limit: int) -> Optional[str]:
+    """Cursor de la siguiente página (None si es la última)"""
+    if len(items) < limit or not items:
+        return None
+    ultimo = items[-1]
+    return encode_cursor(ultimo.fecha, ultimo.id)
@@ -0,0 +1,222 @@
+import logging
+import math
+import time
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+from jose import JWTError, jwt
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+
+from app.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """Límite de intentos por clave en una ventana fija de tiempo
+
+    Es local a cada proceso, igual que TTLCache: con varios workers el límite
+    efectivo se multiplica por la cantidad de workers.
+    """
+
+    def __init__(self, max_requests: int, window: float, max_keys: int = 10000):
+        self.max_requests = max_requests
+        self.window = window
+        self.max_keys = max_keys
+        self._windows: "OrderedDict[Hashable, list]" = OrderedDict()
+        self.rejected = 0
+
+    def hit(self, key: Hashable) -> Optional[int]:
+        """Registrar un intento; devuelve segundos de espera si se excedió el límite"""
+        now = time.monotonic()
+        ventana = self._windows.get(key)
+
+        if ventana is None or ventana[0] + self.window <= now:
+            ventana = [now, 0]
+            self._windows[key] = ventana
+        self._windows.move_to_end(key)
+
+        # Descartar las claves más antiguas para acotar la memoria
+        while len(self._windows) > self.max_keys:
+            self._windows.popitem(last=False)
+
+        if ventana[1] >= self.max_requests:
+            self.rejected += 1
+            return max(1, int(ventana[0] + self.window - now + 0.999))
+
+        ventana[1] += 1
+        return None
+
+    def reset(self, key: Hashable):
+        """Olvidar los intentos de una clave"""
+        self._windows.pop(key, None)
+
+
+class MemoryRateLimitBackend:
+    """Token buckets en memoria del proceso (un límite por worker)"""
+
+    def __init__(self, max_keys: int = 10000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, tuple]" = OrderedDict()
+
+    async def consume(self, key: str, capacity: float, refill: float, reserve: float = 0.0) -> float:
+        """Consumir un token si quedan más que `reserve`; devuelve segundos de espera (0 si se permitió)"""
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated) * refill)
+
+        espera = 0.0
+        if tokens - 1 >= reserve:
+            tokens -= 1
+        else:
+            espera = (reserve + 1 - tokens) / refill
+
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+
+        return espera
+
+
+class SupabaseRateLimitBackend:
+    """Token buckets compartidos entre workers en la tabla rate_limit_buckets
+
+    Si la función no responde se permite la petición: una caída del backend
+    de límites no debe dejar a la API sin servicio. Solo el rol de servicio
+    puede ejecutar `consumir_token_bucket`, así que se llama con ese cliente.
+    """
+
+    def __init__(self):
+        self._ultimo_error: Optional[str] = None
+
+    async def consume(self, key: str, capacity: float, refill: float, reserve: float = 0.0) -> float:
+        """Consumir un token del bucket compartido; devuelve segundos de espera"""
+        from starlette.concurrency import run_in_threadpool
+        from app.services.supabase_client import supabase_service
+
+        try:
+            response = await run_in_threadpool(supabase_service.rpc('consumir_token_bucket', {
+                'p_clave': key,
+                'p_capacidad': capacity,
+                'p_recarga': refill,
+                'p_reserva': reserve
+            }).execute)
+            self._ultimo_error = None
+        except Exception as e:
+            if str(e) != self._ultimo_error:
+                self._ultimo_error = str(e)
+                logger.warning("Backend de rate limiting no disponible, se permiten las peticiones: %s", e)
+            return 0.0
+
+        resultado = response.data or {}
+        if resultado.get('permitido', True):
+            return 0.0
+        return float(resultado.get('espera') or 1)
+
+
+# Prioridades: las más bajas se descartan primero
+PRIORIDAD_ALTA = 0     # Escrituras de terreno y login
+PRIORIDAD_NORMAL = 1
+PRIORIDAD_BAJA = 2     # Consultas periódicas del dashboard
+
+# Fracción del bucket que cada prioridad debe dejar libre para las superiores
+_RESERVA_BUCKET = {PRIORIDAD_ALTA: 0.0, PRIORIDAD_NORMAL: 0.2, PRIORIDAD_BAJA: 0.5}
+
+# Fracción de RATE_LIMIT_MAX_INFLIGHT a partir de la cual se descarta cada prioridad
+_UMBRAL_CARGA = {PRIORIDAD_ALTA: 1.0, PRIORIDAD_NORMAL: 0.8, PRIORIDAD_BAJA: 0.5}
+
+_RUTAS_EXENTAS = ('/', '/health', '/health/cache', '/docs', '/redoc', '/openapi.json')
+_RUTAS_ESCRITURA = ('/avances', '/mediciones')
+
+
+def request_priority(method: str, path: str) -> int:
+    """Clasificar la petición según su prioridad ante sobrecarga"""
+    if path.startswith('/auth/login'):
+        return PRIORIDAD_ALTA
+    if method in ('POST', 'PUT', 'PATCH', 'DELETE') and path.startswith(_RUTAS_ESCRITURA):
+        return PRIORIDAD_ALTA
+    if path.startswith('/dashboard'):
+        return PRIORIDAD_BAJA
+    return PRIORIDAD_NORMAL
+
+
+class RateLimitMiddleware:
+    """Middleware ASGI de rate limiting y descarte de carga
+
+    - Token bucket por usuario (peticiones con JWT válido) o por IP
+      (peticiones anónimas), con RATE_LIMIT_REQUESTS / RATE_LIMIT_IP_REQUESTS
+      tokens que se recargan en RATE_LIMIT_WINDOW segundos.
+    - Con el bucket casi vacío o demasiadas peticiones en curso se rechazan
+      primero las consultas del dashboard y por último las escrituras.
+    - Los rechazos responden 429 (límite) o 503 (sobrecarga) con Retry-After.
+    """
+
+    def __init__(self, app, backend=None):
+        self.app = app
+        self.backend = backend or (
+            SupabaseRateLimitBackend() if settings.RATE_LIMIT_BACKEND == 'supabase' else MemoryRateLimitBackend()
+        )
+        self.inflight = 0
+        self.rejected = {429: 0, 503: 0}
+
+    def _client_key(self, headers: Headers, client) -> tuple:
+        """Clave del bucket y capacidad: usuario del token o IP del cliente"""
+        authorization = headers.get('authorization', '')
+        if authorization.lower().startswith('bearer '):
+            try:
+                payload = jwt.decode(authorization[7:], settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+                if payload.get('user_id'):
+                    return f"user:{payload['user_id']}", settings.RATE_LIMIT_REQUESTS
+            except JWTError:
+                pass  # Token inválido: se limita por IP y el endpoint responde 401
+
+        client_ip = client[0] if client else 'desconocido'
+        return f"ip:{client_ip}", settings.RATE_LIMIT_IP_REQUESTS
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or not settings.RATE_LIMIT_ENABLED:
+            return await self.app(scope, receive, send)
+
+        method = scope['method']
+        path = scope['path']
+        if method == 'OPTIONS' or path in _RUTAS_EXENTAS:
+            return await self.app(scope, receive, send)
+
+        prioridad = request_priority(method, path)
+
+        # Descarte por carga: peticiones en curso en este worker
+        if self.inflight >= settings.RATE_LIMIT_MAX_INFLIGHT * _UMBRAL_CARGA[prioridad]:
+            return await self._reject(scope, receive, send, 503, 1, "Servidor sobrecargado. Intenta nuevamente en unos segundos.")
+
+        key, capacity = self._client_key(Headers(scope=scope), scope.get('client'))
+        espera = await self.backend.consume(
+            key,
+            capacity,
+            capacity / settings.RATE_LIMIT_WINDOW,
+            capacity * _RESERVA_BUCKET[prioridad]
+        )
+        if espera:
+            return await self._reject(scope, receive, send, 429, espera, "Demasiadas solicitudes. Intenta nuevamente más tarde.")
+
+        self.inflight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.inflight -= 1
+
+    async def _reject(self, scope, receive, send, status_code: int, espera: float, mensaje: str):
+        """Responder el rechazo con el mismo formato que el manejador de errores"""
+        self.rejected[status_code] += 1
+        response = JSONResponse(
+            status_code=status_code,
+            content={
+                "error": True,
+                "message": mensaje,
+                "status_code": status_code
+            },
+            headers={"Retry-After": str(max(1, math.ceil(espera)))}
+        )
+        await response(scope, receive, send)
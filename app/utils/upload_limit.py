@@ -0,0 +1,128 @@
+import hashlib
+from typing import AsyncIterator, BinaryIO, Optional
+
+from fastapi import HTTPException, UploadFile, status
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+
+from app.config import settings
+
+
+# Espacio para los demás campos del formulario y los separadores multipart
+_MARGEN_FORMULARIO = 64 * 1024
+
+# Rutas con un límite propio en vez de MAX_FILE_SIZE
+_LIMITES_POR_RUTA = {
+    '/avances/import': lambda: settings.MAX_IMPORT_FILE_SIZE,
+}
+
+
+class ArchivoDemasiadoGrande(Exception):
+    """El archivo superó el tamaño máximo mientras se leía"""
+
+
+async def leer_por_bloques(archivo: UploadFile, max_bytes: int, tamano_bloque: int) -> AsyncIterator[bytes]:
+    """Leer un archivo subido por bloques, cortando al pasar `max_bytes`
+
+    UploadFile lee en un hilo aparte cuando el archivo ya pasó a disco, así
+    que la lectura no bloquea el event loop.
+    """
+    leidos = 0
+    while True:
+        bloque = await archivo.read(tamano_bloque)
+        if not bloque:
+            break
+        leidos += len(bloque)
+        if leidos > max_bytes:
+            raise ArchivoDemasiadoGrande(f"El archivo supera {max_bytes} bytes")
+        yield bloque
+
+
+def hash_archivo(archivo: BinaryIO, max_bytes: int, tamano_bloque: int) -> str:
+    """SHA-256 (hex) del contenido de un archivo leído por bloques desde el inicio
+
+    Es bloqueante: llamarla con run_in_threadpool. El archivo queda al final.
+    """
+    archivo.seek(0)
+    digest = hashlib.sha256()
+    leidos = 0
+    while True:
+        bloque = archivo.read(tamano_bloque)
+        if not bloque:
+            break
+        leidos += len(bloque)
+        if leidos > max_bytes:
+            raise ArchivoDemasiadoGrande(f"El archivo supera {max_bytes} bytes")
+        digest.update(bloque)
+    return digest.hexdigest()
+
+
+def limite_cuerpo(path: str) -> int:
+    """Tamaño máximo del cuerpo multipart aceptado en una ruta"""
+    limite = _LIMITES_POR_RUTA.get(path)
+    return (limite() if limite else settings.MAX_FILE_SIZE) + _MARGEN_FORMULARIO
+
+
+class UploadSizeLimitMiddleware:
+    """Middleware ASGI que corta los formularios multipart demasiado grandes
+
+    Starlette guarda el archivo completo (en memoria o en disco) antes de
+    llamar al endpoint, por lo que el límite de tamaño se aplica aquí: si
+    Content-Length ya lo supera se responde 413 sin leer el cuerpo, y si no
+    viene (chunked) se cuentan los bytes recibidos y se aborta al pasarlo.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.rejected = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['method'] not in ('POST', 'PUT', 'PATCH'):
+            return await self.app(scope, receive, send)
+
+        headers = Headers(scope=scope)
+        if not headers.get('content-type', '').startswith('multipart/form-data'):
+            return await self.app(scope, receive, send)
+
+        limite = limite_cuerpo(scope['path'])
+        declarado = self._content_length(headers)
+        if declarado is not None and declarado > limite:
+            return await self._reject(scope, receive, send)
+
+        recibidos = 0
+
+        async def receive_limitado():
+            nonlocal recibidos
+            message = await receive()
+            if message['type'] == 'http.request':
+                recibidos += len(message.get('body', b''))
+                if recibidos > limite:
+                    self.rejected += 1
+                    # FastAPI propaga la excepción del parseo del formulario al manejador de errores
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail="Archivo demasiado grande"
+                    )
+            return message
+
+        await self.app(scope, receive_limitado, send)
+
+    @staticmethod
+    def _content_length(headers: Headers) -> Optional[int]:
+        try:
+            return int(headers['content-length'])
+        except (KeyError, ValueError):
+            return None
+
+    async def _reject(self, scope, receive, send):
+        """Responder 413 con el mismo formato que el manejador de errores"""
+        self.rejected += 1
+        response = JSONResponse(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            content={
+                "error": True,
+                "message": "Archivo demasiado grande",
+                "status_code": status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+            }
+        )
+        await response(scope, receive, send)
@@ -69,6 +69,12 @@ class Config:
     CACHE_MAX_ITEMS = int(os.getenv('CACHE_MAX_ITEMS', '1000'))
     AUTO_REFRESH_INTERVAL = int(os.getenv('AUTO_REFRESH_INTERVAL', '300000'))  # 5 minutos
     
+    # Optimización de fotos antes de subirlas (lado mayor en px, jpeg|webp, calidad 1-100)
+    FOTO_OPTIMIZAR = os.getenv('FOTO_OPTIMIZAR', 'True').lower() == 'true'
+    FOTO_MAX_DIMENSION = int(os.getenv('FOTO_MAX_DIMENSION', '1920'))
+    FOTO_FORMATO = os.getenv('FOTO_FORMATO', 'jpeg').lower()
+    FOTO_CALIDAD = int(os.getenv('FOTO_CALIDAD', '80'))
+    
     # UI Features
     SHOW_TOOLTIPS = os.getenv('SHOW_TOOLTIPS', 'True').lower() == 'true'
     ENABLE_ANIMATIONS = os.getenv('ENABLE_ANIMATIONS', 'True').lower() == 'true'
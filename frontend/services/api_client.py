@@ -3,14 +3,28 @@ Cliente para comunicación con la API FastAPI
 """
 
 import requests
+import hashlib
 import json
-from typing import Optional, Dict, Any, List
+import mimetypes
+import threading
+import time
+from typing import Optional, Dict, Any, List, Callable
 from datetime import datetime
 import os
 
 class APIClient:
     """Cliente para interactuar with la API FastAPI"""
     
+    # Registros por página al recorrer listados con cursor
+    PAGE_SIZE = 200
+    
+    # Espera máxima (segundos) que se acepta de un Retry-After antes de reintentar
+    MAX_RETRY_AFTER = 10
+    MAX_RATE_LIMIT_RETRIES = 3
+    
+    # Intentos seguidos sin avanzar antes de abandonar una subida de foto
+    MAX_UPLOAD_RETRIES = 6
+    
     def __init__(self, base_url: str):
         self.base_url = base_url.rstrip('/')
         self.session = requests.Session()
@@ -30,10 +44,15 @@ class APIClient:
         from requests.adapters import HTTPAdapter
         from urllib3.util.retry import Retry
         
+        # Los errores de servidor de GET/PUT/DELETE se reintentan aquí; los
+        # rechazos por carga (429/503 con Retry-After) solo en _make_request,
+        # con espera acotada, para no multiplicar los intentos
         retry_strategy = Retry(
             total=3,
             backoff_factor=1,
-            status_forcelist=[429, 500, 502, 503, 504],
+            status_forcelist=[500, 502, 504],
+            respect_retry_after_header=False,
+            raise_on_status=False,
         )
         
         adapter = HTTPAdapter(max_retries=retry_strategy)
@@ -63,6 +82,17 @@ class APIClient:
         
         try:
             response = self.session.request(method, url, **kwargs)
+            
+            # 429/503 con Retry-After: el servidor rechazó la petición sin
+            # procesarla, por lo que también es seguro reintentar escrituras
+            for _ in range(self.MAX_RATE_LIMIT_RETRIES):
+                espera = self._retry_after(response)
+                if espera is None or espera > self.MAX_RETRY_AFTER:
+                    break
+                time.sleep(espera)
+                self._rewind_files(kwargs.get('files'))
+                response = self.session.request(method, url, **kwargs)
+            
             return response
         except requests.exceptions.Timeout:
             raise APIException("Timeout: El servidor tardó demasiado en responder")
@@ -71,6 +101,24 @@ class APIClient:
         except requests.exceptions.RequestException as e:
             raise APIException(f"Error de red: {str(e)}")
     
+    @staticmethod
+    def _retry_after(response: requests.Response) -> Optional[float]:
+        """Segundos indicados por Retry-After en un rechazo por carga (None si no aplica)"""
+        if response.status_code not in (429, 503):
+            return None
+        try:
+            return max(0.0, float(response.headers.get('Retry-After', '')))
+        except ValueError:
+            return None
+    
+    @staticmethod
+    def _rewind_files(files: Optional[Dict[str, Any]]):
+        """Volver al inicio de los archivos adjuntos antes de reenviarlos"""
+        for value in (files or {}).values():
+            file_obj = value[1] if isinstance(value, tuple) else value
+            if hasattr(file_obj, 'seek'):
+                file_obj.seek(0)
+    
     def _handle_response(self, response: requests.Response) -> Dict[Any, Any]:
         """Manejar respuesta de la API"""
         try:
@@ -84,6 +132,10 @@ class APIClient:
                 raise APIException("Acceso denegado. Permisos insuficientes.")
             elif response.status_code == 404:
                 raise APIException("Recurso no encontrado.")
+            elif response.status_code in (429, 503) and 'Retry-After' in response.headers:
+                raise APIException(
+                    f"Servidor ocupado. Intenta nuevamente en {response.headers['Retry-After']} segundos."
+                )
             elif response.status_code == 422:
                 try:
                     error_detail = response.json().get('detail', 'Error de validación')
@@ -151,31 +203,143 @@ class APIClient:
         return self._handle_response(response)
     
     # Métodos de avances
-    def get_avances(self, **filters) -> List[Dict[str, Any]]:
-        """Obtener lista de avances con filtros"""
+    def _get_paginated(self, endpoint: str, filters: Dict[str, Any], max_items: int) -> List[Dict[str, Any]]:
+        """Obtener listado siguiendo el cursor de paginación (header X-Next-Cursor)"""
         params = {k: v for k, v in filters.items() if v is not None}
-        response = self._make_request('GET', '/avances/', params=params)
-        return self._handle_response(response)
+        params.setdefault('limit', min(self.PAGE_SIZE, max_items))
+        
+        items = []
+        while len(items) < max_items:
+            response = self._make_request('GET', endpoint, params=params)
+            items.extend(self._handle_response(response))
+            
+            cursor = response.headers.get('X-Next-Cursor')
+            if not cursor:
+                break
+            params['cursor'] = cursor
+        
+        return items[:max_items]
+    
+    def get_avances(self, max_items: int = 1000, **filters) -> List[Dict[str, Any]]:
+        """Obtener lista de avances con filtros (hasta max_items, recorriendo páginas)"""
+        return self._get_paginated('/avances/', filters, max_items)
     
     def get_avance(self, avance_id: str) -> Dict[str, Any]:
         """Obtener avance por ID"""
         response = self._make_request('GET', f'/avances/{avance_id}')
         return self._handle_response(response)
     
-    def create_avance(self, avance_data: Dict[str, Any], foto_path: Optional[str] = None) -> Dict[str, Any]:
-        """Crear nuevo avance"""
+    @staticmethod
+    def _hash_archivo(file_path: str) -> str:
+        """SHA-256 del archivo, leído por bloques"""
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as archivo:
+            for bloque in iter(lambda: archivo.read(1024 * 1024), b''):
+                digest.update(bloque)
+        return digest.hexdigest()
+    
+    def _offset_subida(self, subida_id: str, offset: int) -> int:
+        """Bytes que el servidor recibió de una subida (el offset conocido si no responde)"""
+        try:
+            response = self.session.get(f"{self.base_url}/avances/fotos/subidas/{subida_id}", timeout=10)
+        except requests.exceptions.RequestException:
+            return offset
+        if response.status_code != 200:
+            return offset
+        return response.json()['offset']
+    
+    def upload_foto(self, file_path: str,
+                    on_progress: Optional[Callable[[int, int], None]] = None,
+                    cancel_event: Optional[threading.Event] = None) -> Dict[str, Any]:
+        """Subir una foto por partes, retomando después de cortes de conexión
+        
+        Primero se envía el hash: si el servidor ya tiene el archivo no se sube
+        nada. Si no, se envían partes desde el último byte recibido; ante un
+        corte se consulta el offset del servidor y se sigue desde ahí.
+        `on_progress(enviados, total)` se llama después de cada parte y
+        `cancel_event` detiene la subida entre partes (lo recibido se conserva
+        en el servidor y la próxima subida del mismo archivo lo retoma).
+        Devuelve la foto registrada (hash, url, ...).
+        """
+        tamano = os.path.getsize(file_path)
+        content_type = mimetypes.guess_type(file_path)[0] or 'application/octet-stream'
+        
+        response = self._make_request('POST', '/avances/fotos/subidas', json={
+            'hash': self._hash_archivo(file_path),
+            'tamano': tamano,
+            'content_type': content_type
+        })
+        estado = self._handle_response(response)
+        
+        if not estado.get('foto'):
+            subida_id = estado['id']
+            offset = estado['offset']
+            fallos = 0
+            
+            with open(file_path, 'rb') as archivo:
+                while offset < tamano:
+                    if cancel_event and cancel_event.is_set():
+                        raise SubidaCancelada("Subida de foto cancelada")
+                    if on_progress:
+                        on_progress(offset, tamano)
+                    
+                    archivo.seek(offset)
+                    parte = archivo.read(estado['tamano_parte'])
+                    try:
+                        response = self.session.put(
+                            f"{self.base_url}/avances/fotos/subidas/{subida_id}",
+                            params={'offset': offset},
+                            data=parte,
+                            headers={'Content-Type': 'application/octet-stream'},
+                            timeout=(10, 60)
+                        )
+                    except requests.exceptions.RequestException:
+                        response = None
+                    
+                    if response is not None and response.status_code == 200:
+                        offset = response.json()['offset']
+                        fallos = 0
+                        continue
+                    # Los 500/502/504 ya los reintentó el adaptador de la sesión
+                    if response is not None and response.status_code not in (409, 429, 503):
+                        self._handle_response(response)
+                    
+                    # Corte, offset desfasado o rechazo por carga: esperar y
+                    # seguir desde lo que recibió el servidor
+                    fallos += 1
+                    if fallos > self.MAX_UPLOAD_RETRIES:
+                        raise APIException("Se perdió la conexión durante la subida de la foto. Intenta nuevamente.")
+                    retry_after = self._retry_after(response) if response is not None else None
+                    espera = min(2 ** fallos if retry_after is None else retry_after, 30)
+                    if cancel_event:
+                        cancel_event.wait(espera)
+                    else:
+                        time.sleep(espera)
+                    offset = self._offset_subida(subida_id, offset)
+            
+            response = self._make_request('POST', f'/avances/fotos/subidas/{subida_id}/finalizar', timeout=(10, 120))
+            estado = self._handle_response(response)
+        
+        if on_progress:
+            on_progress(tamano, tamano)
+        return estado['foto']
+    
+    def create_avance(self, avance_data: Dict[str, Any], foto_path: Optional[str] = None,
+                      on_progress: Optional[Callable[[int, int], None]] = None,
+                      cancel_event: Optional[threading.Event] = None) -> Dict[str, Any]:
+        """Crear nuevo avance
+        
+        La foto se sube antes con `upload_foto` (reanudable, con progreso y
+        cancelable) y el avance se crea con su hash, sin volver a enviarla.
+        """
         if foto_path and os.path.exists(foto_path):
-            # Subir con archivo
-            files = {'foto': open(foto_path, 'rb')}
-            data = {k: str(v) for k, v in avance_data.items()}
+            foto = self.upload_foto(foto_path, on_progress, cancel_event)
             
-            # Cambiar content-type para form-data
-            headers = dict(self.session.headers)
-            if 'Content-Type' in headers:
-                del headers['Content-Type']
+            data = {k: str(v) for k, v in avance_data.items() if v is not None}
+            data['foto_hash'] = foto['hash']
             
-            response = self._make_request('POST', '/avances/with-form', data=data, files=files, headers=headers)
-            files['foto'].close()
+            # Formulario sin archivo (None quita el Content-Type JSON de la sesión)
+            response = self._make_request('POST', '/avances/with-form', data=data, headers={'Content-Type': None})
         else:
             # Subir sin archivo
             response = self._make_request('POST', '/avances/', json=avance_data)
@@ -192,12 +356,56 @@ class APIClient:
         response = self._make_request('DELETE', f'/avances/{avance_id}')
         return self._handle_response(response)
     
+    def import_avances(self, file_path: str,
+                       on_progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """Importar avances desde una planilla CSV/XLSX
+
+        `on_progress` recibe cada evento de progreso (procesadas, creados,
+        rechazados, total_estimado) mientras el servidor importa; devuelve el
+        resultado final con las filas rechazadas.
+        """
+        # None quita el Content-Type JSON de la sesión y requests pone el multipart
+        headers = {'Content-Type': None, 'Accept': 'application/x-ndjson'}
+        
+        with open(file_path, 'rb') as archivo:
+            files = {'archivo': (os.path.basename(file_path), archivo)}
+            response = self._make_request(
+                'POST', '/avances/import',
+                params={'progreso': 'true'},
+                files=files,
+                headers=headers,
+                stream=True,
+                timeout=(10, 300)
+            )
+        
+        if response.status_code != 200:
+            return self._handle_response(response)
+        
+        resultado = None
+        try:
+            for linea in response.iter_lines(decode_unicode=True):
+                if not linea:
+                    continue
+                evento = json.loads(linea)
+                if evento.get('tipo') == 'resultado':
+                    resultado = evento
+                elif on_progress:
+                    on_progress(evento)
+        except requests.exceptions.RequestException as e:
+            raise APIException(f"Se interrumpió la importación: {str(e)}")
+        finally:
+            response.close()
+        
+        if resultado is None:
+            raise APIException("La importación terminó sin resultado")
+        
+        resultado.pop('tipo', None)
+        return resultado
+    
     # Métodos de mediciones
-    def get_mediciones(self, **filters) -> List[Dict[str, Any]]:
-        """Obtener lista de mediciones con filtros"""
-        params = {k: v for k, v in filters.items() if v is not None}
-        response = self._make_request('GET', '/mediciones/', params=params)
-        return self._handle_response(response)
+    def get_mediciones(self, max_items: int = 1000, **filters) -> List[Dict[str, Any]]:
+        """Obtener lista de mediciones con filtros (hasta max_items, recorriendo páginas)"""
+        return self._get_paginated('/mediciones/', filters, max_items)
     
     def get_medicion(self, medicion_id: str) -> Dict[str, Any]:
         """Obtener medición por ID"""
@@ -209,6 +417,28 @@ class APIClient:
         response = self._make_request('POST', '/mediciones/', json=medicion_data)
         return self._handle_response(response)
     
+    def create_mediciones_bulk(self, mediciones: List[Dict[str, Any]], batch_size: int = 1000) -> Dict[str, Any]:
+        """Registrar mediciones en lotes; devuelve el resultado por ítem de todos los lotes"""
+        resumen = {'total': 0, 'creadas': 0, 'rechazadas': 0, 'resultados': []}
+        
+        for inicio in range(0, len(mediciones), batch_size):
+            response = self._make_request(
+                'POST', '/mediciones/bulk',
+                json={'items': mediciones[inicio:inicio + batch_size]},
+                timeout=120
+            )
+            resultado = self._handle_response(response)
+            
+            resumen['total'] += resultado['total']
+            resumen['creadas'] += resultado['creadas']
+            resumen['rechazadas'] += resultado['rechazadas']
+            # Índices relativos a la lista completa
+            for item in resultado['resultados']:
+                item['indice'] += inicio
+                resumen['resultados'].append(item)
+        
+        return resumen
+    
     def update_medicion(self, medicion_id: str, medicion_data: Dict[str, Any]) -> Dict[str, Any]:
         """Actualizar medición"""
         response = self._make_request('PUT', f'/mediciones/{medicion_id}', json=medicion_data)
@@ -237,4 +467,9 @@ class APIClient:
 
 class APIException(Exception):
     """Excepción personalizada para errores de API"""
+    pass
+
+
+class SubidaCancelada(APIException):
+    """El usuario canceló la subida de una foto"""
     pass
\ No newline at end of file
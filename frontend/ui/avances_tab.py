@@ -8,9 +8,10 @@ from typing import Dict, Any, List, Optional
 import threading
 from datetime import datetime, date
 
-from services.api_client import APIClient, APIException
+from services.api_client import APIClient, APIException, SubidaCancelada
 from utils.formatters import Formatters
 from utils.validators import Validators
+from utils.fotos import FORMATOS_FOTO, OptimizadorFotos
 from config import Config
 
 class AvancesTab:
@@ -73,6 +74,11 @@ class AvancesTab:
                                     command=self.show_new_avance_dialog)
         self.new_button.pack(side=tk.RIGHT)
         
+        # Solo supervisores y admins pueden importar planillas
+        if self.user_data['rol'] in ['Admin', 'Supervisor']:
+            ttk.Button(buttons_frame, text="📥 Importar Planilla", 
+                      command=self.show_import_dialog).pack(side=tk.RIGHT, padx=(0, 5))
+        
         # Indicador de carga
         self.loading_label = ttk.Label(buttons_frame, text="", foreground='blue')
         self.loading_label.pack(side=tk.RIGHT, padx=(0, 10))
@@ -194,7 +200,8 @@ class AvancesTab:
                 filters['search'] = self.filter_search.get()
             
             # Obtener avances
-            avances = self.api_client.get_avances(**filters)
+            # Proyección compacta: solo las columnas que muestra la tabla
+            avances = self.api_client.get_avances(fields='list', **filters)
             
             # Actualizar UI en hilo principal
             self.frame.after(0, lambda: self.update_avances_list(avances))
@@ -249,9 +256,24 @@ class AvancesTab:
                              title="Nuevo Avance", on_success=self.refresh_data)
         dialog.show()
     
+    def show_import_dialog(self):
+        """Seleccionar planilla y mostrar diálogo de importación"""
+        file_path = filedialog.askopenfilename(
+            title="Seleccionar Planilla de Avances",
+            filetypes=[
+                ("Planillas", "*.csv *.xlsx"),
+                ("Todos los archivos", "*.*")
+            ]
+        )
+        
+        if file_path:
+            dialog = ImportarAvancesDialog(self.frame, self.api_client, file_path,
+                                           on_success=self.refresh_data)
+            dialog.show()
+    
     def view_avance_details(self):
         """Ver detalles del avance seleccionado"""
-        selected = self.get_selected_avance()
+        selected = self.get_selected_avance_detail()
         if not selected:
             messagebox.showwarning("Advertencia", "Selecciona un avance para ver detalles")
             return
@@ -262,7 +284,7 @@ class AvancesTab:
     
     def edit_avance(self):
         """Editar avance seleccionado"""
-        selected = self.get_selected_avance()
+        selected = self.get_selected_avance_detail()
         if not selected:
             messagebox.showwarning("Advertencia", "Selecciona un avance para editar")
             return
@@ -311,6 +333,18 @@ class AvancesTab:
         
         return None
     
+    def get_selected_avance_detail(self) -> Optional[Dict[str, Any]]:
+        """Obtener avance seleccionado con todos sus campos (la tabla usa la proyección compacta)"""
+        selected = self.get_selected_avance()
+        if not selected:
+            return None
+        
+        try:
+            return self.api_client.get_avance(selected['id'])
+        except APIException as e:
+            self.show_error(f"Error cargando avance: {str(e)}")
+            return None
+    
     def update_selection_info(self):
         """Actualizar información de selección"""
         total = len(self.avances_data)
@@ -358,6 +392,12 @@ class AvanceDialog:
         
         self.dialog = None
         self.selected_foto_path = None
+        # Optimización en curso de la foto seleccionada (Future)
+        self.foto_optimizada = None
+        # Se activa para detener la subida de la foto entre partes
+        self.cancelar_subida = threading.Event()
+        self.subiendo = False
+        self.cerrado = False
         
         # Variables del formulario
         self.vars = {
@@ -406,6 +446,7 @@ class AvanceDialog:
         self.dialog.resizable(False, False)
         self.dialog.transient(self.parent)
         self.dialog.grab_set()
+        self.dialog.protocol("WM_DELETE_WINDOW", self.cancel)
         
         # Centrar diálogo
         self.center_dialog()
@@ -422,6 +463,21 @@ class AvanceDialog:
         y = (self.dialog.winfo_screenheight() // 2) - (height // 2)
         self.dialog.geometry(f"{width}x{height}+{x}+{y}")
     
+    def cancel(self):
+        """Cerrar sin guardar, descartando la foto optimizada y deteniendo la subida"""
+        self.cancelar_subida.set()
+        self.cerrado = True
+        self.discard_foto_optimizada()
+        self.dialog.destroy()
+    
+    def cancel_button_pressed(self):
+        """Detener la subida en curso, o cerrar el diálogo si no hay ninguna"""
+        if self.subiendo:
+            self.cancelar_subida.set()
+            self.cancel_button.config(text="Cancelando...", state=tk.DISABLED)
+        else:
+            self.cancel()
+    
     def create_dialog_widgets(self):
         """Crear widgets del diálogo"""
         # Frame principal con scroll
@@ -502,8 +558,13 @@ class AvanceDialog:
         self.foto_label = ttk.Label(foto_frame, text="No se ha seleccionado ninguna foto")
         self.foto_label.pack(anchor=tk.W, pady=(0, 10))
         
-        ttk.Button(foto_frame, text="📷 Seleccionar Foto", 
-                  command=self.select_foto).pack(anchor=tk.W)
+        self.foto_button = ttk.Button(foto_frame, text="📷 Seleccionar Foto", 
+                                      command=self.select_foto)
+        self.foto_button.pack(anchor=tk.W)
+        
+        # Progreso de la subida (visible solo mientras se sube)
+        self.upload_progress = ttk.Progressbar(foto_frame, mode='determinate', maximum=100)
+        self.upload_label = ttk.Label(foto_frame, text="")
         
         # Observaciones
         ttk.Label(parent, text="Observaciones:").pack(anchor=tk.W, pady=(0, 5))
@@ -525,12 +586,14 @@ class AvanceDialog:
         buttons_frame = ttk.Frame(parent)
         buttons_frame.pack(fill=tk.X, pady=(20, 0))
         
-        ttk.Button(buttons_frame, text="Cancelar", 
-                  command=self.dialog.destroy).pack(side=tk.RIGHT, padx=(5, 0))
+        self.cancel_button = ttk.Button(buttons_frame, text="Cancelar", 
+                                        command=self.cancel_button_pressed)
+        self.cancel_button.pack(side=tk.RIGHT, padx=(5, 0))
         
         save_text = "Actualizar" if self.is_edit else "Guardar"
-        ttk.Button(buttons_frame, text=save_text, 
-                  command=self.save_avance).pack(side=tk.RIGHT)
+        self.save_button = ttk.Button(buttons_frame, text=save_text, 
+                                      command=self.save_avance)
+        self.save_button.pack(side=tk.RIGHT)
     
     def select_foto(self):
         """Seleccionar archivo de foto"""
@@ -546,6 +609,49 @@ class AvanceDialog:
             self.selected_foto_path = file_path
             filename = file_path.split('/')[-1]
             self.foto_label.config(text=f"Foto seleccionada: {filename}")
+            
+            # Reducir y recomprimir mientras se completa el formulario
+            self.discard_foto_optimizada()
+            if self.config.FOTO_OPTIMIZAR and self.config.FOTO_FORMATO in FORMATOS_FOTO and not self.is_edit:
+                self.foto_label.config(text=f"Foto seleccionada: {filename} (optimizando...)")
+                optimizador = OptimizadorFotos(
+                    self.config.FOTO_MAX_DIMENSION,
+                    self.config.FOTO_FORMATO,
+                    self.config.FOTO_CALIDAD,
+                    self.config.TEMP_DIR
+                )
+                future = optimizador.optimizar_en_segundo_plano(file_path)
+                self.foto_optimizada = future
+                future.add_done_callback(
+                    lambda f: self.dialog.after(0, lambda: self.show_foto_optimizada(f, filename))
+                )
+    
+    def show_foto_optimizada(self, future, filename: str):
+        """Mostrar tamaño original y final de la foto optimizada"""
+        if future is not self.foto_optimizada or not self.dialog.winfo_exists():
+            return
+        
+        try:
+            resultado = future.result()
+        except Exception:
+            self.foto_label.config(text=f"Foto seleccionada: {filename} (se subirá sin optimizar)")
+            return
+        
+        original = Formatters.format_file_size(resultado['tamano_original'])
+        if resultado['temporal']:
+            final = Formatters.format_file_size(resultado['tamano_final'])
+            ancho, alto = resultado['dimensiones']
+            self.foto_label.config(text=f"Foto seleccionada: {filename}\n{original} → {final} ({ancho}x{alto})")
+        else:
+            self.foto_label.config(text=f"Foto seleccionada: {filename} ({original}, ya optimizada)")
+    
+    def discard_foto_optimizada(self):
+        """Descartar la optimización de la foto anterior (borra su archivo temporal al terminar)"""
+        if self.foto_optimizada is not None:
+            self.foto_optimizada.add_done_callback(
+                lambda f: OptimizadorFotos.descartar(f.result()) if not f.exception() else None
+            )
+            self.foto_optimizada = None
     
     def save_avance(self):
         """Guardar avance"""
@@ -570,23 +676,94 @@ class AvanceDialog:
         if self.is_edit:
             threading.Thread(target=self.perform_update, args=(avance_data,), daemon=True).start()
         else:
+            if self.selected_foto_path:
+                self.start_upload()
             threading.Thread(target=self.perform_create, args=(avance_data,), daemon=True).start()
     
+    def start_upload(self):
+        """Mostrar el progreso de la subida y permitir cancelarla"""
+        self.subiendo = True
+        self.cancelar_subida.clear()
+        self.save_button.config(state=tk.DISABLED)
+        self.foto_button.config(state=tk.DISABLED)
+        self.cancel_button.config(text="Cancelar subida", state=tk.NORMAL)
+        self.upload_progress['value'] = 0
+        self.upload_label.config(text="Preparando foto...")
+        self.upload_progress.pack(fill=tk.X, pady=(10, 0))
+        self.upload_label.pack(anchor=tk.W, pady=(5, 0))
+    
+    def show_upload_progress(self, enviados: int, total: int):
+        """Actualizar la barra con los bytes enviados"""
+        if not self.dialog.winfo_exists():
+            return
+        self.upload_progress['value'] = enviados * 100 / total if total else 100
+        self.upload_label.config(
+            text=f"Subiendo foto: {Formatters.format_file_size(enviados)} de {Formatters.format_file_size(total)}"
+        )
+    
+    def finish_upload(self, mensaje: str = ""):
+        """Volver al formulario después de una subida cancelada o fallida"""
+        self.subiendo = False
+        if not self.dialog.winfo_exists():
+            return
+        self.save_button.config(state=tk.NORMAL)
+        self.foto_button.config(state=tk.NORMAL)
+        self.cancel_button.config(text="Cancelar", state=tk.NORMAL)
+        self.upload_progress.pack_forget()
+        self.upload_label.config(text=mensaje)
+        if mensaje:
+            self.upload_label.pack(anchor=tk.W, pady=(5, 0))
+        else:
+            self.upload_label.pack_forget()
+    
     def perform_create(self, avance_data):
         """Crear avance en hilo separado"""
+        foto_path = self.selected_foto_path
+        
+        def on_progress(enviados: int, total: int):
+            self.dialog.after(0, lambda: self.show_upload_progress(enviados, total))
+        
         try:
-            self.api_client.create_avance(avance_data, self.selected_foto_path)
+            # Esperar la optimización de la foto si aún no termina; si falla se sube el original
+            optimizada = None
+            if self.foto_optimizada is not None:
+                try:
+                    optimizada = self.foto_optimizada.result()
+                    foto_path = optimizada['ruta']
+                except Exception as e:
+                    print(f"⚠️  No se pudo optimizar la foto, se sube el original: {e}")
+            
+            # Se pudo cancelar mientras se optimizaba la foto
+            if self.cancelar_subida.is_set():
+                raise SubidaCancelada("Subida de foto cancelada")
+            
+            self.api_client.create_avance(avance_data, foto_path, on_progress, self.cancelar_subida)
+            
+            # Si falla se conserva para reintentar; al cancelar se descarta
+            if optimizada is not None:
+                OptimizadorFotos.descartar(optimizada)
             
             self.dialog.after(0, lambda: messagebox.showinfo("Éxito", "Avance creado correctamente"))
             self.dialog.after(0, self.dialog.destroy)
             
             if self.on_success:
                 self.dialog.after(0, self.on_success)
-                
+        
+        except SubidaCancelada:
+            # Con el diálogo cerrado no hay nada que actualizar
+            if not self.cerrado:
+                self.dialog.after(0, lambda: self.finish_upload(
+                    "Subida cancelada: al guardar continúa desde donde quedó"
+                ))
         except APIException as e:
-            self.dialog.after(0, lambda: messagebox.showerror("Error", f"Error creando avance: {str(e)}"))
+            # El mensaje se toma aquí: `e` deja de existir al salir del except
+            mensaje = f"Error creando avance: {str(e)}"
+            self.dialog.after(0, self.finish_upload)
+            self.dialog.after(0, lambda: messagebox.showerror("Error", mensaje))
         except Exception as e:
-            self.dialog.after(0, lambda: messagebox.showerror("Error", f"Error inesperado: {str(e)}"))
+            mensaje = f"Error inesperado: {str(e)}"
+            self.dialog.after(0, self.finish_upload)
+            self.dialog.after(0, lambda: messagebox.showerror("Error", mensaje))
     
     def perform_update(self, avance_data):
         """Actualizar avance en hilo separado"""
@@ -644,6 +821,133 @@ class AvanceDialog:
         
         return True
 
+class ImportarAvancesDialog:
+    """Diálogo con el progreso de la importación de una planilla de avances"""
+    
+    # Filas rechazadas que se listan en el diálogo
+    MAX_ERRORES_MOSTRADOS = 500
+    
+    def __init__(self, parent, api_client: APIClient, file_path: str,
+                 on_success: Optional[callable] = None):
+        self.parent = parent
+        self.api_client = api_client
+        self.file_path = file_path
+        self.on_success = on_success
+        self.dialog = None
+    
+    def show(self):
+        """Mostrar diálogo e iniciar la importación"""
+        self.dialog = tk.Toplevel(self.parent)
+        self.dialog.title("Importar Avances")
+        self.dialog.geometry("600x450")
+        self.dialog.transient(self.parent)
+        self.dialog.grab_set()
+        
+        self.create_content()
+        
+        threading.Thread(target=self.perform_import, daemon=True).start()
+    
+    def create_content(self):
+        """Crear contenido del diálogo"""
+        main_frame = ttk.Frame(self.dialog)
+        main_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=20)
+        
+        filename = self.file_path.replace('\\', '/').split('/')[-1]
+        ttk.Label(main_frame, text=f"📥 Importando {filename}", 
+                 font=('Arial', 12, 'bold')).pack(anchor=tk.W, pady=(0, 10))
+        
+        self.progress = ttk.Progressbar(main_frame, mode='indeterminate')
+        self.progress.pack(fill=tk.X)
+        self.progress.start(10)
+        
+        self.status_label = ttk.Label(main_frame, text="Subiendo archivo...")
+        self.status_label.pack(anchor=tk.W, pady=(5, 10))
+        
+        # Filas rechazadas
+        errors_frame = ttk.Frame(main_frame)
+        errors_frame.pack(fill=tk.BOTH, expand=True)
+        
+        self.errors_tree = ttk.Treeview(errors_frame, columns=('fila', 'errores'), show='headings', height=10)
+        self.errors_tree.heading('fila', text='Fila')
+        self.errors_tree.heading('errores', text='Errores')
+        self.errors_tree.column('fila', width=60, anchor=tk.CENTER)
+        self.errors_tree.column('errores', width=460)
+        
+        scrollbar = ttk.Scrollbar(errors_frame, orient=tk.VERTICAL, command=self.errors_tree.yview)
+        self.errors_tree.configure(yscrollcommand=scrollbar.set)
+        self.errors_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        self.close_button = ttk.Button(main_frame, text="Cerrar", state='disabled',
+                                       command=self.dialog.destroy)
+        self.close_button.pack(pady=(10, 0))
+    
+    def perform_import(self):
+        """Importar en hilo separado"""
+        def on_progress(evento):
+            self.dialog.after(0, lambda: self.update_progress(evento))
+        
+        try:
+            resultado = self.api_client.import_avances(self.file_path, on_progress=on_progress)
+            self.dialog.after(0, lambda: self.show_result(resultado))
+        except APIException as e:
+            # El mensaje se toma aquí: `e` deja de existir al salir del except
+            mensaje = f"Error importando avances: {str(e)}"
+            self.dialog.after(0, lambda: self.show_failure(mensaje))
+        except Exception as e:
+            mensaje = f"Error inesperado: {str(e)}"
+            self.dialog.after(0, lambda: self.show_failure(mensaje))
+    
+    def update_progress(self, evento: Dict[str, Any]):
+        """Actualizar barra y contadores con un evento de progreso"""
+        procesadas = evento.get('procesadas', 0)
+        total = evento.get('total_estimado')
+        
+        if total:
+            if str(self.progress['mode']) != 'determinate':
+                self.progress.stop()
+                self.progress.config(mode='determinate', maximum=total)
+            self.progress['value'] = min(procesadas, total)
+            texto = f"Procesadas {procesadas:,} de ~{total:,} filas"
+        else:
+            texto = f"Procesadas {procesadas:,} filas"
+        
+        self.status_label.config(
+            text=f"{texto} · {evento.get('creados', 0):,} creados · {evento.get('rechazados', 0):,} rechazados"
+        )
+    
+    def show_result(self, resultado: Dict[str, Any]):
+        """Mostrar resumen y filas rechazadas"""
+        self.progress.stop()
+        self.progress.config(mode='determinate', maximum=1)
+        self.progress['value'] = 1
+        
+        texto = (f"✅ {resultado['creados']:,} avances creados · "
+                 f"{resultado['rechazados']:,} filas rechazadas de {resultado['total']:,}")
+        if resultado.get('error'):
+            texto += f"\n⚠️ {resultado['error']}"
+        self.status_label.config(text=texto)
+        
+        errores = resultado.get('errores', [])
+        for error in errores[:self.MAX_ERRORES_MOSTRADOS]:
+            self.errors_tree.insert('', tk.END, values=(error['fila'], '; '.join(error['errores'])))
+        if len(errores) > self.MAX_ERRORES_MOSTRADOS:
+            self.errors_tree.insert('', tk.END, values=(
+                '...', f"{len(errores) - self.MAX_ERRORES_MOSTRADOS:,} filas rechazadas más"
+            ))
+        
+        self.close_button.config(state='normal')
+        
+        if resultado['creados'] and self.on_success:
+            self.on_success()
+    
+    def show_failure(self, message: str):
+        """Mostrar error que impidió la importación"""
+        self.progress.stop()
+        self.status_label.config(text="❌ La importación no se completó")
+        self.close_button.config(state='normal')
+        messagebox.showerror("Error", message, parent=self.dialog)
+
 class AvanceDetailsDialog:
     """Diálogo para mostrar detalles de un avance"""
     
@@ -737,8 +1041,9 @@ class AvanceDetailsDialog:
             ttk.Label(main_frame, text="📷 Fotografía disponible", 
                      font=('Arial', 10, 'bold')).pack(anchor=tk.W, pady=(10, 5))
             
+            # La versión mediana carga mucho más rápido que el original
             ttk.Button(main_frame, text="Ver Foto", 
-                      command=lambda: self.open_photo(data.get('foto_url'))).pack(anchor=tk.W)
+                      command=lambda: self.open_photo(data.get('medium_url') or data.get('foto_url'))).pack(anchor=tk.W)
         
         # Botón cerrar
         ttk.Button(main_frame, text="Cerrar", 
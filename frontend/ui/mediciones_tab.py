@@ -200,7 +200,8 @@ class MedicionesTab:
                 filters['search'] = self.filter_search.get()
             
             # Obtener mediciones
-            mediciones = self.api_client.get_mediciones(**filters)
+            # Proyección compacta: solo las columnas que muestra la tabla
+            mediciones = self.api_client.get_mediciones(fields='list', **filters)
             
             # Actualizar UI en hilo principal
             self.frame.after(0, lambda: self.update_mediciones_list(mediciones))
@@ -286,7 +287,7 @@ class MedicionesTab:
     
     def view_medicion_details(self):
         """Ver detalles de la medición seleccionada"""
-        selected = self.get_selected_medicion()
+        selected = self.get_selected_medicion_detail()
         if not selected:
             messagebox.showwarning("Advertencia", "Selecciona una medición para ver detalles")
             return
@@ -296,7 +297,7 @@ class MedicionesTab:
     
     def edit_medicion(self):
         """Editar medición seleccionada"""
-        selected = self.get_selected_medicion()
+        selected = self.get_selected_medicion_detail()
         if not selected:
             messagebox.showwarning("Advertencia", "Selecciona una medición para editar")
             return
@@ -345,6 +346,18 @@ class MedicionesTab:
         
         return None
     
+    def get_selected_medicion_detail(self) -> Optional[Dict[str, Any]]:
+        """Obtener medición seleccionada con todos sus campos (la tabla usa la proyección compacta)"""
+        selected = self.get_selected_medicion()
+        if not selected:
+            return None
+        
+        try:
+            return self.api_client.get_medicion(selected['id'])
+        except APIException as e:
+            self.show_error(f"Error cargando medición: {str(e)}")
+            return None
+    
     def update_selection_info(self):
         """Actualizar información de selección"""
         total = len(self.mediciones_data)
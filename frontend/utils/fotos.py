@@ -0,0 +1,105 @@
+"""
+Optimización de fotos antes de subirlas
+"""
+
+import os
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict
+
+from PIL import Image, ImageOps
+
+# Formatos de salida: formato de Pillow y extensión
+FORMATOS_FOTO = {
+    'jpeg': ('JPEG', 'jpg'),
+    'webp': ('WEBP', 'webp'),
+}
+
+
+class OptimizadorFotos:
+    """Reduce y recomprime las fotos de la cámara antes de subirlas
+
+    La foto se redimensiona para que su lado mayor no supere `max_dimension`,
+    se rota según la orientación EXIF y se guarda en JPEG o WebP con la
+    calidad indicada, sin EXIF, XMP ni miniaturas embebidas (solo se
+    conserva el perfil de color). Si el resultado no es más chico que el
+    original se sube el original.
+
+    La misma foto con la misma configuración produce siempre el mismo
+    archivo, así la deduplicación por hash del servidor sigue funcionando.
+    """
+
+    # Un solo hilo: Pillow libera el GIL al decodificar y redimensionar, y
+    # así la interfaz no compite con varias fotos a la vez
+    _ejecutor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='fotos')
+
+    def __init__(self, max_dimension: int, formato: str, calidad: int, destino: Path):
+        if formato not in FORMATOS_FOTO:
+            raise ValueError(f"Formato de foto no soportado: {formato}")
+        self.max_dimension = max_dimension
+        self.formato = formato
+        self.calidad = calidad
+        self.destino = Path(destino)
+
+    def optimizar(self, file_path: str) -> Dict[str, Any]:
+        """Optimizar una foto; devuelve ruta a subir, tamaños original y final y dimensiones"""
+        formato_pillow, extension = FORMATOS_FOTO[self.formato]
+        tamano_original = os.path.getsize(file_path)
+
+        with Image.open(file_path) as original:
+            # JPEG: decodificar directamente a una escala cercana a la final
+            original.draft('RGB', (self.max_dimension, self.max_dimension))
+            icc_profile = original.info.get('icc_profile')
+            imagen = ImageOps.exif_transpose(original)
+
+            # JPEG no admite transparencia; WebP la conserva
+            modo = 'RGBA' if formato_pillow == 'WEBP' and 'A' in imagen.getbands() else 'RGB'
+            if imagen.mode != modo:
+                imagen = imagen.convert(modo)
+            imagen.thumbnail((self.max_dimension, self.max_dimension), Image.LANCZOS)
+
+            opciones = {'quality': self.calidad}
+            if icc_profile:
+                opciones['icc_profile'] = icc_profile
+            if formato_pillow == 'JPEG':
+                opciones.update(optimize=True, progressive=True)
+            else:
+                opciones['method'] = 4
+
+            self.destino.mkdir(parents=True, exist_ok=True)
+            ruta = self.destino / f"foto_{uuid.uuid4().hex}.{extension}"
+            imagen.save(ruta, formato_pillow, **opciones)
+            ancho, alto = imagen.size
+
+        tamano_final = ruta.stat().st_size
+        if tamano_final >= tamano_original:
+            ruta.unlink()
+            return {
+                'ruta': file_path,
+                'temporal': False,
+                'tamano_original': tamano_original,
+                'tamano_final': tamano_original,
+                'dimensiones': None
+            }
+
+        return {
+            'ruta': str(ruta),
+            'temporal': True,
+            'tamano_original': tamano_original,
+            'tamano_final': tamano_final,
+            'dimensiones': (ancho, alto)
+        }
+
+    def optimizar_en_segundo_plano(self, file_path: str) -> Future:
+        """Optimizar en el hilo de fotos; el Future entrega el resultado de `optimizar`"""
+        return self._ejecutor.submit(self.optimizar, file_path)
+
+    @staticmethod
+    def descartar(resultado: Dict[str, Any]):
+        """Borrar el archivo temporal de una optimización"""
+        if resultado and resultado.get('temporal'):
+            try:
+                os.remove(resultado['ruta'])
+            except OSError:
+                pass
@@ -2,11 +2,22 @@ from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 import uvicorn
+import asyncio
+import logging
 from contextlib import asynccontextmanager
 
 from app.config import settings
-from app.routers import auth, avances, mediciones, dashboard, usuarios
-from app.services.supabase_client import supabase_client
+from app.routers import auth, avances, mediciones, dashboard, usuarios, export
+from app.services.supabase_client import supabase_async
+from app.services.dashboard_service import DashboardService
+from app.services.vistas_service import VistasService
+from app.services.reclasificacion_service import ReclasificacionService
+from app.services.foto_service import FotoService
+from app.utils.cache import get_cache_stats
+from app.utils.rate_limit import RateLimitMiddleware
+from app.utils.upload_limit import UploadSizeLimitMiddleware
+
+logging.basicConfig(level=settings.LOG_LEVEL, format=settings.LOG_FORMAT)
 
 
 @asynccontextmanager
@@ -20,14 +31,14 @@ async def lifespan(app: FastAPI):
     # Verificar conexión con Supabase
     try:
         # Test de conexión más robusto
-        response = supabase_client.table('usuarios').select('count').execute()
+        response = await supabase_async.table('usuarios').select('count').execute()
         usuarios_count = len(response.data) if response.data else 0
         print("✅ Conexión con Supabase establecida")
         print(f"📊 Usuarios en sistema: {usuarios_count}")
         
         # Verificar buckets de Storage
         try:
-            buckets = supabase_client.storage.list_buckets()
+            buckets = await supabase_async.storage.list_buckets()
             bucket_names = [b.name for b in buckets] if buckets else []
             if 'avances-fotos' in bucket_names and 'mediciones-docs' in bucket_names:
                 print("✅ Buckets de Storage configurados correctamente")
@@ -35,15 +46,33 @@ async def lifespan(app: FastAPI):
                 print("⚠️  Algunos buckets de Storage no están configurados")
         except Exception as storage_error:
             print(f"⚠️  Error verificando Storage: {storage_error}")
+        
+        # Precalentar cache del dashboard
+        try:
+            await DashboardService.get_dashboard_data()
+            print("✅ Cache del dashboard precalentado")
+        except Exception as cache_error:
+            print(f"⚠️  No se pudo precalentar el cache del dashboard: {cache_error}")
             
     except Exception as e:
         print(f"❌ Error crítico conectando con Supabase: {e}")
         print("💡 Verifica las variables SUPABASE_URL y SUPABASE_KEY en .env")
     
+    # Refresco de vistas materializadas en segundo plano
+    refresco_vistas = asyncio.create_task(VistasService.run_refresh_loop())
+    
     yield
     
     # Shutdown
     print("🛑 Cerrando aplicación BDPA Los Encinos")
+    refresco_vistas.cancel()
+    try:
+        await refresco_vistas
+    except asyncio.CancelledError:
+        pass
+    await ReclasificacionService.shutdown()
+    await FotoService.shutdown()
+    await supabase_async.aclose()
     print("👋 ¡Hasta luego!")
 
 
@@ -57,6 +86,13 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Límite de tamaño de formularios multipart, aplicado mientras se recibe el cuerpo
+app.add_middleware(UploadSizeLimitMiddleware)
+
+# Rate limiting y descarte de carga (se registra antes que CORS para que los
+# rechazos también lleven las cabeceras CORS)
+app.add_middleware(RateLimitMiddleware)
+
 # Configurar CORS
 app.add_middleware(
     CORSMiddleware,
@@ -64,6 +100,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Retry-After", "Content-Disposition", "X-Export-Watermark"],
 )
 
 # Manejador global de excepciones
@@ -103,7 +140,7 @@ async def health_check():
     """Endpoint de verificación de salud"""
     try:
         # Verificar conexión con Supabase
-        response = supabase_client.table('usuarios').select('count').execute()
+        response = await supabase_async.table('usuarios').select('count').execute()
         
         return {
             "status": "healthy",
@@ -120,12 +157,18 @@ async def health_check():
             }
         )
 
+@app.get("/health/cache")
+async def cache_stats():
+    """Métricas de aciertos/fallos de los caches en memoria"""
+    return get_cache_stats()
+
 # Incluir routers
 app.include_router(auth.router, prefix="/auth", tags=["Autenticación"])
 app.include_router(usuarios.router, prefix="/usuarios", tags=["Usuarios"])
 app.include_router(avances.router, prefix="/avances", tags=["Avances"])
 app.include_router(mediciones.router, prefix="/mediciones", tags=["Mediciones"])
 app.include_router(dashboard.router, prefix="/dashboard", tags=["Dashboard"])
+app.include_router(export.router, prefix="/export", tags=["Exportación"])
 
 if __name__ == "__main__":
     uvicorn.run(
@@ -0,0 +1,457 @@
+#!/usr/bin/env python3
+"""
+Benchmarks de rendimiento para la API de BDPA Los Encinos
+
+Uso:
+    python scripts/benchmark_api.py concurrency --endpoint /avances/ --clients 1 10 50
+    python scripts/benchmark_api.py tower-progress --iterations 20
+    python scripts/benchmark_api.py matviews --seed 500000 --iterations 20 --cleanup
+    python scripts/benchmark_api.py pagination --endpoint /avances/ --page 500 --limit 100
+    python scripts/benchmark_api.py login --concurrency 100
+    python scripts/benchmark_api.py writes --iterations 50
+    python scripts/benchmark_api.py export --seed 1000000 --formato ndjson --legacy --cleanup
+
+Ejecutar contra la versión anterior y la nueva de la API con los mismos
+parámetros para comparar resultados (--label permite identificar cada corrida).
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Optional
+
+import httpx
+
+# Agregar el directorio raíz al path (escenarios que usan los servicios directamente)
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+BASE_URL = "http://localhost:8000"
+
+
+async def login(client: httpx.AsyncClient, username: str, password: str) -> str:
+    """Obtener token de acceso"""
+    response = await client.post("/auth/login", json={"username": username, "password": password})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+def print_latencies(nombre: str, latencias: list, duracion: float, errores: int = 0):
+    """Imprimir resumen de latencias de un escenario"""
+    latencias = sorted(latencias)
+    if not latencias:
+        print(f"   {nombre}: sin resultados ({errores} errores)")
+        return
+
+    p50 = latencias[len(latencias) // 2] * 1000
+    p95 = latencias[min(len(latencias) - 1, int(len(latencias) * 0.95))] * 1000
+    throughput = len(latencias) / duracion if duracion > 0 else 0
+
+    print(
+        f"   {nombre}: {throughput:8.1f} req/s | "
+        f"p50 {p50:7.1f} ms | p95 {p95:7.1f} ms | "
+        f"media {statistics.mean(latencias) * 1000:7.1f} ms | errores {errores}"
+    )
+
+
+async def run_concurrency(args):
+    """Medir throughput de un endpoint con distintos niveles de concurrencia"""
+    limits = httpx.Limits(max_connections=max(args.clients), max_keepalive_connections=max(args.clients))
+
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=60, limits=limits) as client:
+        token = await login(client, args.username, args.password)
+        headers = {"Authorization": f"Bearer {token}"}
+
+        print(f"📊 Concurrencia en {args.endpoint} ({args.label})")
+
+        for clientes in args.clients:
+            pendientes = args.requests
+            latencias = []
+            errores = 0
+
+            async def worker():
+                nonlocal pendientes, errores
+                while pendientes > 0:
+                    pendientes -= 1
+                    inicio = time.perf_counter()
+                    try:
+                        response = await client.get(args.endpoint, headers=headers)
+                        if response.status_code != 200:
+                            errores += 1
+                            continue
+                    except httpx.HTTPError:
+                        errores += 1
+                        continue
+                    latencias.append(time.perf_counter() - inicio)
+
+            inicio = time.perf_counter()
+            await asyncio.gather(*[worker() for _ in range(clientes)])
+            duracion = time.perf_counter() - inicio
+
+            print_latencies(f"{clientes:3d} clientes", latencias, duracion, errores)
+
+
+async def time_calls(fn, iterations: int) -> list:
+    """Ejecutar una corrutina varias veces y devolver las latencias"""
+    latencias = []
+    for _ in range(iterations):
+        inicio = time.perf_counter()
+        await fn()
+        latencias.append(time.perf_counter() - inicio)
+    return latencias
+
+
+async def run_tower_progress(args):
+    """Comparar la vista agrupada contra el cálculo manual por torre"""
+    from app.services.dashboard_service import DashboardService
+
+    print(f"📊 Progreso por torre ({args.iterations} iteraciones, {args.label})")
+
+    for nombre, fn in [
+        ("vista agrupada", DashboardService.get_tower_progress.__wrapped__),  # Sin cache
+        ("manual por torre", DashboardService._calculate_tower_progress_manual),
+    ]:
+        await fn()  # Calentar el pool de conexiones
+        inicio = time.perf_counter()
+        latencias = await time_calls(fn, args.iterations)
+        print_latencies(f"{nombre:18s}", latencias, time.perf_counter() - inicio)
+
+
+async def run_pagination(args):
+    """Comparar página 1 contra una página profunda con offset y con cursor"""
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=120) as client:
+        token = await login(client, args.username, args.password)
+        headers = {"Authorization": f"Bearer {token}"}
+
+        async def get_page(params: dict) -> httpx.Response:
+            response = await client.get(args.endpoint, params={"limit": args.limit, **params}, headers=headers)
+            response.raise_for_status()
+            return response
+
+        print(f"📊 Paginación en {args.endpoint}: página 1 vs página {args.page} ({args.label})")
+
+        # Offset: la página profunda obliga a recorrer y descartar filas previas
+        for nombre, offset in [("offset página 1", 0), (f"offset página {args.page}", (args.page - 1) * args.limit)]:
+            async def leer(offset=offset):
+                await get_page({"offset": offset})
+            await leer()
+            inicio = time.perf_counter()
+            latencias = await time_calls(leer, args.iterations)
+            print_latencies(f"{nombre:22s}", latencias, time.perf_counter() - inicio)
+
+        # Cursor: recorrer hasta la página profunda para obtener su cursor
+        cursores = {1: None}
+        cursor = None
+        for pagina in range(2, args.page + 1):
+            response = await get_page({"cursor": cursor} if cursor else {})
+            cursor = response.headers.get("X-Next-Cursor")
+            if not cursor:
+                print(f"   Solo hay {pagina - 1} páginas; sembrar más datos (matviews --seed)")
+                return
+        cursores[args.page] = cursor
+
+        for pagina, cursor in cursores.items():
+            async def leer(cursor=cursor):
+                await get_page({"cursor": cursor} if cursor else {})
+            inicio = time.perf_counter()
+            latencias = await time_calls(leer, args.iterations)
+            print_latencies(f"{f'cursor página {pagina}':22s}", latencias, time.perf_counter() - inicio)
+
+
+async def run_login(args):
+    """Ráfaga de logins concurrentes midiendo la latencia de /health en paralelo"""
+    limits = httpx.Limits(max_connections=args.concurrency + 1, max_keepalive_connections=args.concurrency + 1)
+
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=120, limits=limits) as client:
+        print(f"📊 {args.concurrency} logins concurrentes ({args.label})")
+
+        latencias = []
+        errores = 0
+        terminado = asyncio.Event()
+
+        async def login_once():
+            nonlocal errores
+            inicio = time.perf_counter()
+            response = await client.post(
+                "/auth/login", json={"username": args.username, "password": args.password}
+            )
+            if response.status_code != 200:
+                errores += 1
+                return
+            latencias.append(time.perf_counter() - inicio)
+
+        # Si bcrypt bloquea el event loop, /health se retrasa junto con los logins
+        latencias_health = []
+
+        async def sondear_health():
+            while not terminado.is_set():
+                inicio = time.perf_counter()
+                await client.get("/health")
+                latencias_health.append(time.perf_counter() - inicio)
+                await asyncio.sleep(0.05)
+
+        sonda = asyncio.create_task(sondear_health())
+        inicio = time.perf_counter()
+        await asyncio.gather(*(login_once() for _ in range(args.concurrency)))
+        duracion = time.perf_counter() - inicio
+        terminado.set()
+        await sonda
+
+        print_latencies(f"{'login':19s}", latencias, duracion, errores)
+        print_latencies("/health en paralelo", latencias_health, duracion)
+        if errores:
+            print("   Los errores 429 indican que RATE_LIMIT_ENABLED limitó la ráfaga")
+
+
+SEED_MARCA = "benchmark-seed"
+
+
+async def run_writes(args):
+    """Latencia de crear y actualizar avances (respuesta completa con usuario)"""
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=60) as client:
+        token = await login(client, args.username, args.password)
+        headers = {"Authorization": f"Bearer {token}"}
+
+        print(f"📊 Escrituras de avances ({args.iterations} iteraciones, {args.label})")
+
+        creados = []
+
+        async def crear():
+            response = await client.post("/avances/with-form", headers=headers, data={
+                "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "torre": "A",
+                "piso": 1,
+                "sector": "Poniente",
+                "tipo_espacio": "unidad",
+                "ubicacion": "A101",
+                "categoria": "Canalización",
+                "porcentaje": 50,
+                "observaciones": SEED_MARCA,
+            })
+            response.raise_for_status()
+            creados.append(response.json()["id"])
+
+        pendientes = []
+
+        async def actualizar():
+            response = await client.put(f"/avances/{pendientes.pop()}", headers=headers, json={"porcentaje": 75})
+            response.raise_for_status()
+
+        try:
+            inicio = time.perf_counter()
+            latencias = await time_calls(crear, args.iterations)
+            print_latencies(f"{'crear':12s}", latencias, time.perf_counter() - inicio)
+
+            pendientes.extend(creados)
+            inicio = time.perf_counter()
+            latencias = await time_calls(actualizar, len(pendientes))
+            print_latencies(f"{'actualizar':12s}", latencias, time.perf_counter() - inicio)
+        finally:
+            for avance_id in creados:
+                await client.delete(f"/avances/{avance_id}", headers=headers)
+
+
+def exec_sql(sql: str):
+    """Ejecutar SQL con la clave de servicio (requiere la función exec_sql)"""
+    from app.services.supabase_client import supabase_service
+    return supabase_service.rpc("exec_sql", {"sql": sql}).execute()
+
+
+async def run_matviews(args):
+    """Comparar vistas normales contra materializadas con datos sembrados"""
+    from app.services.supabase_client import supabase_async
+    from app.services.vistas_service import VistasService
+
+    if args.seed:
+        print(f"🌱 Sembrando {args.seed} avances de prueba...")
+        inicio = time.perf_counter()
+        exec_sql(f"""
+            INSERT INTO avances (fecha, torre, piso, sector, tipo_espacio, ubicacion, categoria, porcentaje, observaciones)
+            SELECT
+                now() - (i % 365) * interval '1 day',
+                (ARRAY['A','B','C','D','E','F','G','H','I','J'])[1 + i % 10],
+                (ARRAY[1, 3])[1 + i % 2],
+                'Poniente',
+                'unidad',
+                'U' || (i % 500),
+                'Canalización',
+                (i * 7) % 101,
+                '{SEED_MARCA}'
+            FROM generate_series(1, {args.seed}) AS i
+        """)
+        print(f"   Sembrado en {time.perf_counter() - inicio:.1f} s")
+
+    resultado = await VistasService.refresh(forzar=True)
+    print(f"🔄 Refresco de vistas materializadas: {resultado}")
+
+    print(f"📊 Vistas normales vs materializadas ({args.iterations} iteraciones, {args.label})")
+
+    for vista in [
+        "vista_progreso_torres", "vista_progreso_torres_mv",
+        "vista_mediciones_resumen", "vista_mediciones_resumen_mv",
+    ]:
+        async def leer(vista=vista):
+            await supabase_async.table(vista).select("*").execute()
+
+        await leer()  # Calentar el pool de conexiones
+        inicio = time.perf_counter()
+        latencias = await time_calls(leer, args.iterations)
+        print_latencies(f"{vista:28s}", latencias, time.perf_counter() - inicio)
+
+    if args.cleanup:
+        print("🧹 Eliminando avances de prueba...")
+        exec_sql(f"DELETE FROM avances WHERE observaciones = '{SEED_MARCA}'")
+        await VistasService.refresh(forzar=True)
+
+    await supabase_async.aclose()
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Pico de memoria residente del proceso en MB (None si no está disponible)"""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    maximo = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa KB y macOS bytes
+    return maximo / (1024 * 1024) if sys.platform == "darwin" else maximo / 1024
+
+
+def format_rss(valor: Optional[float]) -> str:
+    return f"{valor:.1f} MB" if valor is not None else "n/d"
+
+
+async def run_export(args):
+    """Exportar mediciones en streaming y medir el pico de memoria del proceso
+
+    La exportación corre en este proceso con los mismos servicios que la API,
+    de modo que el pico de RSS corresponde al que tendría un worker de uvicorn.
+    """
+    from app.models.exportacion import FormatoExportacion
+    from app.services.export_service import ExportService
+    from app.services.supabase_client import supabase_async
+
+    if args.seed:
+        print(f"🌱 Sembrando {args.seed} mediciones de prueba...")
+        inicio = time.perf_counter()
+        exec_sql(f"""
+            INSERT INTO mediciones (fecha, torre, piso, identificador, tipo_medicion, valores, observaciones)
+            SELECT
+                now() - (i % 365) * interval '1 day' - (i % 86400) * interval '1 second',
+                (ARRAY['A','B','C','D','E','F','G','H','I','J'])[1 + i % 10],
+                (ARRAY[1, 3])[1 + i % 2],
+                'U' || (i % 500),
+                'coaxial',
+                jsonb_build_object('coaxial', 40 + (i % 40)),
+                '{SEED_MARCA}'
+            FROM generate_series(1, {args.seed}) AS i
+        """)
+        print(f"   Sembrado en {time.perf_counter() - inicio:.1f} s")
+
+    formato = FormatoExportacion(args.formato)
+    print(f"📊 Exportación de mediciones en streaming ({formato.value}, {args.label})")
+    rss_inicial = peak_rss_mb()
+
+    columnar = formato in (FormatoExportacion.PARQUET, FormatoExportacion.ARROW)
+    if columnar:
+        bloques = ExportService.stream_columnar("mediciones", formato, torre=args.torre)
+    else:
+        bloques = ExportService.stream("mediciones", formato, torre=args.torre)
+
+    filas = 0
+    total_bytes = 0
+    primer_byte = None
+    inicio = time.perf_counter()
+    async for bloque in bloques:
+        if primer_byte is None:
+            primer_byte = time.perf_counter() - inicio
+        if columnar:
+            total_bytes += len(bloque)
+        else:
+            filas += bloque.count("\n")
+            total_bytes += len(bloque.encode("utf-8"))
+    duracion = time.perf_counter() - inicio
+
+    if formato == FormatoExportacion.CSV:
+        filas -= 1  # Encabezados
+    resumen_filas = "" if columnar else f"{filas} filas | "
+    print(
+        f"   streaming: {resumen_filas}{total_bytes / (1024 * 1024):.1f} MB | {duracion:.1f} s"
+        + ("" if columnar else f" ({filas / duracion if duracion else 0:.0f} filas/s)")
+        + f" | primer byte {(primer_byte or 0) * 1000:.0f} ms"
+    )
+    print(f"   RSS pico: {format_rss(rss_inicial)} al iniciar -> {format_rss(peak_rss_mb())} al terminar")
+
+    if args.legacy:
+        # Después del streaming: el pico de RSS solo crece
+        inicio = time.perf_counter()
+        response = await supabase_async.rpc("exportar_mediciones", {}).execute()
+        duracion = time.perf_counter() - inicio
+        total = (response.data or {}).get("metadata", {}).get("total_records", 0)
+        print(f"   exportar_mediciones (json_agg): {total} filas | {duracion:.1f} s")
+        print(f"   RSS pico tras json_agg: {format_rss(peak_rss_mb())}")
+
+    if args.cleanup:
+        print("🧹 Eliminando mediciones de prueba...")
+        exec_sql(f"DELETE FROM mediciones WHERE observaciones = '{SEED_MARCA}'")
+
+    await supabase_async.aclose()
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Benchmarks de la API BDPA Los Encinos")
+    parser.add_argument("--base-url", default=BASE_URL)
+    parser.add_argument("--username", default="admin")
+    parser.add_argument("--password", default="password123")
+    parser.add_argument("--label", default="actual", help="Etiqueta de la corrida (ej: antes/despues)")
+
+    subparsers = parser.add_subparsers(dest="scenario", required=True)
+
+    concurrency = subparsers.add_parser("concurrency", help="Throughput con 1, 10 y 50 clientes concurrentes")
+    concurrency.add_argument("--endpoint", default="/avances/")
+    concurrency.add_argument("--clients", type=int, nargs="+", default=[1, 10, 50])
+    concurrency.add_argument("--requests", type=int, default=200, help="Peticiones por nivel de concurrencia")
+    concurrency.set_defaults(func=run_concurrency)
+
+    tower_progress = subparsers.add_parser("tower-progress", help="Vista agrupada vs cálculo manual por torre")
+    tower_progress.add_argument("--iterations", type=int, default=20)
+    tower_progress.set_defaults(func=run_tower_progress)
+
+    matviews = subparsers.add_parser("matviews", help="Vistas normales vs materializadas")
+    matviews.add_argument("--seed", type=int, default=0, help="Avances de prueba a insertar (ej: 500000)")
+    matviews.add_argument("--iterations", type=int, default=20)
+    matviews.add_argument("--cleanup", action="store_true", help="Eliminar los avances sembrados al terminar")
+    matviews.set_defaults(func=run_matviews)
+
+    pagination = subparsers.add_parser("pagination", help="Página 1 vs página profunda (offset y cursor)")
+    pagination.add_argument("--endpoint", default="/avances/")
+    pagination.add_argument("--page", type=int, default=500)
+    pagination.add_argument("--limit", type=int, default=100)
+    pagination.add_argument("--iterations", type=int, default=20)
+    pagination.set_defaults(func=run_pagination)
+
+    writes = subparsers.add_parser("writes", help="Latencia de crear y actualizar avances")
+    writes.add_argument("--iterations", type=int, default=50)
+    writes.set_defaults(func=run_writes)
+
+    login_parser = subparsers.add_parser("login", help="Logins concurrentes y latencia del event loop")
+    login_parser.add_argument("--concurrency", type=int, default=100)
+    login_parser.set_defaults(func=run_login)
+
+    export = subparsers.add_parser("export", help="Exportación en streaming de mediciones y pico de RSS")
+    export.add_argument("--seed", type=int, default=0, help="Mediciones de prueba a insertar (ej: 1000000)")
+    export.add_argument("--formato", choices=["ndjson", "csv", "parquet", "arrow"], default="ndjson")
+    export.add_argument("--torre", default=None, help="Exportar solo una torre")
+    export.add_argument("--legacy", action="store_true", help="Comparar con exportar_mediciones (json_agg)")
+    export.add_argument("--cleanup", action="store_true", help="Eliminar las mediciones sembradas al terminar")
+    export.set_defaults(func=run_export)
+
+    return parser
+
+
+if __name__ == "__main__":
+    args = build_parser().parse_args()
+    asyncio.run(args.func(args))
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Generar miniaturas y versiones WebP de las fotos de avances existentes
+
+Recorre los avances con foto y sin derivadas (`thumb_url` nula) y genera
+para cada uno la miniatura y la versión mediana con el mismo pipeline que
+usa la API al subir una foto. Se puede interrumpir y volver a ejecutar:
+solo procesa lo que falta.
+
+Uso:
+    python scripts/generar_derivadas_fotos.py
+    python scripts/generar_derivadas_fotos.py --limite 500 --lote 50
+
+Devuelve código de salida 1 si alguna foto no se pudo procesar.
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.services.foto_service import FotoService
+from app.services.supabase_client import supabase_async
+from app.utils.pagination import apply_keyset
+
+
+async def backfill(limite: int, lote: int) -> int:
+    procesadas = 0
+    fallidas = 0
+    cursor = None
+    inicio = time.perf_counter()
+
+    try:
+        while not limite or procesadas + fallidas < limite:
+            cantidad = min(lote, limite - procesadas - fallidas) if limite else lote
+            query = supabase_async.table('avances').select('id, fecha, foto_url').not_.is_(
+                'foto_url', 'null'
+            ).is_('thumb_url', 'null').is_('deleted_at', 'null')
+            response = await apply_keyset(query, cursor).limit(cantidad).execute()
+            filas = response.data or []
+            if not filas:
+                break
+
+            # El pool de procesos limita cuántas se procesan a la vez; una foto
+            # compartida por varios avances se procesa una vez para todos
+            resultados = await asyncio.gather(*(
+                FotoService.procesar(foto_url) for foto_url in dict.fromkeys(fila['foto_url'] for fila in filas)
+            ))
+            procesadas += sum(1 for urls in resultados if urls)
+            fallidas += sum(1 for urls in resultados if not urls)
+
+            ultima = filas[-1]
+            cursor = (ultima['fecha'], ultima['id'])
+            print(f"   {procesadas} procesadas, {fallidas} con error ({time.perf_counter() - inicio:.0f} s)")
+
+            if len(filas) < cantidad:
+                break
+    finally:
+        await FotoService.shutdown()
+        await supabase_async.aclose()
+
+    if fallidas:
+        print(f"⚠️  {procesadas} fotos procesadas, {fallidas} con error (se reintentan en la próxima ejecución)")
+        return 1
+
+    print(f"✅ {procesadas} fotos procesadas")
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Generar derivadas de las fotos de avances existentes")
+    parser.add_argument('--limite', type=int, default=0, help="Máximo de fotos a procesar (0 = todas)")
+    parser.add_argument('--lote', type=int, default=20, help="Fotos por lote")
+    args = parser.parse_args()
+
+    print("🖼️  Generando derivadas de fotos de avances...")
+    return asyncio.run(backfill(args.limite, args.lote))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -90,6 +90,9 @@ def verify_installation() -> bool:
         'pydantic',
         'requests',
         'pillow',
+        'numpy',
+        'openpyxl',
+        'pyarrow',
         'ttkthemes'
     ]
     
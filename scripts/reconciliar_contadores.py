@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Reconciliar los contadores del dashboard con las tablas de avances y mediciones
+
+Pensado para ejecutarse periódicamente (cron), por ejemplo cada noche:
+    0 3 * * * cd /ruta/BDPA-sql && python scripts/reconciliar_contadores.py
+
+Devuelve código de salida 1 si se encontraron y corrigieron desvíos.
+"""
+
+import json
+import sys
+from pathlib import Path
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.services.supabase_client import supabase_service
+
+
+def main() -> int:
+    print("🔄 Reconciliando contadores del dashboard...")
+
+    try:
+        response = supabase_service.rpc('reconciliar_dashboard_counters').execute()
+    except Exception as e:
+        print(f"❌ Error reconciliando contadores: {e}")
+        return 2
+
+    resultado = response.data or {}
+    corregidas = resultado.get('filas_corregidas') or 0
+    eliminadas = resultado.get('filas_eliminadas') or 0
+
+    print(f"   Duración: {resultado.get('duracion_ms')} ms")
+
+    if corregidas or eliminadas:
+        print(f"⚠️  Desvíos corregidos: {corregidas} filas actualizadas, {eliminadas} eliminadas")
+        print(json.dumps(resultado.get('detalle'), indent=2, ensure_ascii=False))
+        return 1
+
+    print("✅ Contadores consistentes")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
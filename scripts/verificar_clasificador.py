@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Verificar que el clasificador vectorizado de mediciones coincide con las reglas fila a fila
+
+Genera mediciones aleatorias (valores en rango, en los bordes, fuera de rango,
+faltantes, NaN, infinitos y no numéricos) y compara
+`app.utils.clasificacion.clasificar_mediciones` contra
+`MedicionService._calcular_estado_medicion`, que es la referencia.
+
+Uso:
+    python scripts/verificar_clasificador.py --casos 100000 --semilla 1
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.models.medicion import TipoMedicion
+from app.services.medicion_service import MedicionService
+from app.services.configuracion_service import RANGOS_MEDICION_DEFAULT, MARGEN_ADVERTENCIA_DEFAULT
+from app.utils.clasificacion import COLUMNAS, clasificar_mediciones
+
+
+def valor_aleatorio(rng: random.Random):
+    """Valor de medición, con énfasis en los bordes de los rangos"""
+    caso = rng.random()
+    if caso < 0.1:
+        return None
+    if caso < 0.15:
+        return rng.choice(['50', 'x', [], {}])
+    if caso < 0.2:
+        return rng.choice([True, False, float('nan'), float('inf'), float('-inf'), 10 ** 400])
+    if caso < 0.5:
+        # Bordes de los rangos y de las zonas de advertencia
+        borde = rng.choice([45, 50, 70, 75, -30, -25, -13, -8, -80, -75, -35, -30])
+        return borde + rng.choice([-1, -0.5, 0, 0.5, 1])
+    if caso < 0.7:
+        return rng.randint(-100, 100)
+    return rng.uniform(-100, 100)
+
+
+def medicion_aleatoria(rng: random.Random):
+    """Tipo y valores de una medición aleatoria"""
+    tipo = rng.choice([t for t in TipoMedicion] + ['desconocido'])
+    if rng.random() < 0.02:
+        return tipo, None
+
+    valores = {columna: valor_aleatorio(rng) for columna in COLUMNAS if rng.random() < 0.8}
+    valores['certificacion'] = rng.choice(
+        ['APROBADO', 'APROBADO_CON_OBSERVACIONES', 'RECHAZADO', None, 3]
+    )
+    return tipo, valores
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Equivalencia del clasificador vectorizado")
+    parser.add_argument("--casos", type=int, default=100000)
+    parser.add_argument("--semilla", type=int, default=None)
+    args = parser.parse_args()
+
+    semilla = args.semilla if args.semilla is not None else random.randrange(2 ** 32)
+    rng = random.Random(semilla)
+    print(f"🔍 Comparando {args.casos} mediciones aleatorias (semilla {semilla})")
+
+    tipos, valores = zip(*(medicion_aleatoria(rng) for _ in range(args.casos)))
+
+    inicio = time.perf_counter()
+    esperados = [
+        MedicionService._calcular_estado_medicion(tipo, fila).value
+        for tipo, fila in zip(tipos, valores)
+    ]
+    duracion_referencia = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    obtenidos = clasificar_mediciones(tipos, valores, RANGOS_MEDICION_DEFAULT, MARGEN_ADVERTENCIA_DEFAULT)
+    duracion_vectorizada = time.perf_counter() - inicio
+
+    print(f"   Fila a fila: {duracion_referencia * 1000:8.1f} ms")
+    print(f"   Vectorizado: {duracion_vectorizada * 1000:8.1f} ms")
+
+    diferencias = [
+        (tipo, fila, esperado, obtenido)
+        for tipo, fila, esperado, obtenido in zip(tipos, valores, esperados, obtenidos)
+        if esperado != obtenido
+    ]
+    if diferencias:
+        print(f"❌ {len(diferencias)} diferencias. Primeras:")
+        for tipo, fila, esperado, obtenido in diferencias[:10]:
+            print(f"   {tipo} {fila}: esperado {esperado}, obtenido {obtenido}")
+        return 1
+
+    print("✅ Resultados idénticos")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
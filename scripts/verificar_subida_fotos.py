@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Verificar que la subida de fotos a Storage usa memoria acotada
+
+Sube fotos de distintos tamaños con `AvanceService._upload_foto` contra un
+Storage simulado (transporte httpx que lee el cuerpo bloque a bloque y solo
+cuenta los bytes), sin tocar el registro de fotos de la base de datos, y
+mide con tracemalloc el pico de memoria de cada subida, que debe quedar por
+debajo de unos pocos bloques de UPLOAD_CHUNK_SIZE sin importar el tamaño
+del archivo. También comprueba que un archivo de tamaño desconocido que
+supera MAX_FILE_SIZE se corta con 413 sin llegar a Storage.
+
+Devuelve código de salida 1 si alguna comprobación falla.
+
+Uso:
+    python scripts/verificar_subida_fotos.py --tamanos 1 5 10
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import httpx
+from fastapi import HTTPException, UploadFile
+from starlette.datastructures import Headers
+
+from app.config import settings
+from app.models.foto import FotoInfo
+from app.services.avance_service import AvanceService
+from app.services.foto_service import FotoService
+from app.services.supabase_client import supabase_async
+
+MB = 1024 * 1024
+
+
+class StorageSimulado(httpx.AsyncBaseTransport):
+    """Storage que recibe el cuerpo en streaming y solo guarda cuántos bytes llegaron
+
+    No usa httpx.MockTransport porque ese lee el cuerpo completo en memoria
+    antes de llamar al handler, y la medición contaría todo el archivo.
+    """
+
+    def __init__(self):
+        self.recibidos = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        async for bloque in request.stream:
+            self.recibidos += len(bloque)
+        return httpx.Response(200, json={'Key': request.url.path})
+
+
+def archivo_subido(tamano: int, declarar_tamano: bool = True) -> UploadFile:
+    """UploadFile como el que arma Starlette: spool de 1MB que pasa a disco"""
+    archivo = tempfile.SpooledTemporaryFile(max_size=MB)
+    restante = tamano
+    while restante > 0:
+        bloque = os.urandom(min(MB, restante))
+        archivo.write(bloque)
+        restante -= len(bloque)
+    archivo.seek(0)
+
+    return UploadFile(
+        archivo,
+        size=tamano if declarar_tamano else None,
+        filename='foto.jpg',
+        headers=Headers({'content-type': 'image/jpeg'})
+    )
+
+
+async def medir_subida(foto: UploadFile) -> int:
+    """Pico de memoria (bytes) asignado durante una subida"""
+    tracemalloc.reset_peak()
+    inicial, _ = tracemalloc.get_traced_memory()
+    await AvanceService._upload_foto(foto, 'verificacion')
+    _, pico = tracemalloc.get_traced_memory()
+    return pico - inicial
+
+
+async def sin_registro(foto_hash: str):
+    return None
+
+
+async def registro_simulado(foto_hash: str, ruta: str, content_type: str, tamano: int, usuario_id: str):
+    return FotoInfo(hash=foto_hash, url=ruta, content_type=content_type, tamano=tamano)
+
+
+async def main_async(tamanos, tolerancia_bloques: int) -> bool:
+    storage = StorageSimulado()
+    original = supabase_async.storage_http
+    supabase_async.storage_http = httpx.AsyncClient(
+        base_url=str(original.base_url),
+        transport=storage
+    )
+    # Cada foto se trata como nueva: siempre se sube
+    FotoService.buscar = staticmethod(sin_registro)
+    FotoService.registrar = staticmethod(registro_simulado)
+
+    bloque = settings.UPLOAD_CHUNK_SIZE
+    limite = tolerancia_bloques * bloque
+    exito = True
+    tracemalloc.start()
+
+    try:
+        # Calentar imports y conexiones para no contarlos en la primera medición
+        await AvanceService._upload_foto(archivo_subido(bloque), 'verificacion')
+        storage.recibidos = 0
+
+        print(f"📏 Bloque: {bloque // 1024} KB, pico permitido: {limite // 1024} KB")
+        for tamano_mb in tamanos:
+            tamano = int(tamano_mb * MB)
+            if tamano > settings.MAX_FILE_SIZE:
+                print(f"⏭️  {tamano_mb} MB supera MAX_FILE_SIZE, se omite")
+                continue
+
+            foto = archivo_subido(tamano)
+            storage.recibidos = 0
+            pico = await medir_subida(foto)
+            correcto = pico <= limite and storage.recibidos == tamano
+            exito &= correcto
+            print(f"{'✅' if correcto else '❌'} {tamano_mb} MB: pico {pico / 1024:.0f} KB, recibidos {storage.recibidos} bytes")
+            await foto.close()
+
+        # Tamaño desconocido: el límite se aplica mientras se lee (ya al calcular el hash)
+        foto = archivo_subido(settings.MAX_FILE_SIZE + bloque, declarar_tamano=False)
+        storage.recibidos = 0
+        try:
+            await AvanceService._upload_foto(foto, 'verificacion')
+            print("❌ Archivo sobre MAX_FILE_SIZE aceptado")
+            exito = False
+        except HTTPException as e:
+            cortado = e.status_code == 413 and storage.recibidos == 0
+            exito &= cortado
+            print(f"{'✅' if cortado else '❌'} Sobre MAX_FILE_SIZE: {e.status_code}, recibidos {storage.recibidos} bytes")
+        finally:
+            await foto.close()
+
+    finally:
+        tracemalloc.stop()
+        await supabase_async.storage_http.aclose()
+        supabase_async.storage_http = original
+
+    return exito
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verificar memoria acotada en la subida de fotos")
+    parser.add_argument('--tamanos', type=float, nargs='+', default=[1, 5, 10], help="Tamaños de foto en MB")
+    parser.add_argument('--tolerancia', type=int, default=4, help="Pico máximo en bloques de UPLOAD_CHUNK_SIZE")
+    args = parser.parse_args()
+
+    if not asyncio.run(main_async(args.tamanos, args.tolerancia)):
+        print("❌ La subida de fotos no cumple el límite de memoria")
+        sys.exit(1)
+    print("✅ Subida de fotos con memoria acotada")
+
+
+if __name__ == "__main__":
+    main()
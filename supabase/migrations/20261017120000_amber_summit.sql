@@ -0,0 +1,48 @@
+/*
+  # Resumen del dashboard agregado en el servidor
+
+  1. Funciones
+    - `obtener_resumen_dashboard()` - Devuelve solo los valores finales del
+      resumen (completadas, avances/mediciones de hoy, alertas y últimas
+      fechas) en un único objeto JSON, sin transferir filas a la API.
+
+  2. Notas
+    - Los filtros de "hoy" usan rangos sobre `fecha` para aprovechar
+      `idx_avances_fecha` e `idx_mediciones_fecha`.
+    - `total_unidades` y `porcentaje_general` se calculan en la API a
+      partir de `TOTAL_UNIDADES`.
+*/
+
+CREATE OR REPLACE FUNCTION obtener_resumen_dashboard()
+RETURNS json AS $$
+DECLARE
+  result json;
+BEGIN
+  WITH avances_stats AS (
+    SELECT
+      COUNT(*) FILTER (WHERE porcentaje = 100) as unidades_completadas,
+      COUNT(*) FILTER (WHERE fecha >= CURRENT_DATE AND fecha < CURRENT_DATE + 1) as avances_hoy,
+      MAX(fecha) as ultimo_avance
+    FROM avances
+    WHERE deleted_at IS NULL
+  ),
+  mediciones_stats AS (
+    SELECT
+      COUNT(*) FILTER (WHERE fecha >= CURRENT_DATE AND fecha < CURRENT_DATE + 1) as mediciones_hoy,
+      COUNT(*) FILTER (WHERE estado = 'FALLA') as alertas_pendientes,
+      MAX(fecha) as ultima_medicion
+    FROM mediciones
+  )
+  SELECT json_build_object(
+    'unidades_completadas', a.unidades_completadas,
+    'avances_hoy', a.avances_hoy,
+    'mediciones_hoy', m.mediciones_hoy,
+    'alertas_pendientes', m.alertas_pendientes,
+    'ultimo_avance', a.ultimo_avance,
+    'ultima_medicion', m.ultima_medicion
+  ) INTO result
+  FROM avances_stats a, mediciones_stats m;
+
+  RETURN result;
+END;
+$$ LANGUAGE plpgsql STABLE;
@@ -0,0 +1,50 @@
+/*
+  # Progreso por torre con conteo de mediciones en una sola consulta
+
+  1. Vistas
+    - `vista_progreso_torres` - Se recrea agregando avances y mediciones por
+      torre por separado y uniéndolos con FULL OUTER JOIN, de modo que:
+      - `mediciones_ok` / `mediciones_falla` vienen en la misma fila
+      - las torres con mediciones pero sin avances también aparecen
+      - el JOIN no multiplica filas (antes se unía fila a fila)
+
+  2. Notas
+    - La API completa las torres configuradas sin datos con ceros, por lo
+      que el resultado no depende de que todas las torres tengan registros.
+*/
+
+DROP VIEW IF EXISTS vista_progreso_torres;
+
+CREATE VIEW vista_progreso_torres AS
+WITH avances_torre AS (
+  SELECT
+    torre,
+    COUNT(*) as total_avances,
+    ROUND(AVG(porcentaje), 2) as progreso_promedio,
+    COUNT(DISTINCT ubicacion) as unidades_con_avance,
+    COUNT(*) FILTER (WHERE porcentaje = 100) as unidades_completadas,
+    MAX(fecha) as ultimo_avance
+  FROM avances
+  WHERE deleted_at IS NULL
+  GROUP BY torre
+),
+mediciones_torre AS (
+  SELECT
+    torre,
+    COUNT(*) FILTER (WHERE estado = 'OK') as mediciones_ok,
+    COUNT(*) FILTER (WHERE estado = 'FALLA') as mediciones_falla
+  FROM mediciones
+  GROUP BY torre
+)
+SELECT
+  COALESCE(a.torre, m.torre) as torre,
+  COALESCE(a.total_avances, 0) as total_avances,
+  COALESCE(a.progreso_promedio, 0) as progreso_promedio,
+  COALESCE(a.unidades_con_avance, 0) as unidades_con_avance,
+  COALESCE(a.unidades_completadas, 0) as unidades_completadas,
+  a.ultimo_avance,
+  COALESCE(m.mediciones_ok, 0) as mediciones_ok,
+  COALESCE(m.mediciones_falla, 0) as mediciones_falla
+FROM avances_torre a
+FULL OUTER JOIN mediciones_torre m ON a.torre = m.torre
+ORDER BY 1;
@@ -0,0 +1,49 @@
+/*
+  # Snapshot de agregados compartido por el dashboard
+
+  1. Funciones
+    - `obtener_resumen_dashboard()` - Se amplía con el conteo de mediciones
+      por estado (`mediciones_ok`, `mediciones_advertencia`,
+      `total_mediciones`), de modo que el resumen y el estado de mediciones
+      salen de la misma lectura de `avances` y `mediciones`.
+*/
+
+CREATE OR REPLACE FUNCTION obtener_resumen_dashboard()
+RETURNS json AS $$
+DECLARE
+  result json;
+BEGIN
+  WITH avances_stats AS (
+    SELECT
+      COUNT(*) FILTER (WHERE porcentaje = 100) as unidades_completadas,
+      COUNT(*) FILTER (WHERE fecha >= CURRENT_DATE AND fecha < CURRENT_DATE + 1) as avances_hoy,
+      MAX(fecha) as ultimo_avance
+    FROM avances
+    WHERE deleted_at IS NULL
+  ),
+  mediciones_stats AS (
+    SELECT
+      COUNT(*) as total_mediciones,
+      COUNT(*) FILTER (WHERE estado = 'OK') as mediciones_ok,
+      COUNT(*) FILTER (WHERE estado = 'ADVERTENCIA') as mediciones_advertencia,
+      COUNT(*) FILTER (WHERE fecha >= CURRENT_DATE AND fecha < CURRENT_DATE + 1) as mediciones_hoy,
+      COUNT(*) FILTER (WHERE estado = 'FALLA') as alertas_pendientes,
+      MAX(fecha) as ultima_medicion
+    FROM mediciones
+  )
+  SELECT json_build_object(
+    'unidades_completadas', a.unidades_completadas,
+    'avances_hoy', a.avances_hoy,
+    'mediciones_hoy', m.mediciones_hoy,
+    'alertas_pendientes', m.alertas_pendientes,
+    'ultimo_avance', a.ultimo_avance,
+    'ultima_medicion', m.ultima_medicion,
+    'mediciones_ok', m.mediciones_ok,
+    'mediciones_advertencia', m.mediciones_advertencia,
+    'total_mediciones', m.total_mediciones
+  ) INTO result
+  FROM avances_stats a, mediciones_stats m;
+
+  RETURN result;
+END;
+$$ LANGUAGE plpgsql STABLE;
@@ -0,0 +1,118 @@
+/*
+  # Vistas materializadas de progreso con refresco incremental
+
+  1. Vistas materializadas
+    - `vista_progreso_torres_mv` - Copia materializada de `vista_progreso_torres`
+    - `vista_mediciones_resumen_mv` - Copia materializada de `vista_mediciones_resumen`
+    - `vista_avances_recientes_mv` - Copia materializada de `vista_avances_recientes`
+    Cada una tiene un índice único para permitir `REFRESH ... CONCURRENTLY`
+    (las lecturas no se bloquean durante el refresco).
+
+  2. Control de refresco
+    - `vistas_materializadas_version` - Secuencia que avanza con cada
+      sentencia de escritura en `avances` y `mediciones` (trigger por
+      sentencia). Usar una secuencia evita bloquear filas y serializar
+      escrituras concurrentes.
+    - `estado_vistas_materializadas` - Fila única con la versión incluida en
+      el último refresco y su fecha.
+    - `refrescar_vistas_materializadas(forzar)` - Refresca las tres vistas si
+      la secuencia avanzó desde el último refresco. La API la invoca con
+      debounce después de escribir y periódicamente para cubrir escrituras
+      externas.
+*/
+
+-- Vistas materializadas
+CREATE MATERIALIZED VIEW IF NOT EXISTS vista_progreso_torres_mv AS
+SELECT * FROM vista_progreso_torres;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_vista_progreso_torres_mv_torre
+  ON vista_progreso_torres_mv(torre);
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS vista_mediciones_resumen_mv AS
+SELECT * FROM vista_mediciones_resumen;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_vista_mediciones_resumen_mv_clave
+  ON vista_mediciones_resumen_mv(torre, piso, tipo_medicion);
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS vista_avances_recientes_mv AS
+SELECT * FROM vista_avances_recientes;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_vista_avances_recientes_mv_id
+  ON vista_avances_recientes_mv(id);
+
+CREATE INDEX IF NOT EXISTS idx_vista_avances_recientes_mv_fecha
+  ON vista_avances_recientes_mv(fecha DESC);
+
+-- Control de versiones escritas / refrescadas
+CREATE SEQUENCE IF NOT EXISTS vistas_materializadas_version;
+
+CREATE TABLE IF NOT EXISTS estado_vistas_materializadas (
+  id integer PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+  version_refrescada bigint NOT NULL DEFAULT 0,
+  ultimo_refresco timestamptz DEFAULT now()
+);
+
+INSERT INTO estado_vistas_materializadas (id) VALUES (1) ON CONFLICT (id) DO NOTHING;
+
+ALTER TABLE estado_vistas_materializadas ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Usuarios pueden ver estado de vistas materializadas"
+  ON estado_vistas_materializadas
+  FOR SELECT
+  TO authenticated
+  USING (true);
+
+-- Registrar escrituras que dejan las vistas desactualizadas
+CREATE OR REPLACE FUNCTION marcar_vistas_pendientes()
+RETURNS trigger AS $$
+BEGIN
+  PERFORM nextval('vistas_materializadas_version');
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+DROP TRIGGER IF EXISTS trigger_vistas_pendientes_avances ON avances;
+CREATE TRIGGER trigger_vistas_pendientes_avances
+  AFTER INSERT OR UPDATE OR DELETE ON avances
+  FOR EACH STATEMENT EXECUTE FUNCTION marcar_vistas_pendientes();
+
+DROP TRIGGER IF EXISTS trigger_vistas_pendientes_mediciones ON mediciones;
+CREATE TRIGGER trigger_vistas_pendientes_mediciones
+  AFTER INSERT OR UPDATE OR DELETE ON mediciones
+  FOR EACH STATEMENT EXECUTE FUNCTION marcar_vistas_pendientes();
+
+-- Refrescar vistas materializadas si hay cambios pendientes
+CREATE OR REPLACE FUNCTION refrescar_vistas_materializadas(forzar boolean DEFAULT false)
+RETURNS json AS $$
+DECLARE
+  version_actual bigint;
+  version_previa bigint;
+  inicio timestamptz := clock_timestamp();
+BEGIN
+  -- Evitar refrescos simultáneos desde varios workers
+  IF NOT pg_try_advisory_xact_lock(hashtext('refrescar_vistas_materializadas')) THEN
+    RETURN json_build_object('refrescado', false, 'motivo', 'en_curso');
+  END IF;
+
+  SELECT last_value INTO version_actual FROM vistas_materializadas_version;
+  SELECT version_refrescada INTO version_previa FROM estado_vistas_materializadas WHERE id = 1;
+
+  IF NOT forzar AND version_actual = version_previa THEN
+    RETURN json_build_object('refrescado', false, 'motivo', 'sin_cambios');
+  END IF;
+
+  REFRESH MATERIALIZED VIEW CONCURRENTLY vista_progreso_torres_mv;
+  REFRESH MATERIALIZED VIEW CONCURRENTLY vista_mediciones_resumen_mv;
+  REFRESH MATERIALIZED VIEW CONCURRENTLY vista_avances_recientes_mv;
+
+  UPDATE estado_vistas_materializadas
+  SET version_refrescada = version_actual, ultimo_refresco = now()
+  WHERE id = 1;
+
+  RETURN json_build_object(
+    'refrescado', true,
+    'version', version_actual,
+    'duracion_ms', ROUND(EXTRACT(EPOCH FROM clock_timestamp() - inicio) * 1000)
+  );
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
@@ -0,0 +1,513 @@
+/*
+  # Contadores del dashboard mantenidos por triggers
+
+  1. Tablas
+    - `dashboard_counters` - Contadores por obra y torre (`torre = '*'` es el
+      total de la obra): avances, suma de porcentajes, unidades completadas y
+      con avance, mediciones por estado, últimas fechas y conteos del día.
+    - `dashboard_counters_ubicaciones` - Cantidad de avances vigentes por
+      ubicación, para mantener `unidades_con_avance` sin COUNT(DISTINCT).
+
+  2. Triggers
+    - `trigger_contadores_avances` / `trigger_contadores_mediciones` - Ajustan
+      los contadores en INSERT, UPDATE, borrado lógico (`deleted_at`) y DELETE.
+      Los UPDATE que no cambian columnas contadas no tocan los contadores.
+
+  3. Vistas
+    - `vista_dashboard_contadores` - Contadores listos para leer: calcula el
+      progreso promedio y pone en cero los conteos "hoy" de días anteriores.
+
+  4. Funciones
+    - `reconciliar_dashboard_counters()` - Recalcula los contadores desde las
+      tablas, corrige las filas con diferencias y devuelve el detalle.
+    - `obtener_dashboard_data()` / `calcular_progreso_obra()` - Leen los
+      contadores en lugar de recorrer `avances` y `mediciones`.
+
+  5. Notas
+    - Los conteos "hoy" se basan en `CURRENT_DATE`: un registro con fecha
+      futura no se cuenta al llegar su día hasta la siguiente reconciliación.
+*/
+
+-- Contadores por obra y torre
+CREATE TABLE IF NOT EXISTS dashboard_counters (
+  obra_id text NOT NULL,
+  torre text NOT NULL,
+  total_avances bigint NOT NULL DEFAULT 0,
+  suma_porcentaje bigint NOT NULL DEFAULT 0,
+  unidades_completadas bigint NOT NULL DEFAULT 0,
+  unidades_con_avance bigint NOT NULL DEFAULT 0,
+  ultimo_avance timestamptz,
+  avances_hoy bigint NOT NULL DEFAULT 0,
+  total_mediciones bigint NOT NULL DEFAULT 0,
+  mediciones_ok bigint NOT NULL DEFAULT 0,
+  mediciones_advertencia bigint NOT NULL DEFAULT 0,
+  mediciones_falla bigint NOT NULL DEFAULT 0,
+  ultima_medicion timestamptz,
+  mediciones_hoy bigint NOT NULL DEFAULT 0,
+  dia_hoy date NOT NULL DEFAULT CURRENT_DATE,
+  updated_at timestamptz DEFAULT now(),
+  PRIMARY KEY (obra_id, torre)
+);
+
+CREATE TABLE IF NOT EXISTS dashboard_counters_ubicaciones (
+  obra_id text NOT NULL,
+  torre text NOT NULL,
+  ubicacion text NOT NULL,
+  avances bigint NOT NULL DEFAULT 0,
+  PRIMARY KEY (obra_id, torre, ubicacion)
+);
+
+ALTER TABLE dashboard_counters ENABLE ROW LEVEL SECURITY;
+ALTER TABLE dashboard_counters_ubicaciones ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Usuarios pueden ver contadores del dashboard"
+  ON dashboard_counters
+  FOR SELECT
+  TO authenticated
+  USING (true);
+
+-- Vista de lectura
+CREATE OR REPLACE VIEW vista_dashboard_contadores AS
+SELECT
+  obra_id,
+  torre,
+  total_avances,
+  CASE WHEN total_avances > 0 THEN ROUND(suma_porcentaje::numeric / total_avances, 2) ELSE 0 END as progreso_promedio,
+  unidades_completadas,
+  unidades_con_avance,
+  ultimo_avance,
+  CASE WHEN dia_hoy = CURRENT_DATE THEN avances_hoy ELSE 0 END as avances_hoy,
+  total_mediciones,
+  mediciones_ok,
+  mediciones_advertencia,
+  mediciones_falla,
+  mediciones_falla as alertas_pendientes,
+  ultima_medicion,
+  CASE WHEN dia_hoy = CURRENT_DATE THEN mediciones_hoy ELSE 0 END as mediciones_hoy,
+  updated_at
+FROM dashboard_counters;
+
+-- Aplicar deltas a la fila de la torre y a la fila total de la obra
+CREATE OR REPLACE FUNCTION ajustar_dashboard_counters(
+  p_obra_id text,
+  p_torre text,
+  d_avances integer DEFAULT 0,
+  d_suma_porcentaje integer DEFAULT 0,
+  d_completadas integer DEFAULT 0,
+  d_unidades integer DEFAULT 0,
+  d_avances_hoy integer DEFAULT 0,
+  d_mediciones integer DEFAULT 0,
+  d_ok integer DEFAULT 0,
+  d_advertencia integer DEFAULT 0,
+  d_falla integer DEFAULT 0,
+  d_mediciones_hoy integer DEFAULT 0,
+  p_ultimo_avance timestamptz DEFAULT NULL,
+  p_ultima_medicion timestamptz DEFAULT NULL
+)
+RETURNS void AS $$
+BEGIN
+  INSERT INTO dashboard_counters AS c (
+    obra_id, torre, total_avances, suma_porcentaje, unidades_completadas,
+    unidades_con_avance, ultimo_avance, avances_hoy, total_mediciones,
+    mediciones_ok, mediciones_advertencia, mediciones_falla, ultima_medicion,
+    mediciones_hoy
+  )
+  SELECT
+    p_obra_id, t, GREATEST(d_avances, 0), GREATEST(d_suma_porcentaje, 0), GREATEST(d_completadas, 0),
+    GREATEST(d_unidades, 0), p_ultimo_avance, GREATEST(d_avances_hoy, 0), GREATEST(d_mediciones, 0),
+    GREATEST(d_ok, 0), GREATEST(d_advertencia, 0), GREATEST(d_falla, 0), p_ultima_medicion,
+    GREATEST(d_mediciones_hoy, 0)
+  FROM unnest(ARRAY[p_torre, '*']) AS t
+  ON CONFLICT (obra_id, torre) DO UPDATE SET
+    total_avances = c.total_avances + d_avances,
+    suma_porcentaje = c.suma_porcentaje + d_suma_porcentaje,
+    unidades_completadas = c.unidades_completadas + d_completadas,
+    unidades_con_avance = c.unidades_con_avance + d_unidades,
+    ultimo_avance = GREATEST(c.ultimo_avance, p_ultimo_avance),
+    avances_hoy = GREATEST(CASE WHEN c.dia_hoy = CURRENT_DATE THEN c.avances_hoy ELSE 0 END + d_avances_hoy, 0),
+    total_mediciones = c.total_mediciones + d_mediciones,
+    mediciones_ok = c.mediciones_ok + d_ok,
+    mediciones_advertencia = c.mediciones_advertencia + d_advertencia,
+    mediciones_falla = c.mediciones_falla + d_falla,
+    ultima_medicion = GREATEST(c.ultima_medicion, p_ultima_medicion),
+    mediciones_hoy = GREATEST(CASE WHEN c.dia_hoy = CURRENT_DATE THEN c.mediciones_hoy ELSE 0 END + d_mediciones_hoy, 0),
+    dia_hoy = CURRENT_DATE,
+    updated_at = now();
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+-- Sumar (signo = 1) o restar (signo = -1) un avance vigente
+CREATE OR REPLACE FUNCTION aplicar_avance_contadores(
+  p_obra_id text,
+  p_torre text,
+  p_ubicacion text,
+  p_porcentaje integer,
+  p_fecha timestamptz,
+  signo integer
+)
+RETURNS void AS $$
+DECLARE
+  avances_ubicacion bigint;
+  d_unidades integer := 0;
+BEGIN
+  -- Conteo de avances por ubicación (unidades con avance)
+  INSERT INTO dashboard_counters_ubicaciones AS u (obra_id, torre, ubicacion, avances)
+  VALUES (p_obra_id, p_torre, p_ubicacion, GREATEST(signo, 0))
+  ON CONFLICT (obra_id, torre, ubicacion) DO UPDATE SET avances = u.avances + signo
+  RETURNING avances INTO avances_ubicacion;
+
+  IF signo > 0 AND avances_ubicacion = 1 THEN
+    d_unidades := 1;
+  ELSIF signo < 0 AND avances_ubicacion <= 0 THEN
+    d_unidades := -1;
+    DELETE FROM dashboard_counters_ubicaciones
+    WHERE obra_id = p_obra_id AND torre = p_torre AND ubicacion = p_ubicacion;
+  END IF;
+
+  PERFORM ajustar_dashboard_counters(
+    p_obra_id, p_torre,
+    d_avances => signo,
+    d_suma_porcentaje => signo * p_porcentaje,
+    d_completadas => CASE WHEN p_porcentaje = 100 THEN signo ELSE 0 END,
+    d_unidades => d_unidades,
+    d_avances_hoy => CASE WHEN p_fecha >= CURRENT_DATE AND p_fecha < CURRENT_DATE + 1 THEN signo ELSE 0 END,
+    p_ultimo_avance => CASE WHEN signo > 0 THEN p_fecha END
+  );
+
+  -- Si se quitó el avance más reciente, recalcular la última fecha
+  IF signo < 0 THEN
+    UPDATE dashboard_counters c
+    SET ultimo_avance = (
+      SELECT MAX(a.fecha) FROM avances a
+      WHERE a.deleted_at IS NULL
+        AND COALESCE(a.obra_id, 'los-encinos-001') = p_obra_id
+        AND (c.torre = '*' OR a.torre = c.torre)
+    )
+    WHERE c.obra_id = p_obra_id
+      AND c.torre IN (p_torre, '*')
+      AND c.ultimo_avance <= p_fecha;
+  END IF;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+-- Sumar (signo = 1) o restar (signo = -1) una medición
+CREATE OR REPLACE FUNCTION aplicar_medicion_contadores(
+  p_obra_id text,
+  p_torre text,
+  p_estado text,
+  p_fecha timestamptz,
+  signo integer
+)
+RETURNS void AS $$
+BEGIN
+  PERFORM ajustar_dashboard_counters(
+    p_obra_id, p_torre,
+    d_mediciones => signo,
+    d_ok => CASE WHEN p_estado = 'OK' THEN signo ELSE 0 END,
+    d_advertencia => CASE WHEN p_estado = 'ADVERTENCIA' THEN signo ELSE 0 END,
+    d_falla => CASE WHEN p_estado = 'FALLA' THEN signo ELSE 0 END,
+    d_mediciones_hoy => CASE WHEN p_fecha >= CURRENT_DATE AND p_fecha < CURRENT_DATE + 1 THEN signo ELSE 0 END,
+    p_ultima_medicion => CASE WHEN signo > 0 THEN p_fecha END
+  );
+
+  -- Si se quitó la medición más reciente, recalcular la última fecha
+  IF signo < 0 THEN
+    UPDATE dashboard_counters c
+    SET ultima_medicion = (
+      SELECT MAX(m.fecha) FROM mediciones m
+      WHERE COALESCE(m.obra_id, 'los-encinos-001') = p_obra_id
+        AND (c.torre = '*' OR m.torre = c.torre)
+    )
+    WHERE c.obra_id = p_obra_id
+      AND c.torre IN (p_torre, '*')
+      AND c.ultima_medicion <= p_fecha;
+  END IF;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+-- Trigger de avances: restar la versión anterior y sumar la nueva
+CREATE OR REPLACE FUNCTION actualizar_contadores_avances()
+RETURNS trigger AS $$
+BEGIN
+  IF TG_OP = 'UPDATE' AND
+     (OLD.obra_id, OLD.torre, OLD.ubicacion, OLD.porcentaje, OLD.fecha, OLD.deleted_at IS NULL)
+     IS NOT DISTINCT FROM
+     (NEW.obra_id, NEW.torre, NEW.ubicacion, NEW.porcentaje, NEW.fecha, NEW.deleted_at IS NULL) THEN
+    RETURN NULL;
+  END IF;
+
+  -- Serializar ajustes por obra (la fila total es común a todos) y evitar
+  -- deadlocks entre sentencias que tocan torres en distinto orden
+  PERFORM pg_advisory_xact_lock(hashtext('dashboard_counters:' || COALESCE(
+    CASE WHEN TG_OP = 'DELETE' THEN OLD.obra_id ELSE NEW.obra_id END, 'los-encinos-001'
+  )));
+
+  IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.deleted_at IS NULL THEN
+    PERFORM aplicar_avance_contadores(
+      COALESCE(OLD.obra_id, 'los-encinos-001'), OLD.torre, OLD.ubicacion, OLD.porcentaje, OLD.fecha, -1
+    );
+  END IF;
+
+  IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.deleted_at IS NULL THEN
+    PERFORM aplicar_avance_contadores(
+      COALESCE(NEW.obra_id, 'los-encinos-001'), NEW.torre, NEW.ubicacion, NEW.porcentaje, NEW.fecha, 1
+    );
+  END IF;
+
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+-- Trigger de mediciones: restar la versión anterior y sumar la nueva
+CREATE OR REPLACE FUNCTION actualizar_contadores_mediciones()
+RETURNS trigger AS $$
+BEGIN
+  IF TG_OP = 'UPDATE' AND
+     (OLD.obra_id, OLD.torre, OLD.estado, OLD.fecha)
+     IS NOT DISTINCT FROM
+     (NEW.obra_id, NEW.torre, NEW.estado, NEW.fecha) THEN
+    RETURN NULL;
+  END IF;
+
+  PERFORM pg_advisory_xact_lock(hashtext('dashboard_counters:' || COALESCE(
+    CASE WHEN TG_OP = 'DELETE' THEN OLD.obra_id ELSE NEW.obra_id END, 'los-encinos-001'
+  )));
+
+  IF TG_OP IN ('UPDATE', 'DELETE') THEN
+    PERFORM aplicar_medicion_contadores(
+      COALESCE(OLD.obra_id, 'los-encinos-001'), OLD.torre, OLD.estado, OLD.fecha, -1
+    );
+  END IF;
+
+  IF TG_OP IN ('INSERT', 'UPDATE') THEN
+    PERFORM aplicar_medicion_contadores(
+      COALESCE(NEW.obra_id, 'los-encinos-001'), NEW.torre, NEW.estado, NEW.fecha, 1
+    );
+  END IF;
+
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+DROP TRIGGER IF EXISTS trigger_contadores_avances ON avances;
+CREATE TRIGGER trigger_contadores_avances
+  AFTER INSERT OR UPDATE OR DELETE ON avances
+  FOR EACH ROW EXECUTE FUNCTION actualizar_contadores_avances();
+
+DROP TRIGGER IF EXISTS trigger_contadores_mediciones ON mediciones;
+CREATE TRIGGER trigger_contadores_mediciones
+  AFTER INSERT OR UPDATE OR DELETE ON mediciones
+  FOR EACH ROW EXECUTE FUNCTION actualizar_contadores_mediciones();
+
+-- Reconciliar contadores con las tablas (detectar y corregir desvíos)
+CREATE OR REPLACE FUNCTION reconciliar_dashboard_counters()
+RETURNS json AS $$
+DECLARE
+  filas_corregidas integer := 0;
+  filas_eliminadas integer := 0;
+  detalle json;
+  inicio timestamptz := clock_timestamp();
+BEGIN
+  -- Bloquear escrituras mientras se recalcula para no perder deltas
+  LOCK TABLE avances, mediciones IN SHARE MODE;
+
+  -- Reconstruir conteo de avances por ubicación
+  DELETE FROM dashboard_counters_ubicaciones;
+  INSERT INTO dashboard_counters_ubicaciones (obra_id, torre, ubicacion, avances)
+  SELECT COALESCE(obra_id, 'los-encinos-001'), torre, ubicacion, COUNT(*)
+  FROM avances
+  WHERE deleted_at IS NULL
+  GROUP BY 1, 2, 3;
+
+  WITH avances_torre AS (
+    SELECT
+      COALESCE(obra_id, 'los-encinos-001') as obra_id,
+      torre,
+      COUNT(*) as total_avances,
+      COALESCE(SUM(porcentaje), 0) as suma_porcentaje,
+      COUNT(*) FILTER (WHERE porcentaje = 100) as unidades_completadas,
+      COUNT(DISTINCT ubicacion) as unidades_con_avance,
+      MAX(fecha) as ultimo_avance,
+      COUNT(*) FILTER (WHERE fecha >= CURRENT_DATE AND fecha < CURRENT_DATE + 1) as avances_hoy
+    FROM avances
+    WHERE deleted_at IS NULL
+    GROUP BY 1, 2
+  ),
+  mediciones_torre AS (
+    SELECT
+      COALESCE(obra_id, 'los-encinos-001') as obra_id,
+      torre,
+      COUNT(*) as total_mediciones,
+      COUNT(*) FILTER (WHERE estado = 'OK') as mediciones_ok,
+      COUNT(*) FILTER (WHERE estado = 'ADVERTENCIA') as mediciones_advertencia,
+      COUNT(*) FILTER (WHERE estado = 'FALLA') as mediciones_falla,
+      MAX(fecha) as ultima_medicion,
+      COUNT(*) FILTER (WHERE fecha >= CURRENT_DATE AND fecha < CURRENT_DATE + 1) as mediciones_hoy
+    FROM mediciones
+    GROUP BY 1, 2
+  ),
+  por_torre AS (
+    SELECT
+      COALESCE(a.obra_id, m.obra_id) as obra_id,
+      COALESCE(a.torre, m.torre) as torre,
+      COALESCE(a.total_avances, 0) as total_avances,
+      COALESCE(a.suma_porcentaje, 0) as suma_porcentaje,
+      COALESCE(a.unidades_completadas, 0) as unidades_completadas,
+      COALESCE(a.unidades_con_avance, 0) as unidades_con_avance,
+      a.ultimo_avance,
+      COALESCE(a.avances_hoy, 0) as avances_hoy,
+      COALESCE(m.total_mediciones, 0) as total_mediciones,
+      COALESCE(m.mediciones_ok, 0) as mediciones_ok,
+      COALESCE(m.mediciones_advertencia, 0) as mediciones_advertencia,
+      COALESCE(m.mediciones_falla, 0) as mediciones_falla,
+      m.ultima_medicion,
+      COALESCE(m.mediciones_hoy, 0) as mediciones_hoy
+    FROM avances_torre a
+    FULL OUTER JOIN mediciones_torre m ON a.obra_id = m.obra_id AND a.torre = m.torre
+  ),
+  esperado AS (
+    SELECT * FROM por_torre
+    UNION ALL
+    SELECT
+      obra_id, '*',
+      SUM(total_avances)::bigint, SUM(suma_porcentaje)::bigint, SUM(unidades_completadas)::bigint,
+      SUM(unidades_con_avance)::bigint, MAX(ultimo_avance), SUM(avances_hoy)::bigint,
+      SUM(total_mediciones)::bigint, SUM(mediciones_ok)::bigint, SUM(mediciones_advertencia)::bigint,
+      SUM(mediciones_falla)::bigint, MAX(ultima_medicion), SUM(mediciones_hoy)::bigint
+    FROM por_torre
+    GROUP BY obra_id
+  ),
+  diferencias AS (
+    SELECT e.*
+    FROM esperado e
+    LEFT JOIN vista_dashboard_contadores c ON c.obra_id = e.obra_id AND c.torre = e.torre
+    WHERE c.obra_id IS NULL
+       OR (c.total_avances, c.unidades_completadas, c.unidades_con_avance, c.ultimo_avance, c.avances_hoy,
+           c.total_mediciones, c.mediciones_ok, c.mediciones_advertencia, c.mediciones_falla,
+           c.ultima_medicion, c.mediciones_hoy)
+          IS DISTINCT FROM
+          (e.total_avances, e.unidades_completadas, e.unidades_con_avance, e.ultimo_avance, e.avances_hoy,
+           e.total_mediciones, e.mediciones_ok, e.mediciones_advertencia, e.mediciones_falla,
+           e.ultima_medicion, e.mediciones_hoy)
+       OR (SELECT d.suma_porcentaje FROM dashboard_counters d WHERE d.obra_id = e.obra_id AND d.torre = e.torre)
+          IS DISTINCT FROM e.suma_porcentaje
+  ),
+  corregidas AS (
+    INSERT INTO dashboard_counters AS c (
+      obra_id, torre, total_avances, suma_porcentaje, unidades_completadas,
+      unidades_con_avance, ultimo_avance, avances_hoy, total_mediciones,
+      mediciones_ok, mediciones_advertencia, mediciones_falla, ultima_medicion,
+      mediciones_hoy, dia_hoy, updated_at
+    )
+    SELECT
+      obra_id, torre, total_avances, suma_porcentaje, unidades_completadas,
+      unidades_con_avance, ultimo_avance, avances_hoy, total_mediciones,
+      mediciones_ok, mediciones_advertencia, mediciones_falla, ultima_medicion,
+      mediciones_hoy, CURRENT_DATE, now()
+    FROM diferencias
+    ON CONFLICT (obra_id, torre) DO UPDATE SET
+      total_avances = EXCLUDED.total_avances,
+      suma_porcentaje = EXCLUDED.suma_porcentaje,
+      unidades_completadas = EXCLUDED.unidades_completadas,
+      unidades_con_avance = EXCLUDED.unidades_con_avance,
+      ultimo_avance = EXCLUDED.ultimo_avance,
+      avances_hoy = EXCLUDED.avances_hoy,
+      total_mediciones = EXCLUDED.total_mediciones,
+      mediciones_ok = EXCLUDED.mediciones_ok,
+      mediciones_advertencia = EXCLUDED.mediciones_advertencia,
+      mediciones_falla = EXCLUDED.mediciones_falla,
+      ultima_medicion = EXCLUDED.ultima_medicion,
+      mediciones_hoy = EXCLUDED.mediciones_hoy,
+      dia_hoy = EXCLUDED.dia_hoy,
+      updated_at = EXCLUDED.updated_at
+    RETURNING c.obra_id, c.torre
+  )
+  SELECT COUNT(*), COALESCE(json_agg(json_build_object('obra_id', obra_id, 'torre', torre)), '[]'::json)
+  INTO filas_corregidas, detalle
+  FROM corregidas;
+
+  -- Eliminar filas de torres u obras que ya no tienen registros
+  DELETE FROM dashboard_counters c
+  WHERE NOT EXISTS (
+    SELECT 1 FROM avances a
+    WHERE a.deleted_at IS NULL
+      AND COALESCE(a.obra_id, 'los-encinos-001') = c.obra_id
+      AND (c.torre = '*' OR a.torre = c.torre)
+  )
+  AND NOT EXISTS (
+    SELECT 1 FROM mediciones m
+    WHERE COALESCE(m.obra_id, 'los-encinos-001') = c.obra_id
+      AND (c.torre = '*' OR m.torre = c.torre)
+  );
+
+  GET DIAGNOSTICS filas_eliminadas = ROW_COUNT;
+
+  RETURN json_build_object(
+    'filas_corregidas', filas_corregidas,
+    'filas_eliminadas', filas_eliminadas,
+    'detalle', detalle,
+    'duracion_ms', ROUND(EXTRACT(EPOCH FROM clock_timestamp() - inicio) * 1000)
+  );
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+-- Funciones existentes: leer los contadores
+CREATE OR REPLACE FUNCTION calcular_progreso_obra()
+RETURNS TABLE (
+  total_unidades integer,
+  unidades_con_avance integer,
+  progreso_promedio numeric,
+  unidades_completadas integer,
+  porcentaje_completado numeric
+) AS $$
+BEGIN
+  RETURN QUERY
+  SELECT
+    1247 as total_unidades, -- Total de unidades en Los Encinos
+    COALESCE(SUM(c.unidades_con_avance), 0)::integer,
+    CASE WHEN SUM(c.total_avances) > 0 THEN ROUND(SUM(c.suma_porcentaje)::numeric / SUM(c.total_avances), 2) END,
+    COALESCE(SUM(c.unidades_completadas), 0)::integer,
+    ROUND((COALESCE(SUM(c.unidades_completadas), 0)::numeric / 1247) * 100, 2)
+  FROM dashboard_counters c
+  WHERE c.torre = '*';
+END;
+$$ LANGUAGE plpgsql STABLE;
+
+CREATE OR REPLACE FUNCTION obtener_dashboard_data()
+RETURNS json AS $$
+DECLARE
+  result json;
+BEGIN
+  SELECT json_build_object(
+    'resumen_general', (
+      SELECT json_build_object(
+        'total_unidades', 1247,
+        'unidades_completadas', COALESCE(SUM(unidades_completadas), 0),
+        'porcentaje_general', CASE WHEN SUM(total_avances) > 0 THEN ROUND(SUM(suma_porcentaje)::numeric / SUM(total_avances), 2) END,
+        'avances_hoy', COALESCE(SUM(CASE WHEN dia_hoy = CURRENT_DATE THEN avances_hoy ELSE 0 END), 0)
+      )
+      FROM dashboard_counters
+      WHERE torre = '*'
+    ),
+    'progreso_torres', (
+      SELECT json_object_agg(torre, progreso_promedio)
+      FROM vista_dashboard_contadores
+      WHERE torre <> '*' AND total_avances > 0
+    ),
+    'mediciones_estado', (
+      SELECT json_build_object(
+        'ok', COALESCE(SUM(mediciones_ok), 0),
+        'advertencia', COALESCE(SUM(mediciones_advertencia), 0),
+        'falla', COALESCE(SUM(mediciones_falla), 0)
+      )
+      FROM dashboard_counters
+      WHERE torre = '*'
+    )
+  ) INTO result;
+
+  RETURN result;
+END;
+$$ LANGUAGE plpgsql STABLE;
+
+-- Carga inicial de contadores
+SELECT reconciliar_dashboard_counters();
@@ -0,0 +1,202 @@
+/*
+  # Búsqueda indexada en avances y mediciones
+
+  1. Extensiones
+    - `pg_trgm` - Índices de trigramas para búsquedas por subcadena
+    - `unaccent` - Eliminación de acentos
+
+  2. Configuración de texto
+    - `es_unaccent` - Copia de `spanish` que quita acentos antes de aplicar
+      el stemming en español ("canalización" encuentra "canalizacion").
+
+  3. Funciones
+    - `texto_busqueda(a, b)` - Texto normalizado (minúsculas, sin acentos)
+      para búsquedas por subcadena con trigramas.
+    - `documento_busqueda(a, b)` - tsvector ponderado (A: ubicación /
+      identificador, B: observaciones).
+    - `buscar_avances(...)` / `buscar_mediciones(...)` - Búsqueda con los
+      mismos filtros que los listados, resultados ordenados por relevancia.
+      El término se recibe como parámetro, nunca se concatena en SQL.
+
+  4. Índices
+    - GIN de texto completo y de trigramas sobre ubicación / identificador y
+      observaciones.
+
+  5. Notas
+    - Solo usa extensiones estándar de PostgreSQL (contrib), por lo que
+      funciona igual en Supabase y en una base PostgreSQL local. Las
+      funciones buscan `unaccent` tanto en `public` como en `extensions`.
+*/
+
+-- Extensiones
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE EXTENSION IF NOT EXISTS unaccent;
+
+-- Configuración de búsqueda en español sin acentos
+DO $$
+DECLARE
+  esquema_unaccent text;
+BEGIN
+  IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = 'es_unaccent') THEN
+    SELECT n.nspname INTO esquema_unaccent
+    FROM pg_ts_dict d
+    JOIN pg_namespace n ON n.oid = d.dictnamespace
+    WHERE d.dictname = 'unaccent';
+
+    CREATE TEXT SEARCH CONFIGURATION es_unaccent (COPY = spanish);
+    EXECUTE format(
+      'ALTER TEXT SEARCH CONFIGURATION es_unaccent
+         ALTER MAPPING FOR hword, hword_part, word WITH %I.unaccent, spanish_stem',
+      esquema_unaccent
+    );
+  END IF;
+END $$;
+
+-- Texto normalizado para búsquedas por subcadena
+CREATE OR REPLACE FUNCTION texto_busqueda(a text, b text DEFAULT NULL)
+RETURNS text AS $$
+  SELECT lower(unaccent('unaccent', concat_ws(' ', a, b)));
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE
+SET search_path = public, extensions, pg_catalog;
+
+-- Documento de texto completo ponderado
+CREATE OR REPLACE FUNCTION documento_busqueda(a text, b text DEFAULT NULL)
+RETURNS tsvector AS $$
+  SELECT setweight(to_tsvector('es_unaccent', coalesce(a, '')), 'A') ||
+         setweight(to_tsvector('es_unaccent', coalesce(b, '')), 'B');
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE
+SET search_path = public, extensions, pg_catalog;
+
+-- Índices de búsqueda
+CREATE INDEX IF NOT EXISTS idx_avances_busqueda_fts
+  ON avances USING gin (documento_busqueda(ubicacion, observaciones))
+  WHERE deleted_at IS NULL;
+
+CREATE INDEX IF NOT EXISTS idx_avances_busqueda_trgm
+  ON avances USING gin (texto_busqueda(ubicacion, observaciones) gin_trgm_ops)
+  WHERE deleted_at IS NULL;
+
+CREATE INDEX IF NOT EXISTS idx_mediciones_busqueda_fts
+  ON mediciones USING gin (documento_busqueda(identificador, observaciones));
+
+CREATE INDEX IF NOT EXISTS idx_mediciones_busqueda_trgm
+  ON mediciones USING gin (texto_busqueda(identificador, observaciones) gin_trgm_ops);
+
+-- Patrón LIKE literal (escapa comodines del término)
+CREATE OR REPLACE FUNCTION patron_busqueda(termino text)
+RETURNS text AS $$
+  SELECT '%' || replace(replace(replace(texto_busqueda(termino), '\', '\\'), '%', '\%'), '_', '\_') || '%';
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE;
+
+-- Buscar avances ordenados por relevancia
+CREATE OR REPLACE FUNCTION buscar_avances(
+  termino text,
+  p_torre text DEFAULT NULL,
+  p_piso integer DEFAULT NULL,
+  p_sector text DEFAULT NULL,
+  p_tipo_espacio text DEFAULT NULL,
+  p_categoria text DEFAULT NULL,
+  p_fecha_desde timestamptz DEFAULT NULL,
+  p_fecha_hasta timestamptz DEFAULT NULL,
+  limite integer DEFAULT 100,
+  desplazamiento integer DEFAULT 0
+)
+RETURNS json AS $$
+DECLARE
+  consulta tsquery := websearch_to_tsquery('es_unaccent', termino);
+  patron text := patron_busqueda(trim(termino));
+  normalizado text := texto_busqueda(trim(termino));
+  result json;
+BEGIN
+  SELECT COALESCE(json_agg(r.fila ORDER BY r.rank DESC, r.fecha DESC, r.id DESC), '[]'::json)
+  INTO result
+  FROM (
+    SELECT
+      to_jsonb(a) || jsonb_build_object(
+        'usuarios', CASE WHEN u.id IS NULL THEN NULL ELSE jsonb_build_object(
+          'id', u.id, 'nombre', u.nombre, 'username', u.username, 'rol', u.rol
+        ) END,
+        'rank', ROUND(x.rank::numeric, 4)
+      ) as fila,
+      x.rank,
+      a.fecha,
+      a.id
+    FROM avances a
+    LEFT JOIN usuarios u ON u.id = a.usuario_id
+    CROSS JOIN LATERAL (
+      SELECT
+        ts_rank_cd(documento_busqueda(a.ubicacion, a.observaciones), consulta) +
+        word_similarity(normalizado, texto_busqueda(a.ubicacion, a.observaciones)) as rank
+    ) x
+    WHERE a.deleted_at IS NULL
+      AND (documento_busqueda(a.ubicacion, a.observaciones) @@ consulta
+           OR texto_busqueda(a.ubicacion, a.observaciones) LIKE patron)
+      AND (p_torre IS NULL OR a.torre = p_torre)
+      AND (p_piso IS NULL OR a.piso = p_piso)
+      AND (p_sector IS NULL OR a.sector = p_sector)
+      AND (p_tipo_espacio IS NULL OR a.tipo_espacio = p_tipo_espacio)
+      AND (p_categoria IS NULL OR a.categoria ILIKE '%' || p_categoria || '%')
+      AND (p_fecha_desde IS NULL OR a.fecha >= p_fecha_desde)
+      AND (p_fecha_hasta IS NULL OR a.fecha <= p_fecha_hasta)
+    ORDER BY x.rank DESC, a.fecha DESC, a.id DESC
+    LIMIT limite OFFSET desplazamiento
+  ) r;
+
+  RETURN result;
+END;
+$$ LANGUAGE plpgsql STABLE;
+
+-- Buscar mediciones ordenadas por relevancia
+CREATE OR REPLACE FUNCTION buscar_mediciones(
+  termino text,
+  p_torre text DEFAULT NULL,
+  p_piso integer DEFAULT NULL,
+  p_tipo_medicion text DEFAULT NULL,
+  p_estado text DEFAULT NULL,
+  p_fecha_desde timestamptz DEFAULT NULL,
+  p_fecha_hasta timestamptz DEFAULT NULL,
+  limite integer DEFAULT 100,
+  desplazamiento integer DEFAULT 0
+)
+RETURNS json AS $$
+DECLARE
+  consulta tsquery := websearch_to_tsquery('es_unaccent', termino);
+  patron text := patron_busqueda(trim(termino));
+  normalizado text := texto_busqueda(trim(termino));
+  result json;
+BEGIN
+  SELECT COALESCE(json_agg(r.fila ORDER BY r.rank DESC, r.fecha DESC, r.id DESC), '[]'::json)
+  INTO result
+  FROM (
+    SELECT
+      to_jsonb(m) || jsonb_build_object(
+        'usuarios', CASE WHEN u.id IS NULL THEN NULL ELSE jsonb_build_object(
+          'id', u.id, 'nombre', u.nombre, 'username', u.username, 'rol', u.rol
+        ) END,
+        'rank', ROUND(x.rank::numeric, 4)
+      ) as fila,
+      x.rank,
+      m.fecha,
+      m.id
+    FROM mediciones m
+    LEFT JOIN usuarios u ON u.id = m.usuario_id
+    CROSS JOIN LATERAL (
+      SELECT
+        ts_rank_cd(documento_busqueda(m.identificador, m.observaciones), consulta) +
+        word_similarity(normalizado, texto_busqueda(m.identificador, m.observaciones)) as rank
+    ) x
+    WHERE (documento_busqueda(m.identificador, m.observaciones) @@ consulta
+           OR texto_busqueda(m.identificador, m.observaciones) LIKE patron)
+      AND (p_torre IS NULL OR m.torre = p_torre)
+      AND (p_piso IS NULL OR m.piso = p_piso)
+      AND (p_tipo_medicion IS NULL OR m.tipo_medicion = p_tipo_medicion)
+      AND (p_estado IS NULL OR m.estado = p_estado)
+      AND (p_fecha_desde IS NULL OR m.fecha >= p_fecha_desde)
+      AND (p_fecha_hasta IS NULL OR m.fecha <= p_fecha_hasta)
+    ORDER BY x.rank DESC, m.fecha DESC, m.id DESC
+    LIMIT limite OFFSET desplazamiento
+  ) r;
+
+  RETURN result;
+END;
+$$ LANGUAGE plpgsql STABLE;
@@ -0,0 +1,88 @@
+/*
+  # Token buckets compartidos para el rate limiting de la API
+
+  1. Tablas
+    - `rate_limit_buckets` - Tokens disponibles por clave (`user:<id>` o
+      `ip:<dirección>`) y fecha de la última recarga. Es UNLOGGED: se
+      consulta en cada petición y perder su contenido tras un reinicio solo
+      vuelve a llenar los buckets.
+
+  2. Funciones
+    - `consumir_token_bucket(clave, capacidad, recarga, reserva, costo)` -
+      Recarga el bucket según el tiempo transcurrido y consume `costo`
+      tokens si quedan más que `reserva`. Devuelve `{permitido, espera}`
+      (segundos hasta poder reintentar). La fila se bloquea durante la
+      operación, por lo que varios workers comparten el mismo límite.
+
+  3. Notas
+    - Backend opcional: solo se usa con `RATE_LIMIT_BACKEND=supabase`. Por
+      defecto la API mantiene los buckets en memoria de cada worker.
+*/
+
+CREATE UNLOGGED TABLE IF NOT EXISTS rate_limit_buckets (
+  clave text PRIMARY KEY,
+  tokens double precision NOT NULL,
+  actualizado timestamptz NOT NULL DEFAULT clock_timestamp()
+);
+
+CREATE INDEX IF NOT EXISTS idx_rate_limit_buckets_actualizado
+  ON rate_limit_buckets(actualizado);
+
+-- Sin políticas: solo se accede mediante la función
+ALTER TABLE rate_limit_buckets ENABLE ROW LEVEL SECURITY;
+
+CREATE OR REPLACE FUNCTION consumir_token_bucket(
+  p_clave text,
+  p_capacidad double precision,
+  p_recarga double precision,
+  p_reserva double precision DEFAULT 0,
+  p_costo double precision DEFAULT 1
+)
+RETURNS json AS $$
+DECLARE
+  ahora timestamptz := clock_timestamp();
+  disponibles double precision;
+  ultima timestamptz;
+BEGIN
+  -- Limpieza ocasional de buckets inactivos (llenos hace más de una hora)
+  IF random() < 0.01 THEN
+    DELETE FROM rate_limit_buckets
+    WHERE clave IN (
+      SELECT clave FROM rate_limit_buckets
+      WHERE actualizado < ahora - interval '1 hour'
+      FOR UPDATE SKIP LOCKED
+    );
+  END IF;
+
+  INSERT INTO rate_limit_buckets (clave, tokens, actualizado)
+  VALUES (p_clave, p_capacidad, ahora)
+  ON CONFLICT (clave) DO NOTHING;
+
+  SELECT tokens, actualizado INTO disponibles, ultima
+  FROM rate_limit_buckets
+  WHERE clave = p_clave
+  FOR UPDATE;
+
+  disponibles := LEAST(
+    p_capacidad,
+    disponibles + GREATEST(EXTRACT(EPOCH FROM ahora - ultima), 0) * p_recarga
+  );
+
+  IF disponibles - p_costo >= p_reserva THEN
+    UPDATE rate_limit_buckets
+    SET tokens = disponibles - p_costo, actualizado = ahora
+    WHERE clave = p_clave;
+
+    RETURN json_build_object('permitido', true, 'espera', 0);
+  END IF;
+
+  UPDATE rate_limit_buckets
+  SET tokens = disponibles, actualizado = ahora
+  WHERE clave = p_clave;
+
+  RETURN json_build_object(
+    'permitido', false,
+    'espera', CEIL((p_reserva + p_costo - disponibles) / NULLIF(p_recarga, 0))
+  );
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
@@ -0,0 +1,47 @@
+/*
+  # Registro masivo de mediciones
+
+  1. Funciones
+    - `insertar_mediciones_lote(p_filas, p_tamano_lote)` - Inserta un arreglo
+      JSON de mediciones ya validadas por la API (con `id` y `estado`
+      calculados) en bloques de `p_tamano_lote` filas. Toda la llamada es
+      una sola transacción: si un bloque falla no queda ninguna fila del lote.
+      Devuelve `{insertadas, bloques}`.
+
+  2. Notas
+    - Se ejecuta con los permisos del rol que llama (sin SECURITY DEFINER),
+      por lo que aplican las mismas políticas RLS que un INSERT normal.
+    - Los triggers de contadores del dashboard se ejecutan por fila, igual
+      que con inserciones individuales.
+*/
+
+CREATE OR REPLACE FUNCTION insertar_mediciones_lote(
+  p_filas jsonb,
+  p_tamano_lote integer DEFAULT 500
+)
+RETURNS json AS $$
+DECLARE
+  total integer := jsonb_array_length(p_filas);
+  tamano integer := GREATEST(COALESCE(p_tamano_lote, 500), 1);
+  desde integer := 0;
+  bloques integer := 0;
+BEGIN
+  WHILE desde < total LOOP
+    INSERT INTO mediciones (
+      id, obra_id, fecha, torre, piso, identificador, tipo_medicion,
+      valores, estado, usuario_id, observaciones, sync_status
+    )
+    SELECT
+      r.id, r.obra_id, r.fecha, r.torre, r.piso, r.identificador, r.tipo_medicion,
+      r.valores, r.estado, r.usuario_id, r.observaciones, COALESCE(r.sync_status, 'synced')
+    FROM jsonb_array_elements(p_filas) WITH ORDINALITY AS e(fila, n)
+    CROSS JOIN LATERAL jsonb_populate_record(NULL::mediciones, e.fila) AS r
+    WHERE e.n > desde AND e.n <= desde + tamano;
+
+    desde := desde + tamano;
+    bloques := bloques + 1;
+  END LOOP;
+
+  RETURN json_build_object('insertadas', total, 'bloques', bloques);
+END;
+$$ LANGUAGE plpgsql;
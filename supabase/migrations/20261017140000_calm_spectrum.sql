@@ -0,0 +1,146 @@
+/*
+  # Rangos de medición configurables y reclasificación
+
+  1. Configuración
+    - `app_config.settings` incorpora `rangosMedicion` (límites min/max por
+      alambrico, coaxial, fibra_potencia y wifi) y `margenAdvertencia`
+      (distancia a los bordes que se marca como ADVERTENCIA). Se agregan con
+      los valores que estaban fijos en el código si aún no existen.
+
+  2. Funciones
+    - `validar_rango_medicion(tipo, valores)` - Ahora lee los rangos de
+      `app_config` en vez de tenerlos fijos, de modo que el trigger de
+      mediciones y la API clasifican con la misma configuración. Si falta
+      algún rango usa el valor por defecto.
+
+  3. Nuevas tablas
+    - `reclasificaciones_mediciones` - Progreso de las reclasificaciones
+      que lanza la API al cambiar los rangos: filas revisadas, filas cuyo
+      estado cambió y detalle por transición (ej: `OK->FALLA`).
+
+  4. Seguridad
+    - RLS en `reclasificaciones_mediciones`: lectura para usuarios
+      autenticados; la escritura la hace el backend.
+*/
+
+-- Rangos por defecto en la configuración existente
+INSERT INTO app_config (id, settings)
+VALUES ('app-config', '{}'::jsonb)
+ON CONFLICT (id) DO NOTHING;
+
+UPDATE app_config
+SET settings = jsonb_build_object(
+  'rangosMedicion', jsonb_build_object(
+    'alambrico', jsonb_build_object('min', 45, 'max', 75),
+    'coaxial', jsonb_build_object('min', 45, 'max', 75),
+    'fibra_potencia', jsonb_build_object('min', -30, 'max', -8),
+    'wifi', jsonb_build_object('min', -80, 'max', -30)
+  ),
+  'margenAdvertencia', 5
+) || COALESCE(settings, '{}'::jsonb)
+WHERE id = 'app-config';
+
+-- Clasificación de un valor contra un rango: FALLA fuera, ADVERTENCIA cerca de los bordes
+CREATE OR REPLACE FUNCTION clasificar_valor_medicion(valor numeric, rango jsonb, margen numeric)
+RETURNS text AS $$
+DECLARE
+  minimo numeric := (rango->>'min')::numeric;
+  maximo numeric := (rango->>'max')::numeric;
+BEGIN
+  IF valor IS NULL OR minimo IS NULL OR maximo IS NULL THEN
+    RETURN 'OK';
+  END IF;
+
+  IF valor < minimo OR valor > maximo THEN
+    RETURN 'FALLA';
+  ELSIF valor < minimo + margen OR valor > maximo - margen THEN
+    RETURN 'ADVERTENCIA';
+  END IF;
+
+  RETURN 'OK';
+END;
+$$ LANGUAGE plpgsql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION validar_rango_medicion(tipo_medicion_param text, valores_param jsonb)
+RETURNS text AS $$
+DECLARE
+  config jsonb;
+  rangos jsonb;
+  margen numeric;
+  estado_tx text;
+  estado_rx text;
+BEGIN
+  SELECT settings INTO config FROM app_config WHERE id = 'app-config';
+
+  rangos := jsonb_build_object(
+    'alambrico', jsonb_build_object('min', 45, 'max', 75),
+    'coaxial', jsonb_build_object('min', 45, 'max', 75),
+    'fibra_potencia', jsonb_build_object('min', -30, 'max', -8),
+    'wifi', jsonb_build_object('min', -80, 'max', -30)
+  ) || COALESCE(config->'rangosMedicion', '{}'::jsonb);
+  margen := COALESCE((config->>'margenAdvertencia')::numeric, 5);
+
+  CASE tipo_medicion_param
+    WHEN 'alambrico-t1' THEN
+      RETURN clasificar_valor_medicion((valores_param->>'alambrico_t1')::numeric, rangos->'alambrico', margen);
+
+    WHEN 'alambrico-t2' THEN
+      RETURN clasificar_valor_medicion((valores_param->>'alambrico_t2')::numeric, rangos->'alambrico', margen);
+
+    WHEN 'coaxial' THEN
+      RETURN clasificar_valor_medicion((valores_param->>'coaxial')::numeric, rangos->'coaxial', margen);
+
+    WHEN 'fibra' THEN
+      -- El peor estado entre potencia TX y RX
+      estado_tx := clasificar_valor_medicion((valores_param->>'potencia_tx')::numeric, rangos->'fibra_potencia', margen);
+      estado_rx := clasificar_valor_medicion((valores_param->>'potencia_rx')::numeric, rangos->'fibra_potencia', margen);
+      IF 'FALLA' IN (estado_tx, estado_rx) THEN
+        RETURN 'FALLA';
+      ELSIF 'ADVERTENCIA' IN (estado_tx, estado_rx) THEN
+        RETURN 'ADVERTENCIA';
+      END IF;
+      RETURN 'OK';
+
+    WHEN 'wifi' THEN
+      RETURN clasificar_valor_medicion((valores_param->>'wifi')::numeric, rangos->'wifi', margen);
+
+    WHEN 'certificacion' THEN
+      CASE valores_param->>'certificacion'
+        WHEN 'RECHAZADO' THEN RETURN 'FALLA';
+        WHEN 'APROBADO_CON_OBSERVACIONES' THEN RETURN 'ADVERTENCIA';
+        ELSE RETURN 'OK';
+      END CASE;
+
+    ELSE
+      RETURN 'OK';
+  END CASE;
+END;
+$$ LANGUAGE plpgsql STABLE SECURITY DEFINER SET search_path = public;
+
+-- Progreso de reclasificaciones
+CREATE TABLE IF NOT EXISTS reclasificaciones_mediciones (
+  id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+  estado text NOT NULL DEFAULT 'en_curso'
+    CHECK (estado IN ('en_curso', 'completado', 'cancelado', 'error')),
+  rangos jsonb,
+  total integer NOT NULL DEFAULT 0,
+  procesadas integer NOT NULL DEFAULT 0,
+  cambiadas integer NOT NULL DEFAULT 0,
+  detalle jsonb NOT NULL DEFAULT '{}',
+  error text,
+  usuario_id uuid REFERENCES usuarios(id),
+  iniciado timestamptz NOT NULL DEFAULT now(),
+  actualizado timestamptz NOT NULL DEFAULT now(),
+  terminado timestamptz
+);
+
+CREATE INDEX IF NOT EXISTS idx_reclasificaciones_iniciado
+  ON reclasificaciones_mediciones (iniciado DESC);
+
+ALTER TABLE reclasificaciones_mediciones ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Usuarios autenticados pueden ver reclasificaciones"
+  ON reclasificaciones_mediciones
+  FOR SELECT
+  TO authenticated
+  USING (true);
@@ -0,0 +1,30 @@
+/*
+  # Índices para recorrer avances y mediciones por (fecha, id)
+
+  1. Índices
+    - `idx_avances_fecha_id` - Avances vigentes ordenados por fecha e id
+      descendentes.
+    - `idx_mediciones_fecha_id` - Mediciones ordenadas por fecha e id
+      descendentes.
+    - `idx_mediciones_torre_fecha_id` - Igual, filtrando por torre.
+
+  2. Notas
+    - Las exportaciones en streaming (`GET /export/avances`,
+      `GET /export/mediciones`) y la paginación con cursor piden páginas
+      `ORDER BY fecha DESC, id DESC LIMIT n` después del último registro;
+      con estos índices cada página es un recorrido de índice acotado, sin
+      ordenar los empates de fecha.
+    - Reemplazan a `exportar_avances` / `exportar_mediciones` para
+      exportaciones grandes: esas funciones arman un único documento con
+      `json_agg` y se mantienen solo por compatibilidad.
+*/
+
+CREATE INDEX IF NOT EXISTS idx_avances_fecha_id
+  ON avances (fecha DESC, id DESC)
+  WHERE deleted_at IS NULL;
+
+CREATE INDEX IF NOT EXISTS idx_mediciones_fecha_id
+  ON mediciones (fecha DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_mediciones_torre_fecha_id
+  ON mediciones (torre, fecha DESC, id DESC);
@@ -0,0 +1,24 @@
+/*
+  # Índices para exportaciones incrementales
+
+  1. Índices
+    - `idx_avances_updated_at_id` - Avances (incluidos los eliminados) por
+      fecha de modificación e id.
+    - `idx_mediciones_updated_at_id` - Mediciones por fecha de modificación
+      e id.
+
+  2. Notas
+    - `GET /export/...?actualizado_desde=` recorre las filas con
+      `updated_at` posterior a la marca de agua en orden ascendente de
+      (updated_at, id); `updated_at` lo mantienen los triggers
+      `update_*_updated_at`.
+    - Las mediciones se eliminan físicamente, por lo que una exportación
+      incremental no informa sus eliminaciones; los avances usan soft delete
+      y salen con `deleted_at`.
+*/
+
+CREATE INDEX IF NOT EXISTS idx_avances_updated_at_id
+  ON avances (updated_at, id);
+
+CREATE INDEX IF NOT EXISTS idx_mediciones_updated_at_id
+  ON mediciones (updated_at, id);
@@ -0,0 +1,23 @@
+/*
+  # Derivadas de las fotos de avances
+
+  1. Cambios en tablas
+    - `avances.thumb_url` - URL de la miniatura WebP de la foto
+    - `avances.medium_url` - URL de la versión mediana WebP de la foto
+
+    Ambas quedan nulas hasta que la API genera las derivadas, que se
+    guardan en `avances-fotos` junto al original (`<foto>_thumb.webp`,
+    `<foto>_medium.webp`).
+
+  2. Índices
+    - Índice parcial de los avances con foto y sin derivadas, que recorre
+      `scripts/generar_derivadas_fotos.py` para completar las fotos
+      existentes.
+*/
+
+ALTER TABLE avances ADD COLUMN IF NOT EXISTS thumb_url text;
+ALTER TABLE avances ADD COLUMN IF NOT EXISTS medium_url text;
+
+CREATE INDEX IF NOT EXISTS idx_avances_fotos_sin_derivadas
+  ON avances (fecha DESC, id DESC)
+  WHERE foto_url IS NOT NULL AND thumb_url IS NULL AND deleted_at IS NULL;
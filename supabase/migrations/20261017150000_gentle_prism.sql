@@ -0,0 +1,44 @@
+/*
+  # Fotos por hash de contenido
+
+  1. Nuevas tablas
+    - `fotos` - Una fila por archivo distinto subido a `avances-fotos`,
+      identificado por el SHA-256 de su contenido. Guarda la ruta del
+      original (`los-encinos/fotos/<2 primeros>/<hash>.<ext>`), su URL
+      pública y las URLs de las derivadas cuando están generadas.
+
+  2. Seguridad
+    - RLS en `fotos`: lectura para usuarios autenticados; la escritura la
+      hace el backend.
+
+  3. Notas
+    - Varios avances pueden apuntar a la misma foto (`avances.foto_url`);
+      `GET /avances/fotos/{hash}` permite al cliente saber si el archivo
+      ya está subido y crear el avance enviando solo el hash.
+    - Las fotos subidas antes de esta migración siguen con su ruta por
+      fecha y no se registran en `fotos`.
+*/
+
+CREATE TABLE IF NOT EXISTS fotos (
+  hash text PRIMARY KEY CHECK (hash ~ '^[0-9a-f]{64}$'),
+  ruta text NOT NULL,
+  url text NOT NULL UNIQUE,
+  content_type text,
+  tamano bigint,
+  thumb_url text,
+  medium_url text,
+  usuario_id uuid REFERENCES usuarios(id),
+  created_at timestamptz NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_avances_foto_url
+  ON avances (foto_url)
+  WHERE foto_url IS NOT NULL;
+
+ALTER TABLE fotos ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Usuarios autenticados pueden ver fotos"
+  ON fotos
+  FOR SELECT
+  TO authenticated
+  USING (true);
@@ -0,0 +1,57 @@
+/*
+  # Registro masivo de mediciones en tiempo lineal
+
+  1. Funciones
+    - `insertar_mediciones_lote(p_filas, p_tamano_lote)` - Misma firma y
+      resultado que antes. El arreglo JSON se expande una sola vez a una
+      tabla temporal numerada (con clave primaria por posición) y cada
+      bloque se inserta leyendo su rango de posiciones. Antes cada bloque
+      volvía a expandir el arreglo completo, con un costo cuadrático en el
+      tamaño del lote.
+
+  2. Notas
+    - La tabla temporal se borra al terminar la transacción (ON COMMIT DROP)
+      y se reemplaza si la función se llama dos veces en la misma.
+    - Sigue sin SECURITY DEFINER: aplican las políticas RLS del rol que llama.
+*/
+
+CREATE OR REPLACE FUNCTION insertar_mediciones_lote(
+  p_filas jsonb,
+  p_tamano_lote integer DEFAULT 500
+)
+RETURNS json AS $$
+DECLARE
+  total integer := jsonb_array_length(p_filas);
+  tamano integer := GREATEST(COALESCE(p_tamano_lote, 500), 1);
+  desde integer := 0;
+  bloques integer := 0;
+BEGIN
+  -- Expandir el arreglo una vez, numerado por posición
+  DROP TABLE IF EXISTS pg_temp.lote_mediciones;
+  CREATE TEMP TABLE lote_mediciones ON COMMIT DROP AS
+  SELECT e.n, r.*
+  FROM jsonb_array_elements(p_filas) WITH ORDINALITY AS e(fila, n)
+  CROSS JOIN LATERAL jsonb_populate_record(NULL::mediciones, e.fila) AS r;
+  ALTER TABLE lote_mediciones ADD PRIMARY KEY (n);
+
+  WHILE desde < total LOOP
+    INSERT INTO mediciones (
+      id, obra_id, fecha, torre, piso, identificador, tipo_medicion,
+      valores, estado, usuario_id, observaciones, sync_status
+    )
+    SELECT
+      l.id, l.obra_id, l.fecha, l.torre, l.piso, l.identificador, l.tipo_medicion,
+      l.valores, l.estado, l.usuario_id, l.observaciones, COALESCE(l.sync_status, 'synced')
+    FROM lote_mediciones l
+    WHERE l.n > desde AND l.n <= desde + tamano
+    ORDER BY l.n;
+
+    desde := desde + tamano;
+    bloques := bloques + 1;
+  END LOOP;
+
+  DROP TABLE lote_mediciones;
+
+  RETURN json_build_object('insertadas', total, 'bloques', bloques);
+END;
+$$ LANGUAGE plpgsql;
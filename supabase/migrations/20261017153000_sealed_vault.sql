@@ -0,0 +1,12 @@
+/*
+  # Refresco de vistas materializadas solo para el rol de servicio
+
+  1. Seguridad
+    - `refrescar_vistas_materializadas(forzar)` - Se quita EXECUTE a
+      `PUBLIC`, `anon` y `authenticated`: con `forzar` cualquier cliente
+      podía lanzar un refresco completo de las tres vistas. La ejecutan la
+      API (con la clave de servicio) y los scripts de mantenimiento.
+*/
+
+REVOKE EXECUTE ON FUNCTION refrescar_vistas_materializadas(boolean) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION refrescar_vistas_materializadas(boolean) TO service_role;
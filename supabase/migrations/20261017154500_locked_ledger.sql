@@ -0,0 +1,45 @@
+/*
+  # Contadores del dashboard solo para el rol de servicio
+
+  1. Seguridad
+    - `ajustar_dashboard_counters`, `aplicar_avance_contadores`,
+      `aplicar_medicion_contadores` y `reconciliar_dashboard_counters` - Se
+      quita EXECUTE a `PUBLIC`, `anon` y `authenticated`. Son SECURITY
+      DEFINER, así que por PostgREST cualquiera con la clave anónima podía
+      sumar deltas arbitrarios a `dashboard_counters` o lanzar una
+      reconciliación (que bloquea las escrituras en `avances` y
+      `mediciones`). Los triggers siguen llamándolas con los permisos del
+      dueño; la reconciliación la ejecutan la API (con la clave de
+      servicio) y `scripts/reconciliar_contadores.py`.
+    - Todas las funciones SECURITY DEFINER de los contadores fijan
+      `search_path = public`, para que no resuelvan objetos de otros
+      esquemas.
+*/
+
+REVOKE EXECUTE ON FUNCTION ajustar_dashboard_counters(
+  text, text, integer, integer, integer, integer, integer,
+  integer, integer, integer, integer, integer, timestamptz, timestamptz
+) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION aplicar_avance_contadores(text, text, text, integer, timestamptz, integer)
+  FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION aplicar_medicion_contadores(text, text, text, timestamptz, integer)
+  FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION reconciliar_dashboard_counters() FROM PUBLIC, anon, authenticated;
+
+GRANT EXECUTE ON FUNCTION ajustar_dashboard_counters(
+  text, text, integer, integer, integer, integer, integer,
+  integer, integer, integer, integer, integer, timestamptz, timestamptz
+) TO service_role;
+GRANT EXECUTE ON FUNCTION aplicar_avance_contadores(text, text, text, integer, timestamptz, integer) TO service_role;
+GRANT EXECUTE ON FUNCTION aplicar_medicion_contadores(text, text, text, timestamptz, integer) TO service_role;
+GRANT EXECUTE ON FUNCTION reconciliar_dashboard_counters() TO service_role;
+
+ALTER FUNCTION ajustar_dashboard_counters(
+  text, text, integer, integer, integer, integer, integer,
+  integer, integer, integer, integer, integer, timestamptz, timestamptz
+) SET search_path = public;
+ALTER FUNCTION aplicar_avance_contadores(text, text, text, integer, timestamptz, integer) SET search_path = public;
+ALTER FUNCTION aplicar_medicion_contadores(text, text, text, timestamptz, integer) SET search_path = public;
+ALTER FUNCTION actualizar_contadores_avances() SET search_path = public;
+ALTER FUNCTION actualizar_contadores_mediciones() SET search_path = public;
+ALTER FUNCTION reconciliar_dashboard_counters() SET search_path = public;
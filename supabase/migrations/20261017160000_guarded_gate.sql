@@ -0,0 +1,19 @@
+/*
+  # Token buckets solo para el rol de servicio
+
+  1. Seguridad
+    - `consumir_token_bucket(...)` - Se quita EXECUTE a `PUBLIC`, `anon` y
+      `authenticated`. La función recibe la clave, el costo y la capacidad,
+      así que cualquiera con la clave anónima podía vaciar el bucket de otro
+      usuario o IP y dejarlo bloqueado. Solo la llama la API con la clave de
+      servicio.
+    - Fija `search_path = public` (es SECURITY DEFINER).
+*/
+
+REVOKE EXECUTE ON FUNCTION consumir_token_bucket(text, double precision, double precision, double precision, double precision)
+  FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION consumir_token_bucket(text, double precision, double precision, double precision, double precision)
+  TO service_role;
+
+ALTER FUNCTION consumir_token_bucket(text, double precision, double precision, double precision, double precision)
+  SET search_path = public;